@@ -15,17 +15,27 @@ from agents.core.profile import create_profile
 from agents.core.profile_type import ProfileType
 from db import get_postgres_db
 from knowledge import get_knowledge
+from knowledge.context_packing import KNOWLEDGE_CONTEXT_TOKENS_AGENT, build_knowledge_retriever
+from knowledge.important_docs import important_docs_context
 
 _profile = create_profile(ProfileType.CONTENT_CREATOR)
 
+
+def _instructions() -> str:
+    """Instruções do profile + documentos importantes do tenant do request (em memória)."""
+    context = important_docs_context(_profile.get_important_docs_profile())
+    return f"{_profile.get_instructions()}\n\n{context}" if context else _profile.get_instructions()
+
+
 content_creator_agent = Agent(
     id="content-creator-agent",
     name="Content Creator",
     model=get_model(),
     db=get_postgres_db(),
-    instructions=_profile.get_instructions(),
+    instructions=_instructions,
     knowledge=get_knowledge(),
     search_knowledge=True,
+    knowledge_retriever=build_knowledge_retriever(KNOWLEDGE_CONTEXT_TOKENS_AGENT),
     tools=[WebSearchTools()],
     add_datetime_to_context=True,
     add_history_to_context=True,
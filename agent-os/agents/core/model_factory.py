@@ -1,25 +1,33 @@
 """
 Shared model factory for agents (Azure OpenAI, Anthropic, OpenAI).
-Retorna sempre uma instância real de Model (exigido pelo Agno). RAG e important_doc_ids
-são multi-tenant via header X-Tenant; o LLM usa as variáveis de ambiente (modo simples).
+Retorna sempre uma instância real de Model (exigido pelo Agno). Com Azure OpenAI, o modelo é
+multi-tenant: a cada chamada usa o endpoint/chave/deployment da organização do X-Tenant
+(config.model_registry), com cliente e pool de conexões próprios por tenant, orçamento de
+tokens/min e contabilização do uso por tenant e agente (agents.core.token_usage).
 """
 from os import getenv
 
 from agno.models.anthropic import Claude
-from agno.models.azure import AzureOpenAI
 from agno.models.openai import OpenAIResponses
 
+from agents.core.token_usage import MeteredAzureOpenAI
+from config.organization_config import organization_config_manager
+
 
 def get_model():
     """
     Retorna modelo para o agente (instância real; Agno não aceita proxy).
-    Prioridade: Azure OpenAI > Anthropic > OpenAI, a partir das variáveis de ambiente.
-    Multi-tenant: RAG/important_doc_ids usam X-Tenant; o LLM é único (env) até suporte do framework.
+    Prioridade pelas variáveis de ambiente: Azure OpenAI > Anthropic > OpenAI.
+    Multi-tenant: com Azure, o cliente é resolvido por request a partir da organização atual;
+    sem X-Tenant valem AZURE_OPENAI_* do ambiente. Só com organizações configuradas (sem Azure,
+    Anthropic ou OpenAI no ambiente) o Azure também é usado, mas requests sem tenant falham.
     """
-    if getenv("AZURE_OPENAI_API_KEY") and getenv("AZURE_OPENAI_ENDPOINT"):
+    azure_env = getenv("AZURE_OPENAI_API_KEY") and getenv("AZURE_OPENAI_ENDPOINT")
+    fallback_env = getenv("ANTHROPIC_API_KEY") or getenv("OPENAI_API_KEY")
+    if azure_env or (not fallback_env and organization_config_manager.get_all_organizations()):
         deployment = getenv("AZURE_OPENAI_DEPLOYMENT", "gpt-4o")
         api_version = getenv("AZURE_OPENAI_API_VERSION", "2024-08-01-preview")
-        return AzureOpenAI(id=deployment, api_version=api_version)
+        return MeteredAzureOpenAI(id=deployment, api_version=api_version)
     if getenv("ANTHROPIC_API_KEY"):
         return Claude(id="claude-sonnet-4-20250514")
     return OpenAIResponses(id="gpt-4o")
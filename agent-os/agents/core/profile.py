@@ -2,7 +2,8 @@
 Abstração genérica de Profile (agente por tipo).
 Alinhado ao ProfileRepositoryInterface do smart-squad-service.
 Cada profile fornece descrição e instruções para o system prompt;
-quando houver RAG, important_doc_ids por profile virão da config (organization_config).
+os documentos importantes do tenant (important_doc_ids da organization_config: general +
+lista do profile) são injetados nas instruções a partir da memória (knowledge.important_docs).
 
 As implementações concretas (ContentCreatorProfile, HumanizerProfile) ficam nas pastas
 dos respectivos agentes (content_creator/profile.py, humanizer/profile.py).
@@ -29,6 +30,10 @@ class ProfileInterface(ABC):
         """Instruções completas para o agente (descrição, RAG, referências e formato)."""
         ...
 
+    def get_important_docs_profile(self) -> str | None:
+        """Lista de important_doc_ids somada à 'general' (business, quality ou None = só general)."""
+        return None
+
 
 def create_profile(profile_type: ProfileType) -> ProfileInterface:
     """Factory: retorna o profile correspondente ao tipo (alinhado ao ProfileRepositoryFactory)."""
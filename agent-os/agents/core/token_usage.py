@@ -0,0 +1,304 @@
+"""
+Consumo de tokens dos modelos por tenant e por agente/time, com orçamento de tokens por minuto.
+MeteredAzureOpenAI envolve as chamadas do modelo multi-tenant (TenantAzureOpenAI): antes de cada
+chamada, retira do token bucket da organização a estimativa do prompt (espera, sem bloquear o event
+loop, se o orçamento do minuto acabou) e, ao final, acerta o bucket com o uso real informado pelo
+Azure (prompt + completion). Assim o tenant é contido localmente antes de o deployment devolver 429.
+O uso é agregado em memória por (tenant, agente, deployment, minuto) e gravado em lote na tabela
+ai.token_usage (upsert somando contadores) a cada TOKEN_USAGE_FLUSH_SECONDS; falhas de gravação
+não afetam as chamadas e os contadores voltam para o próximo lote.
+"""
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from os import getenv
+from typing import Any, AsyncIterator, Iterator, Optional
+
+from agno.models.response import ModelResponse
+from sqlalchemy import BigInteger, Column, DateTime, Integer, MetaData, String, Table, create_engine, func, select
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.engine import Engine
+
+from config.model_registry import TenantAzureOpenAI, current_tenant_clients
+from config.organization_config import TENANT_TOKENS_PER_MINUTE, OrganizationSettings
+from config.organization_context import get_current_organization
+from config.ratelimit import TokenBucket, estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+TOKEN_USAGE_TABLE = "token_usage"
+TOKEN_USAGE_SCHEMA = "ai"
+# Intervalo entre gravações em lote do uso agregado
+TOKEN_USAGE_FLUSH_SECONDS = float(getenv("TOKEN_USAGE_FLUSH_SECONDS", "15"))
+# Desliga a gravação no PostgreSQL (orçamento de tokens/min continua valendo)
+TOKEN_USAGE_DB_ENABLED = getenv("TOKEN_USAGE_DB_ENABLED", "true").lower() in ("1", "true", "yes")
+_PERIOD_SECONDS = 60
+
+
+def _period_start(now: float) -> datetime:
+    return datetime.fromtimestamp(now - now % _PERIOD_SECONDS, tz=timezone.utc)
+
+
+class TokenUsageRecorder:
+    """Agrega o uso por (tenant, agente, deployment, minuto) e grava em lote em ai.token_usage."""
+
+    def __init__(
+        self,
+        db_url: str | None = None,
+        db_engine: Engine | None = None,
+        flush_seconds: float = TOKEN_USAGE_FLUSH_SECONDS,
+    ) -> None:
+        self._db_url = db_url
+        self._engine = db_engine
+        self._flush_seconds = flush_seconds
+        self._db_disabled = not TOKEN_USAGE_DB_ENABLED or (db_url is None and db_engine is None)
+        self._table: Table | None = None
+        # chave -> [prompt_tokens, completion_tokens, calls]
+        self._pending: dict[tuple[str, str, str, datetime], list[int]] = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+        self._stop = threading.Event()
+
+    def _get_table(self) -> Table | None:
+        if self._db_disabled:
+            return None
+        if self._table is None:
+            table = Table(
+                TOKEN_USAGE_TABLE,
+                MetaData(schema=TOKEN_USAGE_SCHEMA),
+                Column("tenant", String, primary_key=True),
+                Column("agent", String, primary_key=True),
+                Column("model", String, primary_key=True),
+                Column("period_start", DateTime(timezone=True), primary_key=True),
+                Column("prompt_tokens", BigInteger, nullable=False, default=0),
+                Column("completion_tokens", BigInteger, nullable=False, default=0),
+                Column("calls", Integer, nullable=False, default=0),
+                Column("updated_at", DateTime(timezone=True), server_default=func.now()),
+            )
+            if self._engine is None:
+                self._engine = create_engine(self._db_url, pool_pre_ping=True)
+            table.create(self._engine, checkfirst=True)
+            self._table = table
+        return self._table
+
+    def record(self, tenant: str, agent: str, model: str, prompt_tokens: int, completion_tokens: int) -> None:
+        if self._db_disabled:
+            return
+        key = (tenant, agent, model, _period_start(time.time()))
+        with self._lock:
+            counters = self._pending.setdefault(key, [0, 0, 0])
+            counters[0] += prompt_tokens
+            counters[1] += completion_tokens
+            counters[2] += 1
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="token-usage-flush", daemon=True)
+                self._thread.start()
+
+    def _merge_back(self, batch: dict[tuple[str, str, str, datetime], list[int]]) -> None:
+        with self._lock:
+            for key, values in batch.items():
+                counters = self._pending.setdefault(key, [0, 0, 0])
+                for i, value in enumerate(values):
+                    counters[i] += value
+
+    def flush(self) -> int:
+        """Grava o uso pendente (um upsert por lote); retorna o número de linhas gravadas."""
+        with self._flush_lock:
+            with self._lock:
+                batch, self._pending = self._pending, {}
+            if not batch or self._db_disabled:
+                return 0
+            try:
+                table = self._get_table()
+                stmt = postgresql.insert(table)
+                stmt = stmt.on_conflict_do_update(
+                    index_elements=["tenant", "agent", "model", "period_start"],
+                    set_={
+                        "prompt_tokens": table.c.prompt_tokens + stmt.excluded.prompt_tokens,
+                        "completion_tokens": table.c.completion_tokens + stmt.excluded.completion_tokens,
+                        "calls": table.c.calls + stmt.excluded.calls,
+                        "updated_at": func.now(),
+                    },
+                )
+                rows = [
+                    {
+                        "tenant": tenant,
+                        "agent": agent,
+                        "model": model,
+                        "period_start": period,
+                        "prompt_tokens": prompt,
+                        "completion_tokens": completion,
+                        "calls": calls,
+                    }
+                    for (tenant, agent, model, period), (prompt, completion, calls) in batch.items()
+                ]
+                with self._engine.begin() as conn:
+                    conn.execute(stmt, rows)
+                return len(rows)
+            except Exception as e:
+                logger.warning("Uso de tokens não gravado (nova tentativa no próximo lote): %s", e)
+                self._merge_back(batch)
+                return 0
+
+    def _run(self) -> None:
+        while not self._stop.wait(self._flush_seconds):
+            self.flush()
+
+    def close(self) -> None:
+        """Para o flush periódico e grava o que estiver pendente (shutdown)."""
+        self._stop.set()
+        self.flush()
+
+    def summary(self, hours: float = 24) -> list[dict[str, Any]]:
+        """Uso por tenant/agente/deployment nas últimas `hours` horas, com o pico de tokens em um minuto."""
+        table = self._get_table()
+        if table is None:
+            return []
+        total = table.c.prompt_tokens + table.c.completion_tokens
+        since = datetime.now(timezone.utc) - timedelta(hours=hours)
+        query = (
+            select(
+                table.c.tenant,
+                table.c.agent,
+                table.c.model,
+                func.sum(table.c.prompt_tokens).label("prompt_tokens"),
+                func.sum(table.c.completion_tokens).label("completion_tokens"),
+                func.sum(table.c.calls).label("calls"),
+                func.max(total).label("peak_tokens_per_minute"),
+            )
+            .where(table.c.period_start >= since)
+            .group_by(table.c.tenant, table.c.agent, table.c.model)
+            .order_by(table.c.tenant, table.c.agent, table.c.model)
+        )
+        with self._engine.connect() as conn:
+            return [
+                {
+                    "tenant": row.tenant,
+                    "agent": row.agent,
+                    "model": row.model,
+                    "prompt_tokens": int(row.prompt_tokens),
+                    "completion_tokens": int(row.completion_tokens),
+                    "calls": int(row.calls),
+                    "peak_tokens_per_minute": int(row.peak_tokens_per_minute),
+                }
+                for row in conn.execute(query)
+            ]
+
+
+_recorder: TokenUsageRecorder | None = None
+# Orçamento de tokens/min por organização (None = ambiente)
+_budgets: dict[str | None, TokenBucket] = {}
+_init_lock = threading.Lock()
+
+
+def get_token_usage_recorder() -> TokenUsageRecorder:
+    """Registro de uso de tokens do processo (singleton)."""
+    global _recorder
+    with _init_lock:
+        if _recorder is None:
+            from db.engine import get_engine
+
+            _recorder = TokenUsageRecorder(db_engine=get_engine())
+        return _recorder
+
+
+def get_token_budget(org: Optional[OrganizationSettings]) -> TokenBucket | None:
+    """Token bucket de tokens/min da organização (None se sem limite); recriado se o limite mudar."""
+    tokens_per_minute = org.tokens_per_minute if org else TENANT_TOKENS_PER_MINUTE
+    if tokens_per_minute <= 0:
+        return None
+    name = org.name if org else None
+    with _init_lock:
+        bucket = _budgets.get(name)
+        if bucket is None or bucket.capacity != tokens_per_minute:
+            bucket = _budgets[name] = TokenBucket(tokens_per_minute)
+        return bucket
+
+
+@dataclass
+class _Call:
+    """Uma chamada ao modelo: estimativa já retirada do orçamento e chaves da contabilização."""
+
+    tenant: str
+    agent: str
+    model: str
+    budget: TokenBucket | None
+    estimate: int
+
+    def finish(self, usage: Any) -> None:
+        prompt = int(getattr(usage, "input_tokens", 0) or 0) if usage else 0
+        completion = int(getattr(usage, "output_tokens", 0) or 0) if usage else 0
+        if self.budget is not None:
+            # Sem uso informado (erro/stream interrompido), a estimativa fica como consumida
+            self.budget.consume(prompt + completion - self.estimate if usage else 0)
+        if usage:
+            get_token_usage_recorder().record(self.tenant, self.agent, self.model, prompt, completion)
+
+
+@dataclass
+class MeteredAzureOpenAI(TenantAzureOpenAI):
+    """TenantAzureOpenAI com orçamento de tokens/min por tenant e contabilização do uso."""
+
+    def _start_call(self, kwargs: dict[str, Any]) -> _Call:
+        org = get_current_organization()
+        clients = current_tenant_clients()
+        run_response = kwargs.get("run_response")
+        agent = getattr(run_response, "agent_id", None) or getattr(run_response, "team_id", None) or ""
+        text = "".join(str(message.content or "") for message in kwargs.get("messages") or [])
+        return _Call(
+            tenant=org.name if org else "",
+            agent=agent,
+            model=clients.config.deployment if clients is not None else self.id,
+            budget=get_token_budget(org),
+            estimate=estimate_tokens(text),
+        )
+
+    def invoke(self, **kwargs: Any) -> ModelResponse:
+        call = self._start_call(kwargs)
+        if call.budget is not None:
+            call.budget.acquire(call.estimate)
+        response = None
+        try:
+            response = super().invoke(**kwargs)
+            return response
+        finally:
+            call.finish(response.response_usage if response is not None else None)
+
+    async def ainvoke(self, **kwargs: Any) -> ModelResponse:
+        call = self._start_call(kwargs)
+        if call.budget is not None:
+            await call.budget.aacquire(call.estimate)
+        response = None
+        try:
+            response = await super().ainvoke(**kwargs)
+            return response
+        finally:
+            call.finish(response.response_usage if response is not None else None)
+
+    def invoke_stream(self, **kwargs: Any) -> Iterator[ModelResponse]:
+        call = self._start_call(kwargs)
+        if call.budget is not None:
+            call.budget.acquire(call.estimate)
+        usage = None
+        try:
+            for response in super().invoke_stream(**kwargs):
+                # O uso vem no último chunk (stream_options.include_usage)
+                usage = response.response_usage or usage
+                yield response
+        finally:
+            call.finish(usage)
+
+    async def ainvoke_stream(self, **kwargs: Any) -> AsyncIterator[ModelResponse]:
+        call = self._start_call(kwargs)
+        if call.budget is not None:
+            await call.budget.aacquire(call.estimate)
+        usage = None
+        try:
+            async for response in super().ainvoke_stream(**kwargs):
+                usage = response.response_usage or usage
+                yield response
+        finally:
+            call.finish(usage)
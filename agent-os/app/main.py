@@ -8,16 +8,43 @@ Run:
   or: uvicorn app.main:app --host 0.0.0.0 --port 8000
 """
 
+import asyncio
+import threading
+from contextlib import asynccontextmanager
 from os import getenv
 from pathlib import Path
 
 from agno.os import AgentOS
 
 from agents import assist_agent, content_creator_agent, humanizer_agent
-from db import get_postgres_db
+from agents.core.token_usage import get_token_usage_recorder
+from db import dispose_engines, get_postgres_db
 from teams import content_creator_humanizer_team
 from middleware.organization_middleware import OrganizationMiddleware
 from app.routes.knowledge import router as knowledge_router
+from app.routes.organizations import router as organizations_router
+from config.organization_config import organization_config_manager
+from knowledge.important_docs import KNOWLEDGE_IMPORTANT_DOCS_PRELOAD, get_important_docs
+from knowledge.maintenance import start_vacuum_scheduler
+
+
+@asynccontextmanager
+async def lifespan(app):
+    """
+    Em background (o startup não espera o banco): pré-carrega os documentos importantes dos
+    tenants, agenda a limpeza periódica de vetores órfãos e observa o arquivo de organizações.
+    No shutdown, para o watcher, grava o consumo de tokens ainda pendente e fecha o pool de conexões
+    do PostgreSQL.
+    """
+    if KNOWLEDGE_IMPORTANT_DOCS_PRELOAD:
+        threading.Thread(target=get_important_docs().preload, name="knowledge-important-docs", daemon=True).start()
+    start_vacuum_scheduler()
+    organization_config_manager.start_watcher()
+    yield
+    await asyncio.to_thread(organization_config_manager.stop_watcher)
+    await asyncio.to_thread(get_token_usage_recorder().close)
+    dispose_engines()
+
 
 config_path = Path(__file__).parent / "config.yaml"
 agent_os = AgentOS(
@@ -28,11 +55,13 @@ agent_os = AgentOS(
     agents=[assist_agent, content_creator_agent, humanizer_agent],
     teams=[content_creator_humanizer_team],
     config=str(config_path) if config_path.exists() else None,
+    lifespan=lifespan,
 )
 
 app = agent_os.get_app()
 app.add_middleware(OrganizationMiddleware)
 app.include_router(knowledge_router, prefix="/knowledge", tags=["knowledge"])
+app.include_router(organizations_router, prefix="/organizations", tags=["organizations"])
 
 if __name__ == "__main__":
     agent_os.serve(
@@ -0,0 +1,21 @@
+"""
+Proteção das rotas administrativas: o header X-Admin-Token deve ser igual a KNOWLEDGE_ADMIN_TOKEN.
+Sem token configurado as rotas respondem 503, a menos que KNOWLEDGE_ADMIN_OPEN=true (apenas
+desenvolvimento: rotas administrativas abertas).
+"""
+import secrets
+from os import getenv
+
+from fastapi import Header, HTTPException
+
+KNOWLEDGE_ADMIN_TOKEN = getenv("KNOWLEDGE_ADMIN_TOKEN")
+KNOWLEDGE_ADMIN_OPEN = getenv("KNOWLEDGE_ADMIN_OPEN", "false").lower() in ("1", "true", "yes")
+
+
+def require_admin(x_admin_token: str | None = Header(None)) -> None:
+    if not KNOWLEDGE_ADMIN_TOKEN:
+        if KNOWLEDGE_ADMIN_OPEN:
+            return
+        raise HTTPException(status_code=503, detail="Rotas administrativas desativadas: defina KNOWLEDGE_ADMIN_TOKEN")
+    if not secrets.compare_digest(x_admin_token or "", KNOWLEDGE_ADMIN_TOKEN):
+        raise HTTPException(status_code=403, detail="X-Admin-Token inválido")
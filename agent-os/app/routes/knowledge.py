@@ -1,37 +1,186 @@
 """
 Upload de arquivos para o Knowledge (RAG).
-POST /knowledge/upload aceita multipart/form-data com um ou mais arquivos.
+GET /knowledge lista os documentos do tenant (metadados, paginação por cursor).
+POST /knowledge/upload aceita multipart/form-data com um ou mais arquivos e enfileira a ingestão
+(202 + job_id); GET /knowledge/jobs/{job_id} retorna o progresso por documento (em qualquer worker).
+Com ?wait=true a requisição aguarda o job (arquivos ingeridos em paralelo) e responde 200.
+DELETE /knowledge/{content_id} remove o documento (vetores e knowledge_contents) e
+PUT /knowledge/{content_id} substitui o arquivo (re-ingestão incremental com o mesmo nome).
+/knowledge/admin/index consulta e (re)constrói o índice vetorial e /knowledge/admin/vacuum remove
+vetores órfãos (exigem o header X-Admin-Token, ver app.routes.auth).
 """
+import asyncio
 import tempfile
+from datetime import datetime, timezone
 from pathlib import Path
+from typing import BinaryIO
 
-from fastapi import APIRouter, File, HTTPException, UploadFile
+from fastapi import APIRouter, Depends, File, Header, HTTPException, Query, UploadFile
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse
 
+from app.routes.auth import require_admin
 from knowledge import get_knowledge
+from knowledge.catalog import MAX_PAGE_SIZE, InvalidCursor, get_document_catalog
+from knowledge.embedding_cache import get_embedding_cache
+from knowledge.ingestion import (
+    ALLOWED_EXTENSIONS,
+    DOC_ERROR,
+    DocumentStatus,
+    IngestionQueueFull,
+    get_ingestion_queue,
+)
+from knowledge.maintenance import start_vacuum
+from knowledge.search_cache import get_search_cache
+from knowledge.tenancy import current_tenant_key, tenant_key
+from knowledge.vector_index import (
+    INDEX_ACTIONS,
+    IndexOperationRunning,
+    current_operation,
+    start_index_operation,
+)
 
 router = APIRouter()
 
-# Tipos permitidos (extensões) alinhados aos readers do Agno
-ALLOWED_EXTENSIONS = {".pdf", ".docx", ".md", ".txt", ".csv"}
 MAX_FILE_SIZE_BYTES = 15 * 1024 * 1024  # 15 MB por arquivo
 MAX_FILES = 5
+# Bloco de cópia do upload para o arquivo temp (nunca o arquivo inteiro em memória)
+UPLOAD_CHUNK_BYTES = 1024 * 1024
+
+
+class _FileTooLarge(Exception):
+    pass
 
 
 def _allowed_file(filename: str) -> bool:
     return Path(filename).suffix.lower() in ALLOWED_EXTENSIONS
 
 
+def _spool_to_temp(src: BinaryIO, suffix: str) -> Path:
+    """
+    Copia o upload em blocos de UPLOAD_CHUNK_BYTES para um arquivo temp e retorna o caminho.
+    Aborta (e remove o temp) assim que passar de MAX_FILE_SIZE_BYTES.
+    """
+    tmp = tempfile.NamedTemporaryFile(delete=False, suffix=suffix, prefix="knowledge_upload_")
+    path = Path(tmp.name)
+    written = 0
+    try:
+        with tmp:
+            while chunk := src.read(UPLOAD_CHUNK_BYTES):
+                written += len(chunk)
+                if written > MAX_FILE_SIZE_BYTES:
+                    raise _FileTooLarge()
+                tmp.write(chunk)
+    except BaseException:
+        path.unlink(missing_ok=True)
+        raise
+    return path
+
+
+async def _accept_upload(upload: UploadFile) -> tuple[str, Path] | DocumentStatus:
+    """Valida e copia um upload para temp; retorna (filename, caminho) ou o status de erro."""
+    filename = upload.filename or "unnamed"
+    try:
+        if not _allowed_file(filename):
+            return DocumentStatus(
+                filename=filename,
+                status=DOC_ERROR,
+                message=f"Tipo não permitido. Use: {', '.join(ALLOWED_EXTENSIONS)}",
+            )
+
+        too_large = DocumentStatus(
+            filename=filename,
+            status=DOC_ERROR,
+            message=f"Arquivo maior que {MAX_FILE_SIZE_BYTES // (1024*1024)} MB",
+        )
+        # Tamanho informado pelo parser multipart: recusa sem copiar nada
+        if upload.size is not None and upload.size > MAX_FILE_SIZE_BYTES:
+            return too_large
+
+        try:
+            return filename, await run_in_threadpool(_spool_to_temp, upload.file, Path(filename).suffix)
+        except _FileTooLarge:
+            return too_large
+        except Exception as e:
+            return DocumentStatus(filename=filename, status=DOC_ERROR, message=str(e))
+    finally:
+        await upload.close()
+
+
+async def _submit_job(files: list[tuple[str, Path]], rejected: list[DocumentStatus], wait: bool):
+    """Enfileira a ingestão; com wait=true aguarda o job e responde 200."""
+    try:
+        job = await asyncio.to_thread(get_ingestion_queue().submit, files, rejected)
+    except IngestionQueueFull as e:
+        for _, tmp_path in files:
+            tmp_path.unlink(missing_ok=True)
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "30"})
+    if wait:
+        await asyncio.wrap_future(job.done)
+        return JSONResponse(status_code=200, content=job.to_dict())
+    return job.to_dict()
+
+
+def _epoch(value: datetime | None) -> int | None:
+    if value is None:
+        return None
+    return int((value if value.tzinfo else value.replace(tzinfo=timezone.utc)).timestamp())
+
+
+@router.get(
+    "",
+    summary="Lista os documentos da Base de Conhecimento",
+    response_description="Página de documentos (metadados) e cursor da próxima página",
+)
+async def knowledge_list(
+    tenant: str | None = Query(None, description="Organização (requer X-Admin-Token); padrão: tenant do X-Tenant"),
+    file_type: str | None = Query(None, alias="type", description="Tipo de arquivo (pdf, docx, md, txt, csv)"),
+    status: str | None = Query(None, description="Status da ingestão (completed, processing, failed)"),
+    created_from: datetime | None = Query(None, description="Upload a partir de (ISO 8601)"),
+    created_to: datetime | None = Query(None, description="Upload antes de (ISO 8601)"),
+    limit: int = Query(50, ge=1, le=MAX_PAGE_SIZE),
+    cursor: str | None = Query(None, description="next_cursor da página anterior"),
+    x_admin_token: str | None = Header(None),
+):
+    """
+    Documentos do tenant em knowledge_contents, mais recentes primeiro, com paginação por keyset
+    (sem OFFSET). Retorna apenas metadados (nome, tipo, tamanho, status, datas), nunca os chunks.
+    """
+    if tenant is not None:
+        require_admin(x_admin_token)
+    catalog = get_document_catalog()
+    catalog.ensure_indexes_background()
+    try:
+        return await run_in_threadpool(
+            catalog.list,
+            tenant_key(tenant) if tenant else current_tenant_key(),
+            file_type=file_type,
+            status=status,
+            created_from=_epoch(created_from),
+            created_to=_epoch(created_to),
+            limit=limit,
+            cursor=cursor,
+        )
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
 @router.post(
     "/upload",
+    status_code=202,
     summary="Upload de arquivos para a Base de Conhecimento",
-    response_description="Quantidade ingerida e status por documento",
+    response_description="Job de ingestão e status por documento",
 )
 async def knowledge_upload(
     files: list[UploadFile] = File(..., description="Arquivos para ingestão no RAG"),
+    wait: bool = Query(False, description="Aguarda a ingestão terminar e responde 200 com o resultado"),
 ):
     """
-    Recebe um ou mais arquivos (PDF, DOCX, MD, TXT, CSV), grava em temp,
-    insere na Knowledge (chunk + embed + PgVector) e remove o temp.
+    Recebe um ou mais arquivos (PDF, DOCX, MD, TXT, CSV), copia cada um em blocos para temp
+    (sem carregar o arquivo inteiro em memória) e enfileira a ingestão (chunk + embed +
+    PgVector) no pool em background; os arquivos do upload são processados em paralelo.
+    Retorna 202 com o job_id (progresso em GET /knowledge/jobs/{job_id}) ou, com wait=true,
+    200 com {"ingested", "documents"} quando todos os arquivos terminarem.
     """
     if not files:
         raise HTTPException(status_code=400, detail="Nenhum arquivo enviado")
@@ -41,55 +190,148 @@ async def knowledge_upload(
             detail=f"Máximo de {MAX_FILES} arquivos por requisição",
         )
 
-    documents: list[dict] = []
-    ingested = 0
-    knowledge = get_knowledge()
+    accepted: list[tuple[str, Path]] = []
+    rejected: list[DocumentStatus] = []
+    for result in await asyncio.gather(*(_accept_upload(upload) for upload in files)):
+        if isinstance(result, DocumentStatus):
+            rejected.append(result)
+        else:
+            accepted.append(result)
 
-    for upload in files:
-        filename = upload.filename or "unnamed"
-        if not _allowed_file(filename):
-            documents.append(
-                {
-                    "filename": filename,
-                    "status": "error",
-                    "message": f"Tipo não permitido. Use: {', '.join(ALLOWED_EXTENSIONS)}",
-                }
-            )
-            continue
-
-        content = await upload.read()
-        if len(content) > MAX_FILE_SIZE_BYTES:
-            documents.append(
-                {
-                    "filename": filename,
-                    "status": "error",
-                    "message": f"Arquivo maior que {MAX_FILE_SIZE_BYTES // (1024*1024)} MB",
-                }
-            )
-            continue
+    return await _submit_job(accepted, rejected, wait)
 
-        try:
-            suffix = Path(filename).suffix
-            with tempfile.NamedTemporaryFile(
-                delete=False,
-                suffix=suffix,
-                prefix="knowledge_upload_",
-            ) as tmp:
-                tmp.write(content)
-                tmp_path = tmp.name
-            try:
-                knowledge.insert(path=tmp_path)
-                ingested += 1
-                documents.append({"filename": filename, "status": "ok"})
-            finally:
-                Path(tmp_path).unlink(missing_ok=True)
-        except Exception as e:
-            documents.append(
-                {
-                    "filename": filename,
-                    "status": "error",
-                    "message": str(e),
-                }
-            )
 
-    return {"ingested": ingested, "documents": documents}
+@router.delete(
+    "/{content_id}",
+    summary="Remove um documento da Base de Conhecimento",
+    response_description="Documento removido",
+)
+async def knowledge_delete(content_id: str):
+    """Remove os vetores do documento (tabela do tenant) e a linha em knowledge_contents."""
+    try:
+        deleted = await run_in_threadpool(get_knowledge().delete_document, content_id)
+    except RuntimeError as e:
+        # Vetores não removidos: a linha em knowledge_contents é mantida e o DELETE pode ser repetido
+        raise HTTPException(status_code=500, detail=str(e))
+    if not deleted:
+        raise HTTPException(status_code=404, detail="Documento não encontrado")
+    return {"content_id": content_id, "deleted": True}
+
+
+@router.put(
+    "/{content_id}",
+    status_code=202,
+    summary="Substitui o arquivo de um documento da Base de Conhecimento",
+    response_description="Job de ingestão do novo arquivo",
+)
+async def knowledge_replace(
+    content_id: str,
+    file: UploadFile = File(..., description="Nova versão do documento"),
+    wait: bool = Query(False, description="Aguarda a ingestão terminar e responde 200 com o resultado"),
+):
+    """
+    Re-ingere o documento com o novo arquivo, mantendo o nome (e o content_id): apenas os chunks
+    alterados são embedados e os vetores dos chunks que sumiram são removidos.
+    """
+    content = await run_in_threadpool(get_knowledge().get_tenant_content, content_id)
+    if content is None:
+        await file.close()
+        raise HTTPException(status_code=404, detail="Documento não encontrado")
+    result = await _accept_upload(file)
+    if isinstance(result, DocumentStatus):
+        raise HTTPException(status_code=400, detail=result.message)
+    return await _submit_job([(content.name, result[1])], [], wait)
+
+
+@router.get(
+    "/jobs/{job_id}",
+    summary="Status de um job de ingestão",
+    response_description="Status do job e de cada documento",
+)
+async def knowledge_job_status(job_id: str):
+    """
+    Retorna o progresso do job de ingestão (queued, processing, completed, partial, failed).
+    Jobs de outro tenant respondem 404, como os inexistentes.
+    """
+    status = await asyncio.to_thread(get_ingestion_queue().job_status, job_id, current_tenant_key())
+    if status is None:
+        raise HTTPException(status_code=404, detail="Job não encontrado")
+    return status
+
+
+@router.get(
+    "/cache/stats",
+    summary="Métricas dos caches da Knowledge",
+    response_description="Hits/misses dos caches de embeddings e de buscas",
+)
+async def knowledge_cache_stats():
+    """Hits, misses e hit ratio dos caches de embeddings (memória e PostgreSQL) e de buscas deste processo."""
+    return {"embeddings": get_embedding_cache().stats(), "search": get_search_cache().stats()}
+
+
+def _index_status() -> dict:
+    vector_db = get_knowledge().vector_db
+    operation = current_operation()
+    return {
+        "config": vector_db.vector_index.model_dump() if vector_db.vector_index else None,
+        "name": vector_db.vector_index_name,
+        "indexes": vector_db.vector_indexes(("hnsw", "ivfflat", "gin")) if vector_db.table_exists() else [],
+        "progress": vector_db.index_build_progress(),
+        "operation": operation.to_dict() if operation else None,
+    }
+
+
+@router.get(
+    "/admin/index",
+    summary="Status do índice vetorial",
+    response_description="Configuração, índices existentes e operação em andamento",
+    dependencies=[Depends(require_admin)],
+)
+async def knowledge_index_status():
+    """Índices HNSW/IVFFlat da tabela de vetores (válido, tamanho) e progresso de build/reindex."""
+    return await run_in_threadpool(_index_status)
+
+
+@router.post(
+    "/admin/index/{action}",
+    status_code=202,
+    summary="Cria, reconstrói ou reindexa o índice vetorial",
+    response_description="Operação iniciada em background",
+    dependencies=[Depends(require_admin)],
+)
+async def knowledge_index_action(action: str):
+    """
+    create: cria o índice configurado (e o GIN do full-text) se não existirem; rebuild: constrói um novo índice
+    com a configuração atual e troca pelo antigo; reindex: REINDEX CONCURRENTLY do índice atual.
+    Sem bloquear buscas nem ingestão; acompanhe em GET /knowledge/admin/index.
+    """
+    if action not in INDEX_ACTIONS:
+        raise HTTPException(status_code=400, detail=f"Ação inválida. Use: {', '.join(INDEX_ACTIONS)}")
+    vector_db = get_knowledge().vector_db
+    run = {
+        "create": lambda: f"{vector_db.build_vector_index()}; {vector_db.build_keyword_index()}",
+        "rebuild": lambda: vector_db.build_vector_index(rebuild=True),
+        "reindex": vector_db.reindex_vector_index,
+    }[action]
+    try:
+        return start_index_operation(action, run).to_dict()
+    except IndexOperationRunning as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+
+@router.post(
+    "/admin/vacuum",
+    status_code=202,
+    summary="Remove vetores órfãos",
+    response_description="Operação iniciada em background",
+    dependencies=[Depends(require_admin)],
+)
+async def knowledge_vacuum():
+    """
+    Apaga os vetores cujo documento não existe mais em knowledge_contents (todas as tabelas de
+    tenant) e faz VACUUM (ANALYZE) nas tabelas com muitas remoções; acompanhe em GET /knowledge/admin/index.
+    """
+    try:
+        return start_vacuum()
+    except IndexOperationRunning as e:
+        raise HTTPException(status_code=409, detail=str(e))
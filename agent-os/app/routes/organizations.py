@@ -0,0 +1,80 @@
+"""
+Organizações (tenants) configuradas neste processo.
+GET /organizations lista os tenants (sem segredos) e POST /organizations/reload relê
+TENANTS_CONFIG_JSON / organizations.json sem restart; só os clientes e caches das organizações
+alteradas são refeitos. O watcher (TENANTS_CONFIG_WATCH_SECONDS) recarrega o arquivo em todos os
+workers; o endpoint recarrega o worker que atendeu a requisição. GET /organizations/runs mostra
+as vagas de run ocupadas e as filas por tenant neste worker e GET /organizations/usage o consumo
+de tokens por tenant/agente (tabela ai.token_usage, todos os workers).
+Todas exigem X-Admin-Token (app.routes.auth).
+"""
+from dataclasses import asdict
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.concurrency import run_in_threadpool
+
+from agents.core.token_usage import get_token_usage_recorder
+from app.routes.auth import require_admin
+from config.organization_config import OrganizationConfigError, organization_config_manager
+from middleware.run_scheduler import get_run_scheduler
+
+router = APIRouter(dependencies=[Depends(require_admin)])
+
+
+@router.get(
+    "",
+    summary="Lista as organizações",
+    response_description="Organizações carregadas (deployments e documentos importantes, sem chaves)",
+)
+async def organizations_list():
+    return {
+        "organizations": [
+            {
+                "name": org.name,
+                "endpoint": org.azure_openai.endpoint,
+                "deployment": org.azure_openai.deployment,
+                "embedding_deployment": org.azure_openai.embedding_deployment,
+                "important_doc_ids": org.important_doc_ids,
+                "run_limits": asdict(org.run_limits),
+            }
+            for org in organization_config_manager.get_all_organizations().values()
+        ]
+    }
+
+
+@router.get(
+    "/runs",
+    summary="Runs em andamento e na fila por tenant",
+    response_description="Vagas do processo e runs em execução/na fila de cada tenant",
+)
+async def organizations_runs():
+    scheduler = get_run_scheduler()
+    if scheduler is None:
+        return {"enabled": False}
+    return {"enabled": True, **scheduler.stats()}
+
+
+@router.get(
+    "/usage",
+    summary="Consumo de tokens por tenant e agente",
+    response_description="Tokens de prompt/completion, chamadas e pico de tokens em um minuto",
+)
+async def organizations_usage(hours: float = Query(24, gt=0, le=24 * 90, description="Janela em horas")):
+    """Uso gravado em lote (o último intervalo de TOKEN_USAGE_FLUSH_SECONDS pode ainda não aparecer)."""
+    try:
+        return {"hours": hours, "usage": await run_in_threadpool(get_token_usage_recorder().summary, hours)}
+    except Exception as e:
+        raise HTTPException(status_code=503, detail=f"Uso de tokens indisponível: {e}")
+
+
+@router.post(
+    "/reload",
+    summary="Recarrega a configuração das organizações",
+    response_description="Organizações adicionadas, removidas e alteradas",
+)
+async def organizations_reload():
+    """Troca o mapa de organizações de uma vez; requests em andamento seguem com a configuração anterior."""
+    try:
+        return await run_in_threadpool(organization_config_manager.reload)
+    except OrganizationConfigError as e:
+        raise HTTPException(status_code=422, detail=str(e))
@@ -1 +1 @@
-"""Config package: organization (multi-tenant) and context."""
+"""Config package: organization (multi-tenant), context and per-tenant model clients."""
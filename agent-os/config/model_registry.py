@@ -0,0 +1,207 @@
+"""
+Clientes Azure OpenAI por organização (multi-tenant).
+Cada organização tem endpoint, chave e deployments próprios (OrganizationSettings.azure_openai).
+O registro cria sob demanda, e reaproveita, um pool HTTP (httpx) e os clientes OpenAI de cada
+tenant. O modelo dos agentes (TenantAzureOpenAI) e o embedder da Knowledge
+(TenantAzureOpenAIEmbedder) são instâncias únicas (o Agno exige um Model real) que resolvem o
+cliente a cada chamada por get_current_organization(); sem organização no contexto, valem as
+variáveis de ambiente. Cada tenant usa a própria cota do Azure e o próprio pool de conexões.
+Clientes substituídos (configuração alterada) ou descartados (organização removida no reload) têm
+os pools fechados após TENANT_CLIENT_CLOSE_DELAY_SECONDS, tempo para os runs em andamento terminarem.
+"""
+import asyncio
+import logging
+import threading
+from dataclasses import dataclass, field
+from os import getenv
+from typing import Any, Optional
+
+import httpx
+from agno.knowledge.embedder.azure_openai import AzureOpenAIEmbedder
+from agno.models.azure import AzureOpenAI
+from openai import AsyncAzureOpenAI as AsyncAzureOpenAIClient
+from openai import AzureOpenAI as AzureOpenAIClient
+
+from config.organization_config import AzureOpenAIConfig, OrganizationSettings, organization_config_manager
+from config.organization_context import get_current_organization
+
+logger = logging.getLogger(__name__)
+
+# Pool HTTP de cada tenant (um tenant lento não esgota as conexões dos demais)
+TENANT_HTTP_MAX_CONNECTIONS = int(getenv("TENANT_HTTP_MAX_CONNECTIONS", "50"))
+TENANT_HTTP_MAX_KEEPALIVE = int(getenv("TENANT_HTTP_MAX_KEEPALIVE", "10"))
+TENANT_HTTP_TIMEOUT_SECONDS = float(getenv("TENANT_HTTP_TIMEOUT_SECONDS", "120"))
+# Espera antes de fechar os pools de clientes substituídos (runs em andamento ainda os usam)
+TENANT_CLIENT_CLOSE_DELAY_SECONDS = float(getenv("TENANT_CLIENT_CLOSE_DELAY_SECONDS", "600"))
+
+
+@dataclass
+class TenantClients:
+    """Pool HTTP e clientes (chat e embeddings, sync e async) de um tenant."""
+
+    config: AzureOpenAIConfig
+    chat: AzureOpenAIClient
+    async_chat: AsyncAzureOpenAIClient
+    embeddings: AzureOpenAIClient
+    async_embeddings: AsyncAzureOpenAIClient
+    http: httpx.Client
+    async_http: httpx.AsyncClient
+    # Event loop em que o cliente async foi usado (as conexões dele pertencem a esse loop)
+    loop: Optional[asyncio.AbstractEventLoop] = field(default=None, compare=False)
+
+    @classmethod
+    def create(cls, config: AzureOpenAIConfig) -> "TenantClients":
+        limits = httpx.Limits(
+            max_connections=TENANT_HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=TENANT_HTTP_MAX_KEEPALIVE,
+        )
+        timeout = httpx.Timeout(TENANT_HTTP_TIMEOUT_SECONDS)
+        http = httpx.Client(limits=limits, timeout=timeout)
+        async_http = httpx.AsyncClient(limits=limits, timeout=timeout)
+
+        def params(deployment: str) -> dict[str, Any]:
+            # azure_deployment fixa o deployment na URL (o "model" da requisição é ignorado)
+            return {
+                "api_key": config.api_key,
+                "azure_endpoint": config.endpoint,
+                "api_version": config.api_version,
+                "azure_deployment": deployment,
+            }
+
+        return cls(
+            config=config,
+            chat=AzureOpenAIClient(**params(config.deployment), http_client=http),
+            async_chat=AsyncAzureOpenAIClient(**params(config.deployment), http_client=async_http),
+            embeddings=AzureOpenAIClient(**params(config.embedding_deployment), http_client=http),
+            async_embeddings=AsyncAzureOpenAIClient(**params(config.embedding_deployment), http_client=async_http),
+            http=http,
+            async_http=async_http,
+        )
+
+    def close(self) -> None:
+        """Fecha os pools HTTP (sync aqui; async no event loop dono das conexões)."""
+        self.http.close()
+        if self.async_http.is_closed:
+            return
+        if self.loop is not None and self.loop.is_running():
+            asyncio.run_coroutine_threadsafe(self.async_http.aclose(), self.loop)
+        elif self.loop is None or self.loop.is_closed():
+            # Nunca usado em um loop (ou o loop já terminou): não há conexão viva presa a ele
+            asyncio.run(self.async_http.aclose())
+
+
+class ModelRegistry:
+    """Clientes por organização (nome), recriados se a configuração Azure da organização mudar."""
+
+    def __init__(self) -> None:
+        self._clients: dict[str, TenantClients] = {}
+        self._lock = threading.Lock()
+
+    def clients(self, org: Optional[OrganizationSettings]) -> Optional[TenantClients]:
+        """Clientes da organização (None sem organização: usar a configuração do ambiente)."""
+        if org is None:
+            return None
+        with self._lock:
+            clients = self._clients.get(org.name)
+            if clients is None or clients.config != org.azure_openai:
+                if clients is not None:
+                    self._retire(clients)
+                clients = TenantClients.create(org.azure_openai)
+                self._clients[org.name] = clients
+                logger.info("Clientes Azure OpenAI criados para a organização %s", org.name)
+        if clients.loop is None:
+            try:
+                clients.loop = asyncio.get_running_loop()
+            except RuntimeError:
+                pass
+        return clients
+
+    def invalidate(self, names: Optional[set[str]] = None) -> None:
+        """Descarta os clientes das organizações (None = todas); recriados no próximo uso."""
+        with self._lock:
+            for name in list(self._clients) if names is None else names:
+                clients = self._clients.pop(name, None)
+                if clients is not None:
+                    self._retire(clients)
+
+    def _retire(self, clients: TenantClients) -> None:
+        """Fecha os pools do cliente substituído depois que os runs em andamento tiverem terminado."""
+
+        def close() -> None:
+            try:
+                clients.close()
+            except Exception as e:
+                logger.warning("Erro ao fechar clientes Azure OpenAI substituídos: %s", e)
+
+        if TENANT_CLIENT_CLOSE_DELAY_SECONDS <= 0:
+            close()
+            return
+        timer = threading.Timer(TENANT_CLIENT_CLOSE_DELAY_SECONDS, close)
+        timer.daemon = True
+        timer.start()
+
+
+_registry: ModelRegistry | None = None
+_registry_lock = threading.Lock()
+
+
+def get_model_registry() -> ModelRegistry:
+    """Registro de clientes do processo (singleton)."""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = ModelRegistry()
+            # Organizações removidas/alteradas no reload da configuração liberam seus clientes
+            organization_config_manager.add_listener(_registry.invalidate)
+        return _registry
+
+
+def current_tenant_clients() -> Optional[TenantClients]:
+    return get_model_registry().clients(get_current_organization())
+
+
+@dataclass
+class TenantAzureOpenAI(AzureOpenAI):
+    """AzureOpenAI que usa o cliente (endpoint, chave, deployment) da organização do contexto."""
+
+    def get_client(self) -> AzureOpenAIClient:
+        clients = current_tenant_clients()
+        if clients is not None:
+            return clients.chat
+        return super().get_client()
+
+    def get_async_client(self) -> AsyncAzureOpenAIClient:
+        clients = current_tenant_clients()
+        if clients is not None:
+            return clients.async_chat
+        return super().get_async_client()
+
+
+@dataclass
+class TenantAzureOpenAIEmbedder(AzureOpenAIEmbedder):
+    """AzureOpenAIEmbedder que usa o cliente de embeddings da organização do contexto."""
+
+    @property
+    def deployment(self) -> str:
+        """Deployment de embeddings em uso (entra na chave do cache de embeddings)."""
+        clients = current_tenant_clients()
+        if clients is not None:
+            return clients.config.embedding_deployment
+        return self.azure_deployment or self.id
+
+    @property
+    def client(self) -> AzureOpenAIClient:
+        clients = current_tenant_clients()
+        if clients is not None:
+            return clients.embeddings
+        # AzureOpenAIEmbedder.client cria um cliente novo a cada acesso: memoriza o do ambiente
+        if self.openai_client is None:
+            self.openai_client = super().client
+        return self.openai_client
+
+    @property
+    def aclient(self) -> AsyncAzureOpenAIClient:
+        clients = current_tenant_clients()
+        if clients is not None:
+            return clients.async_embeddings
+        return super().aclient
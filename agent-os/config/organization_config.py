@@ -1,16 +1,28 @@
 """
 Configuração multi-tenant por organização (igual smart-squad-service).
 Carrega de TENANTS_CONFIG_JSON ou de arquivo config/organizations.json.
+O arquivo pode ser recarregado sem restart (watcher por mtime ou POST /organizations/reload).
 """
 import json
 import os
 import logging
+import threading
 from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Any, Optional
+from typing import Any, Callable, Optional
 
 logger = logging.getLogger(__name__)
 
+# Intervalo de verificação do arquivo de organizações (0 desativa o watcher)
+TENANTS_CONFIG_WATCH_SECONDS = int(os.environ.get("TENANTS_CONFIG_WATCH_SECONDS", "10"))
+_ENV_SOURCE = "TENANTS_CONFIG_JSON"
+# Limites padrão de runs de agentes/times por tenant (sobrescritos por "run_limits" na organização)
+TENANT_MAX_CONCURRENT_RUNS = int(os.environ.get("TENANT_MAX_CONCURRENT_RUNS", "4"))
+TENANT_MAX_QUEUED_RUNS = int(os.environ.get("TENANT_MAX_QUEUED_RUNS", "16"))
+TENANT_RUN_WEIGHT = float(os.environ.get("TENANT_RUN_WEIGHT", "1"))
+# Orçamento padrão de tokens/min dos modelos por tenant (0 = sem limite local; "tokens_per_minute")
+TENANT_TOKENS_PER_MINUTE = int(os.environ.get("TENANT_TOKENS_PER_MINUTE", "0"))
+
 
 @dataclass
 class AzureOpenAIConfig:
@@ -29,6 +41,22 @@ class AzureSearchConfig:
     embedding_api_version: str = "2023-05-15"
 
 
+@dataclass
+class RunLimits:
+    """Runs simultâneos, runs na fila e peso do tenant no escalonamento justo (middleware.run_scheduler)."""
+    max_concurrent_runs: int = TENANT_MAX_CONCURRENT_RUNS
+    max_queued_runs: int = TENANT_MAX_QUEUED_RUNS
+    weight: float = TENANT_RUN_WEIGHT
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> "RunLimits":
+        return cls(
+            max_concurrent_runs=max(1, int(data.get("max_concurrent_runs", TENANT_MAX_CONCURRENT_RUNS))),
+            max_queued_runs=max(0, int(data.get("max_queued_runs", TENANT_MAX_QUEUED_RUNS))),
+            weight=max(0.01, float(data.get("weight", TENANT_RUN_WEIGHT))),
+        )
+
+
 @dataclass
 class OrganizationSettings:
     """Configuração de uma organização (tenant)."""
@@ -38,6 +66,8 @@ class OrganizationSettings:
     important_doc_ids: dict[str, list[str]] = field(
         default_factory=lambda: {"general": [], "business": [], "quality": []}
     )
+    run_limits: RunLimits = field(default_factory=RunLimits)
+    tokens_per_minute: int = TENANT_TOKENS_PER_MINUTE
 
     def get_important_docs_for_profile(self, profile_type: Optional[str]) -> list[str]:
         """Concatena general + lista do profile (business ou quality), como no smart-squad."""
@@ -81,15 +111,33 @@ class OrganizationSettings:
             azure_openai=azure_openai,
             azure_search=azure_search,
             important_doc_ids=important_doc_ids,
+            run_limits=RunLimits.from_dict(data.get("run_limits") or {}),
+            tokens_per_minute=max(0, int(data.get("tokens_per_minute", TENANT_TOKENS_PER_MINUTE))),
         )
 
 
+class OrganizationConfigError(Exception):
+    """Nenhuma fonte de configuração de organizações pôde ser lida."""
+
+
 class OrganizationConfigManager:
-    """Carrega e resolve organizações (TENANTS_CONFIG_JSON ou organizations.json)."""
+    """
+    Carrega e resolve organizações (TENANTS_CONFIG_JSON ou organizations.json).
+    reload() relê a fonte e troca o mapa de organizações de uma vez (requests em andamento
+    seguem com a configuração que já resolveram); os listeners recebem os nomes das organizações
+    adicionadas, removidas ou alteradas. O arquivo é observado por mtime (start_watcher).
+    """
 
     def __init__(self) -> None:
         self._organizations: dict[str, OrganizationSettings] = {}
-        self._load()
+        # Fonte carregada: arquivo (e sua assinatura mtime/tamanho) ou a variável de ambiente
+        self._source: Path | str | None = None
+        self._signature: tuple[int, int] | None = None
+        self._listeners: list[Callable[[set[str]], None]] = []
+        self._reload_lock = threading.Lock()
+        self._watcher: threading.Thread | None = None
+        self._watcher_stop = threading.Event()
+        self._organizations = self._load({}) or {}
 
     def _config_paths(self) -> list[Path]:
         return [
@@ -98,14 +146,21 @@ class OrganizationConfigManager:
             Path("/app/config/organizations.json"),
         ]
 
-    def _load(self) -> None:
+    @staticmethod
+    def _file_signature(path: Path) -> tuple[int, int]:
+        stat = path.stat()
+        return stat.st_mtime_ns, stat.st_size
+
+    def _load(self, previous: dict[str, OrganizationSettings]) -> Optional[dict[str, OrganizationSettings]]:
+        """Lê a primeira fonte válida; None se nenhuma pôde ser lida."""
         tenants_json = os.environ.get("TENANTS_CONFIG_JSON")
         if tenants_json:
             try:
                 logger.info("Carregando tenants de TENANTS_CONFIG_JSON")
                 data = json.loads(tenants_json)
-                self._load_from_data(data)
-                return
+                organizations = self._load_from_data(data, previous)
+                self._source, self._signature = _ENV_SOURCE, None
+                return organizations
             except json.JSONDecodeError as e:
                 logger.error("Erro no JSON TENANTS_CONFIG_JSON: %s", e)
             except Exception as e:
@@ -114,23 +169,101 @@ class OrganizationConfigManager:
             if path.exists():
                 try:
                     logger.info("Carregando tenants de %s", path)
+                    signature = self._file_signature(path)
                     with open(path, encoding="utf-8") as f:
-                        self._load_from_data(json.load(f))
-                    return
+                        organizations = self._load_from_data(json.load(f), previous)
+                    self._source, self._signature = path, signature
+                    return organizations
                 except Exception as e:
                     logger.warning("Erro ao ler %s: %s", path, e)
         logger.warning("Nenhuma organização carregada; use TENANTS_CONFIG_JSON ou config/organizations.json")
+        return None
 
-    def _load_from_data(self, data: dict[str, Any]) -> None:
-        orgs = data.get("organizations", {})
-        if not orgs:
-            return
-        for org_name, org_data in orgs.items():
+    def _load_from_data(
+        self, data: dict[str, Any], previous: dict[str, OrganizationSettings]
+    ) -> dict[str, OrganizationSettings]:
+        organizations: dict[str, OrganizationSettings] = {}
+        for org_name, org_data in (data.get("organizations") or {}).items():
             try:
-                self._organizations[org_name] = OrganizationSettings.from_dict(org_name, org_data)
+                organizations[org_name] = OrganizationSettings.from_dict(org_name, org_data)
                 logger.info("Organização carregada: %s", org_name)
             except Exception as e:
-                logger.error("Erro ao carregar organização %s: %s", org_name, e)
+                if org_name in previous:
+                    # Um erro de edição não derruba um tenant que já estava funcionando
+                    organizations[org_name] = previous[org_name]
+                    logger.error(
+                        "Erro ao carregar organização %s: %s (mantida a configuração anterior)", org_name, e
+                    )
+                else:
+                    logger.error("Erro ao carregar organização %s: %s", org_name, e)
+        return organizations
+
+    def add_listener(self, listener: Callable[[set[str]], None]) -> None:
+        """listener(nomes) é chamado após cada reload que adiciona, remove ou altera organizações."""
+        self._listeners.append(listener)
+
+    def reload(self) -> dict[str, list[str]]:
+        """Relê a configuração e troca o mapa de organizações; retorna o que mudou."""
+        with self._reload_lock:
+            current = self._organizations
+            organizations = self._load(current)
+            if organizations is None:
+                raise OrganizationConfigError("Nenhuma configuração de organizações pôde ser lida")
+            self._organizations = organizations
+        changes = {
+            "added": sorted(organizations.keys() - current.keys()),
+            "removed": sorted(current.keys() - organizations.keys()),
+            "changed": sorted(
+                name for name in organizations.keys() & current.keys() if organizations[name] != current[name]
+            ),
+        }
+        names = {name for group in changes.values() for name in group}
+        if not names:
+            return changes
+        logger.info("Organizações recarregadas: %s", changes)
+        for listener in list(self._listeners):
+            try:
+                listener(names)
+            except Exception as e:
+                logger.warning("Erro ao aplicar a nova configuração de organizações: %s", e)
+        return changes
+
+    def config_changed(self) -> bool:
+        """O arquivo de configuração mudou (ou surgiu) desde a última leitura."""
+        if self._source == _ENV_SOURCE:
+            return False
+        path = next((p for p in self._config_paths() if p.exists()), None)
+        if path is None:
+            return False
+        try:
+            return path != self._source or self._file_signature(path) != self._signature
+        except OSError:
+            return False
+
+    def start_watcher(self, interval: int = TENANTS_CONFIG_WATCH_SECONDS) -> None:
+        """Thread que recarrega a configuração quando o arquivo muda (interval <= 0 desativa)."""
+        if interval <= 0 or (self._watcher is not None and self._watcher.is_alive()):
+            return
+        self._watcher_stop.clear()
+
+        def loop() -> None:
+            while not self._watcher_stop.wait(interval):
+                if not self.config_changed():
+                    continue
+                try:
+                    self.reload()
+                except Exception as e:
+                    logger.warning("Falha ao recarregar as organizações: %s", e)
+
+        self._watcher = threading.Thread(target=loop, name="organizations-config-watcher", daemon=True)
+        self._watcher.start()
+
+    def stop_watcher(self) -> None:
+        """Encerra a thread do watcher (shutdown)."""
+        self._watcher_stop.set()
+        if self._watcher is not None:
+            self._watcher.join(timeout=5)
+            self._watcher = None
 
     def get_organization(self, org_name: str) -> Optional[OrganizationSettings]:
         return self._organizations.get(org_name)
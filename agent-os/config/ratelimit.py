@@ -0,0 +1,83 @@
+"""
+Limites de taxa locais: token bucket e estimativa barata de tokens.
+Compartilhado pelo pipeline de embeddings (knowledge.embedding_pipeline: RPM/TPM por organização)
+e pelo orçamento de tokens dos modelos (agents.core.token_usage: tokens/min por tenant).
+"""
+import asyncio
+import threading
+import time
+from typing import Optional
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimativa barata de tokens (~4 caracteres por token)."""
+    return len(text) // 4 + 1
+
+
+class TokenBucket:
+    """Token bucket thread-safe: `rate_per_minute` unidades por minuto, rajada até `capacity`."""
+
+    def __init__(self, rate_per_minute: int, capacity: Optional[int] = None) -> None:
+        self.rate = rate_per_minute / 60.0
+        self.capacity = float(capacity or rate_per_minute)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def _try_take(self, amount: float) -> float:
+        """Retira `amount` se houver saldo (retorna 0) ou retorna quantos segundos esperar."""
+        with self._lock:
+            self._refill()
+            if self._tokens >= amount:
+                self._tokens -= amount
+                return 0.0
+            return (amount - self._tokens) / self.rate
+
+    def acquire(self, amount: float = 1.0) -> None:
+        """Bloqueia até haver `amount` unidades disponíveis (sem efeito se rate <= 0)."""
+        if self.rate <= 0:
+            return
+        amount = min(amount, self.capacity)
+        while (wait := self._try_take(amount)) > 0:
+            time.sleep(wait)
+
+    async def aacquire(self, amount: float = 1.0) -> None:
+        """Como acquire, sem bloquear o event loop."""
+        if self.rate <= 0:
+            return
+        amount = min(amount, self.capacity)
+        while (wait := self._try_take(amount)) > 0:
+            await asyncio.sleep(wait)
+
+    def consume(self, amount: float) -> None:
+        """Ajusta o saldo sem esperar (pode ficar negativo; negativo = devolução de unidades)."""
+        if self.rate <= 0:
+            return
+        with self._lock:
+            self._refill()
+            self._tokens = min(self.capacity, self._tokens - amount)
+
+
+class RateLimiter:
+    """Limites de uma organização: buckets de RPM/TPM (0 = sem limite) e pausa após um 429."""
+
+    def __init__(self, rpm: int = 0, tpm: int = 0) -> None:
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def pause(self, seconds: float) -> None:
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    def acquire(self, tokens: int) -> None:
+        while (delay := self._paused_until - time.monotonic()) > 0:
+            time.sleep(delay)
+        self.requests.acquire(1)
+        self.tokens.acquire(tokens)
@@ -4,10 +4,13 @@ Database Module
 Database connection utilities.
 """
 
+from db.engine import dispose_engines, get_engine
 from db.session import get_postgres_db
 from db.url import db_url
 
 __all__ = [
     "db_url",
+    "dispose_engines",
+    "get_engine",
     "get_postgres_db",
 ]
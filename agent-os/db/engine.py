@@ -0,0 +1,109 @@
+"""
+Database Engine
+---------------
+Engine SQLAlchemy compartilhado por processo (um pool de conexões por URL).
+PostgresDb do AgentOS, agentes e time, PgVector da Knowledge, cache de embeddings e contabilização
+de tokens usam o mesmo engine; conexões por processo = DB_POOL_SIZE + DB_MAX_OVERFLOW.
+Dimensione para que (workers uvicorn x pods x conexões por processo) caiba no max_connections.
+Modo PgBouncer (DB_PGBOUNCER, transaction pooling): cada transação pode cair em outra conexão do
+servidor, então o psycopg não prepara statements no servidor (prepare_threshold=None), nada é
+enviado como parâmetro de startup e o statement_timeout vai por transação (SET LOCAL). DDL e
+manutenção que dependem de sessão usam get_maintenance_engine (conexão direta, se configurada).
+"""
+
+import logging
+import threading
+from os import getenv
+
+from agno.db.utils import json_serializer
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.pool import NullPool
+
+from db.url import DB_PGBOUNCER, db_direct_url, db_url
+
+logger = logging.getLogger(__name__)
+
+# Conexões mantidas no pool e extras sob pico (fechadas ao devolver)
+DB_POOL_SIZE = int(getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(getenv("DB_MAX_OVERFLOW", "10"))
+# Espera por uma conexão livre antes de erro (segundos)
+DB_POOL_TIMEOUT = float(getenv("DB_POOL_TIMEOUT", "30"))
+# Recicla conexões mais antigas que isso (segundos; -1 desativa)
+DB_POOL_RECYCLE = int(getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+# statement_timeout das conexões (ms; 0 = padrão do servidor)
+DB_STATEMENT_TIMEOUT_MS = int(getenv("DB_STATEMENT_TIMEOUT_MS", "0"))
+
+# Conexão direta ao PostgreSQL para manutenção, separada do PgBouncer
+MAINTENANCE_DIRECT = DB_PGBOUNCER and db_direct_url != db_url
+
+_engines: dict[str, Engine] = {}
+_lock = threading.Lock()
+
+
+def _set_local_statement_timeout(conn: Connection) -> None:
+    # Em AUTOCOMMIT não há bloco de transação para o SET LOCAL
+    if conn.get_execution_options().get("isolation_level") != "AUTOCOMMIT":
+        conn.exec_driver_sql(f"SET LOCAL statement_timeout = {DB_STATEMENT_TIMEOUT_MS}")
+
+
+def _create_engine(url: str) -> Engine:
+    # Manutenção direta: conexões raras e longas (CREATE INDEX CONCURRENTLY), sem pool
+    if MAINTENANCE_DIRECT and url == db_direct_url:
+        return create_engine(url, poolclass=NullPool, json_serializer=json_serializer)
+    pgbouncer = DB_PGBOUNCER and url == db_url
+    connect_args = {}
+    if pgbouncer:
+        connect_args["prepare_threshold"] = None
+    elif DB_STATEMENT_TIMEOUT_MS > 0:
+        connect_args["options"] = f"-c statement_timeout={DB_STATEMENT_TIMEOUT_MS}"
+    engine = create_engine(
+        url,
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT,
+        pool_recycle=DB_POOL_RECYCLE,
+        pool_pre_ping=DB_POOL_PRE_PING,
+        # Mesmo serializer que o PostgresDb usa quando cria o próprio engine (colunas JSON)
+        json_serializer=json_serializer,
+        connect_args=connect_args,
+    )
+    if pgbouncer and DB_STATEMENT_TIMEOUT_MS > 0:
+        event.listen(engine, "begin", _set_local_statement_timeout)
+    return engine
+
+
+def get_engine(url: str = db_url) -> Engine:
+    """Engine do processo para a URL (criado no primeiro uso; a conexão só abre sob demanda)."""
+    with _lock:
+        engine = _engines.get(url)
+        if engine is None:
+            engine = _engines[url] = _create_engine(url)
+            logger.info(
+                "Engine PostgreSQL criado (pool_size=%s, max_overflow=%s)", DB_POOL_SIZE, DB_MAX_OVERFLOW
+            )
+        return engine
+
+
+def get_maintenance_engine(default: Engine) -> Engine:
+    """
+    Engine para DDL e manutenção (CREATE INDEX CONCURRENTLY, VACUUM, SET de sessão): a conexão direta
+    em modo PgBouncer com DB_DIRECT_HOST definido; senão `default` (o engine do chamador).
+    """
+    if MAINTENANCE_DIRECT:
+        return get_engine(db_direct_url)
+    return default
+
+
+def maintenance_session_state() -> bool:
+    """Se a conexão de manutenção mantém estado de sessão (SET) entre comandos em AUTOCOMMIT."""
+    return not DB_PGBOUNCER or MAINTENANCE_DIRECT
+
+
+def dispose_engines() -> None:
+    """Fecha os pools (shutdown)."""
+    with _lock:
+        for engine in _engines.values():
+            engine.dispose()
+        _engines.clear()
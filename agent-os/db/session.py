@@ -2,10 +2,12 @@
 Database Session
 ----------------
 PostgreSQL database connection for AgentOS.
+Todas as instâncias usam o engine compartilhado do processo (db.engine).
 """
 
 from agno.db.postgres import PostgresDb
 
+from db.engine import get_engine
 from db.url import db_url
 
 DB_ID = "agentos-db"
@@ -21,5 +23,5 @@ def get_postgres_db(contents_table: str | None = None) -> PostgresDb:
         Configured PostgresDb instance.
     """
     if contents_table is not None:
-        return PostgresDb(id=DB_ID, db_url=db_url, knowledge_table=contents_table)
-    return PostgresDb(id=DB_ID, db_url=db_url)
+        return PostgresDb(id=DB_ID, db_url=db_url, db_engine=get_engine(), knowledge_table=contents_table)
+    return PostgresDb(id=DB_ID, db_url=db_url, db_engine=get_engine())
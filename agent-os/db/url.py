@@ -2,21 +2,34 @@
 Database URL
 ------------
 Build database connection URL from environment variables.
+Com DB_PGBOUNCER=true, DB_HOST/DB_PORT apontam para o PgBouncer (transaction pooling) e
+DB_DIRECT_HOST/DB_DIRECT_PORT, se definidos, para o PostgreSQL direto (DDL e manutenção).
 """
 
 from os import getenv
 from urllib.parse import quote
 
+# PgBouncer em transaction pooling na frente do banco: sem prepared statements no servidor nem
+# estado de sessão (ver db.engine)
+DB_PGBOUNCER = getenv("DB_PGBOUNCER", "false").lower() in ("1", "true", "yes")
 
-def build_db_url() -> str:
-    """Build database URL from environment variables."""
+
+def build_db_url(host: str | None = None, port: str | None = None) -> str:
+    """Build database URL from environment variables (host/port override DB_HOST/DB_PORT)."""
     driver = getenv("DB_DRIVER", "postgresql+psycopg")
     user = getenv("DB_USER", "ai")
     password = quote(getenv("DB_PASS", "ai"), safe="")
-    host = getenv("DB_HOST", "localhost")
-    port = getenv("DB_PORT", "5432")
+    host = host or getenv("DB_HOST", "localhost")
+    port = port or getenv("DB_PORT", "5432")
     database = getenv("DB_DATABASE", "ai")
     return f"{driver}://{user}:{password}@{host}:{port}/{database}"
 
 
+def build_direct_db_url() -> str:
+    """URL do PostgreSQL sem PgBouncer (DB_DIRECT_HOST/DB_DIRECT_PORT, porta padrão 5432); db_url se não definidos."""
+    host = getenv("DB_DIRECT_HOST") or None
+    return build_db_url(host, getenv("DB_DIRECT_PORT") or ("5432" if host else None))
+
+
 db_url = build_db_url()
+db_direct_url = build_direct_db_url()
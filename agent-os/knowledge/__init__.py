@@ -4,54 +4,74 @@ Substitui o RAG customizado (Azure Search); os agentes usam knowledge= e search_
 """
 from os import getenv
 
-from agno.knowledge.knowledge import Knowledge
-from agno.vectordb.pgvector import PgVector
-
-from db import get_postgres_db
+from config.model_registry import TenantAzureOpenAIEmbedder
+from config.organization_config import organization_config_manager
+from db import get_engine, get_postgres_db
 from db.url import db_url
+from knowledge.base import KnowledgeBase
+from knowledge.embedding_cache import CachedEmbedder, get_embedding_cache
+from knowledge.hybrid import KNOWLEDGE_SEARCH_TYPE
+from knowledge.reranker import build_reranker
+from knowledge.vector_db import KnowledgePgVector
+from knowledge.vector_index import build_vector_index
 
 # Tabela de vetores no PostgreSQL (pgvector)
 KNOWLEDGE_VECTOR_TABLE = "knowledge_vectors"
 KNOWLEDGE_CONTENTS_TABLE = "knowledge_contents"
 
 # Singleton: uma única instância de Knowledge para todos os agentes (evita "Duplicate knowledge instances")
-_knowledge: Knowledge | None = None
+_knowledge: KnowledgeBase | None = None
 
 
-def _get_embedder():
-    """Embedder: Azure OpenAI se configurado, senão OpenAI.
+def _get_base_embedder():
+    """Embedder: Azure OpenAI do ambiente, senão OpenAI (ou, sem OPENAI_API_KEY, o Azure das organizações).
     Azure: o valor de AZURE_OPENAI_EMBEDDING_DEPLOYMENT deve ser o nome exato do
     deployment no recurso (Portal Azure > OpenAI > Deployments). Erro 404 DeploymentNotFound
-    = nome diferente ou deployment ainda não criado.
+    = nome diferente ou deployment ainda não criado. Com X-Tenant, usa o embedding_deployment
+    e o cliente da organização (config.model_registry).
     """
-    if getenv("AZURE_OPENAI_API_KEY") and getenv("AZURE_OPENAI_ENDPOINT"):
-        from agno.knowledge.embedder.azure_openai import AzureOpenAIEmbedder
+    if (getenv("AZURE_OPENAI_API_KEY") and getenv("AZURE_OPENAI_ENDPOINT")) or (
+        not getenv("OPENAI_API_KEY") and organization_config_manager.get_all_organizations()
+    ):
         deployment = getenv("AZURE_OPENAI_EMBEDDING_DEPLOYMENT", "text-embedding")
-        return AzureOpenAIEmbedder(
+        return TenantAzureOpenAIEmbedder(
             id=deployment,
             api_key=getenv("AZURE_OPENAI_API_KEY"),
-            azure_endpoint=getenv("AZURE_OPENAI_ENDPOINT").rstrip("/"),
+            azure_endpoint=(getenv("AZURE_OPENAI_ENDPOINT") or "").rstrip("/") or None,
             api_version=getenv("AZURE_OPENAI_API_VERSION", "2024-08-01-preview"),
         )
     from agno.knowledge.embedder.openai import OpenAIEmbedder
     return OpenAIEmbedder(id="text-embedding")
 
 
-def get_knowledge() -> Knowledge:
+def _get_embedder() -> CachedEmbedder:
+    """Embedder real envolvido pelo cache de embeddings (LRU + PostgreSQL)."""
+    return CachedEmbedder(embedder=_get_base_embedder(), cache=get_embedding_cache())
+
+
+def get_knowledge() -> KnowledgeBase:
     """
     Retorna a mesma instância do Agno Knowledge (singleton): PgVector + contents_db (PostgreSQL).
     Vários agentes usam a mesma base; uma única instância evita erro "Duplicate knowledge instances".
+    Re-ingestão incremental: documentos identificados pelo nome e chunks pelo hash do conteúdo.
+    Índice ANN (HNSW/IVFFlat) configurado por ambiente em knowledge.vector_index; busca híbrida
+    (full-text + vetorial com RRF) por padrão, ver knowledge.hybrid. Reranker local opcional
+    (KNOWLEDGE_RERANKER), ver knowledge.reranker.
     """
     global _knowledge
     if _knowledge is None:
         embedder = _get_embedder()
-        vector_db = PgVector(
+        vector_db = KnowledgePgVector(
             table_name=KNOWLEDGE_VECTOR_TABLE,
             db_url=db_url,
+            db_engine=get_engine(),
             embedder=embedder,
+            vector_index=build_vector_index(),
+            search_type=KNOWLEDGE_SEARCH_TYPE,
+            reranker=build_reranker(),
         )
         contents_db = get_postgres_db(contents_table=KNOWLEDGE_CONTENTS_TABLE)
-        _knowledge = Knowledge(
+        _knowledge = KnowledgeBase(
             name="AgentOS Knowledge",
             description="Base de conhecimento (PgVector) para os agentes",
             vector_db=vector_db,
@@ -0,0 +1,138 @@
+"""
+Knowledge com identidade estável por documento.
+Uploads chegam em arquivos temp com nome aleatório; o Agno usa o caminho no content_hash,
+o que duplicaria o documento a cada reenvio. Aqui a identidade é o nome original do arquivo
+e o hash do conteúdo do arquivo permite pular reenvios idênticos sem parse nem embedding.
+O tenant do contexto entra no content_hash: o mesmo nome em tenants diferentes são documentos distintos.
+Remoção e substituição (DELETE/PUT /knowledge/{content_id}) só enxergam documentos do próprio tenant.
+PDF/DOCX são parseados no pool de processos de knowledge.parsing (timeout e limite de memória).
+"""
+import asyncio
+import hashlib
+import logging
+from io import BytesIO
+from pathlib import Path
+from typing import Optional, Union
+
+from agno.knowledge.content import Content, ContentStatus
+from agno.knowledge.document import Document
+from agno.knowledge.knowledge import Knowledge
+from agno.knowledge.reader import Reader
+from agno.utils.string import generate_id
+
+from knowledge.parsing import PARSE_POOL_EXTENSIONS, DocumentParseError, get_parse_pool
+from knowledge.tenancy import TENANT_METADATA_KEY, current_tenant_key
+
+logger = logging.getLogger(__name__)
+
+# Chave em Content.metadata com o sha256 do arquivo ingerido
+FILE_HASH_METADATA_KEY = "file_sha256"
+_HASH_BLOCK_BYTES = 1024 * 1024
+
+
+def file_sha256(path: Path) -> str:
+    """sha256 do arquivo, lido em blocos."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while block := f.read(_HASH_BLOCK_BYTES):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class KnowledgeBase(Knowledge):
+    """Knowledge do AgentOS: content_hash por nome do documento e skip por hash do arquivo."""
+
+    def _build_content_hash(self, content: Content) -> str:
+        if content.path and content.name:
+            tenant = current_tenant_key()
+            parts = (
+                (["tenant", tenant] if tenant else [])
+                + ["file", content.name]
+                + ([content.description] if content.description else [])
+            )
+            return hashlib.sha256(":".join(parts).encode()).hexdigest()
+        return super()._build_content_hash(content)
+
+    def _read(
+        self,
+        reader: Reader,
+        source: Union[Path, str, BytesIO],
+        name: Optional[str] = None,
+        password: Optional[str] = None,
+    ) -> list[Document]:
+        pool = get_parse_pool()
+        if pool is not None and isinstance(source, Path) and source.suffix.lower() in PARSE_POOL_EXTENSIONS:
+            return pool.parse(reader, source, name, password)
+        return super()._read(reader, source, name=name, password=password)
+
+    async def _aread(
+        self,
+        reader: Reader,
+        source: Union[Path, str, BytesIO],
+        name: Optional[str] = None,
+        password: Optional[str] = None,
+    ) -> list[Document]:
+        pool = get_parse_pool()
+        if pool is not None and isinstance(source, Path) and source.suffix.lower() in PARSE_POOL_EXTENSIONS:
+            return await asyncio.to_thread(pool.parse, reader, source, name, password)
+        return await super()._aread(reader, source, name=name, password=password)
+
+    def content_id_for(self, name: str) -> str:
+        """Id em knowledge_contents do documento com este nome (mesmo cálculo do insert)."""
+        return generate_id(self._build_content_hash(Content(name=name, path=name)))
+
+    def get_tenant_content(self, content_id: str) -> Content | None:
+        """Conteúdo do tenant atual com este id (None se não existir ou for de outro tenant)."""
+        content = self.get_content_by_id(content_id)
+        if content is None or (content.metadata or {}).get(TENANT_METADATA_KEY) != current_tenant_key():
+            return None
+        return content
+
+    def delete_document(self, content_id: str) -> bool:
+        """
+        Remove os vetores do documento (um DELETE por content_id na tabela do tenant) e a linha em
+        knowledge_contents. Retorna False se o documento não existe para o tenant atual.
+        """
+        if self.get_tenant_content(content_id) is None:
+            return False
+        if not self.vector_db.delete_by_content_id(content_id):
+            raise RuntimeError(f"Falha ao remover os vetores de {content_id}")
+        self.contents_db.delete_knowledge_content(content_id)
+        logger.info("Documento %s removido", content_id)
+        return True
+
+    def insert_file(self, path: Path, name: str) -> bool:
+        """
+        Insere (ou atualiza incrementalmente) o arquivo como o documento `name`.
+        Retorna False quando o mesmo arquivo já foi ingerido com sucesso (nada a fazer).
+        Levanta RuntimeError se a ingestão falhar.
+        """
+        file_hash = file_sha256(path)
+        content_id = self.content_id_for(name)
+        existing = self.get_content_by_id(content_id)
+        if (
+            existing is not None
+            and existing.status == ContentStatus.COMPLETED
+            and (existing.metadata or {}).get(FILE_HASH_METADATA_KEY) == file_hash
+        ):
+            logger.info("Documento %s inalterado (sha256 %s); ingestão ignorada", name, file_hash[:12])
+            return False
+
+        metadata = {FILE_HASH_METADATA_KEY: file_hash}
+        tenant = current_tenant_key()
+        if tenant:
+            metadata[TENANT_METADATA_KEY] = tenant
+        try:
+            self.insert(path=str(path), name=name, metadata=metadata)
+        except DocumentParseError as e:
+            # O insert do Agno não trata erros do reader: marca o conteúdo como falho
+            content = self.get_content_by_id(content_id)
+            if content is not None:
+                content.status = ContentStatus.FAILED
+                content.status_message = str(e)
+                self._update_content(content)
+            raise
+        status, message = self.get_content_status(content_id)
+        if status == ContentStatus.FAILED:
+            raise RuntimeError(message or f"Falha ao ingerir {name}")
+        return True
@@ -0,0 +1,172 @@
+"""
+Catálogo de documentos da Knowledge (GET /knowledge): listagem de knowledge_contents por tenant.
+Paginação por keyset (cursor com o último created_at/id da página, sem OFFSET) e filtros por
+tipo de arquivo, status e data de upload; retorna só metadados (nunca o conteúdo dos chunks).
+Os índices compostos (tenant, [status|type,] created_at, id) são criados CONCURRENTLY, em
+background, na primeira listagem do processo.
+"""
+import base64
+import binascii
+import json
+import logging
+import threading
+from typing import Any
+
+from sqlalchemy import text
+
+from db.engine import get_maintenance_engine
+from knowledge.base import FILE_HASH_METADATA_KEY, TENANT_METADATA_KEY
+
+logger = logging.getLogger(__name__)
+
+MAX_PAGE_SIZE = 200
+
+# Mesmas expressões nos índices e nas consultas (senão o índice não é usado)
+_TENANT = f"COALESCE(metadata->>'{TENANT_METADATA_KEY}', '')"
+_CREATED = "COALESCE(created_at, 0)"
+_INDEXES = {
+    "tenant_created": f"linked_to, ({_TENANT}), ({_CREATED}) DESC, id DESC",
+    "tenant_status": f"linked_to, ({_TENANT}), status, ({_CREATED}) DESC, id DESC",
+    "tenant_type": f"linked_to, ({_TENANT}), type, ({_CREATED}) DESC, id DESC",
+}
+
+_indexes_checked = False
+_indexes_lock = threading.Lock()
+
+
+class InvalidCursor(ValueError):
+    """Cursor de paginação malformado."""
+
+
+def encode_cursor(created_at: int, content_id: str) -> str:
+    return base64.urlsafe_b64encode(json.dumps([created_at, content_id]).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[int, str]:
+    try:
+        created_at, content_id = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        return int(created_at), str(content_id)
+    except (binascii.Error, ValueError, TypeError) as e:
+        raise InvalidCursor("Cursor inválido") from e
+
+
+class DocumentCatalog:
+    """Consultas de listagem sobre a tabela knowledge_contents do contents_db."""
+
+    def __init__(self, contents_db: Any, linked_to: str) -> None:
+        self.contents_db = contents_db
+        self.linked_to = linked_to
+        self.table_name = contents_db.knowledge_table_name
+        self.table = f'"{contents_db.db_schema}"."{self.table_name}"'
+
+    def ensure_indexes(self) -> None:
+        """Cria os índices do catálogo que faltarem (CONCURRENTLY; tabela inexistente = nada a fazer)."""
+        engine = get_maintenance_engine(self.contents_db.db_engine)
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            if conn.execute(text("SELECT to_regclass(:t)"), {"t": self.table}).scalar() is None:
+                return
+            for suffix, columns in _INDEXES.items():
+                name = f"idx_{self.table_name}_{suffix}"[:63]
+                conn.execute(text(f'CREATE INDEX CONCURRENTLY IF NOT EXISTS "{name}" ON {self.table} ({columns})'))
+        logger.info("Índices do catálogo de documentos prontos em %s", self.table)
+
+    def ensure_indexes_background(self) -> None:
+        """Na primeira listagem do processo, cria os índices em background (nova tentativa se falhar)."""
+        global _indexes_checked
+        with _indexes_lock:
+            if _indexes_checked:
+                return
+            _indexes_checked = True
+
+        def create() -> None:
+            global _indexes_checked
+            try:
+                self.ensure_indexes()
+            except Exception as e:
+                logger.warning("Não foi possível criar os índices do catálogo: %s", e)
+                with _indexes_lock:
+                    _indexes_checked = False
+
+        threading.Thread(target=create, name="knowledge-catalog-index", daemon=True).start()
+
+    def list(
+        self,
+        tenant: str | None,
+        file_type: str | None = None,
+        status: str | None = None,
+        created_from: int | None = None,
+        created_to: int | None = None,
+        limit: int = 50,
+        cursor: str | None = None,
+    ) -> dict[str, Any]:
+        """Página de documentos do tenant (mais recentes primeiro) e o cursor da próxima página."""
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
+        conditions = ["linked_to = :linked_to", f"{_TENANT} = :tenant"]
+        params: dict[str, Any] = {"linked_to": self.linked_to, "tenant": tenant or "", "limit": limit + 1}
+        if file_type:
+            conditions.append("type = :type")
+            params["type"] = file_type if file_type.startswith(".") else f".{file_type}"
+        if status:
+            conditions.append("status = :status")
+            params["status"] = status
+        if created_from is not None:
+            conditions.append(f"{_CREATED} >= :created_from")
+            params["created_from"] = created_from
+        if created_to is not None:
+            conditions.append(f"{_CREATED} < :created_to")
+            params["created_to"] = created_to
+        if cursor:
+            params["cursor_created"], params["cursor_id"] = decode_cursor(cursor)
+            conditions.append(f"({_CREATED}, id) < (:cursor_created, :cursor_id)")
+        sql = text(
+            f"""
+            SELECT id, name, description, type, size, status, status_message, metadata,
+                   {_CREATED} AS created_at, updated_at
+            FROM {self.table}
+            WHERE {" AND ".join(conditions)}
+            ORDER BY {_CREATED} DESC, id DESC
+            LIMIT :limit
+            """
+        )
+        with self.contents_db.db_engine.connect() as conn:
+            if conn.execute(text("SELECT to_regclass(:t)"), {"t": self.table}).scalar() is None:
+                return {"documents": [], "next_cursor": None}
+            rows = conn.execute(sql, params).fetchall()
+
+        documents = [self._row_to_dict(row) for row in rows[:limit]]
+        next_cursor = None
+        if len(rows) > limit:
+            last = rows[limit - 1]
+            next_cursor = encode_cursor(last.created_at, last.id)
+        return {"documents": documents, "next_cursor": next_cursor}
+
+    @staticmethod
+    def _row_to_dict(row: Any) -> dict[str, Any]:
+        metadata = dict(row.metadata or {})
+        return {
+            "content_id": row.id,
+            "name": row.name,
+            "description": row.description or None,
+            "type": row.type,
+            "size": row.size,
+            "status": row.status,
+            "status_message": row.status_message or None,
+            "file_sha256": metadata.pop(FILE_HASH_METADATA_KEY, None),
+            "metadata": {k: v for k, v in metadata.items() if k != TENANT_METADATA_KEY},
+            "created_at": row.created_at,
+            "updated_at": row.updated_at,
+        }
+
+
+_catalog: DocumentCatalog | None = None
+
+
+def get_document_catalog() -> DocumentCatalog:
+    """Catálogo da Knowledge do processo (singleton)."""
+    global _catalog
+    if _catalog is None:
+        from knowledge import get_knowledge
+
+        knowledge = get_knowledge()
+        _catalog = DocumentCatalog(knowledge.contents_db, knowledge.name)
+    return _catalog
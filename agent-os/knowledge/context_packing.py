@@ -0,0 +1,189 @@
+"""
+Empacotamento do contexto RAG: etapa entre a busca na Knowledge e o agente.
+Os chunks retornados pela busca são deduplicados (conteúdo repetido ou contido em outro chunk),
+chunks adjacentes do mesmo documento são unidos (sem repetir a sobreposição) e o resultado
+preenche um orçamento de tokens por agente, contado com tokenizer local (tiktoken; sem ele,
+estimativa por caracteres). O trecho que não cabe inteiro é cortado no limite do orçamento.
+Usado como knowledge_retriever dos agentes/times (build_knowledge_retriever).
+"""
+import asyncio
+import inspect
+import logging
+from dataclasses import dataclass, field
+from functools import lru_cache
+from os import getenv
+from typing import Any, Callable, Optional
+
+from agno.knowledge.document import Document
+
+from config.ratelimit import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+# Orçamento de tokens do contexto RAG por busca: agente (Content Creator) e líder de time
+KNOWLEDGE_CONTEXT_TOKENS_AGENT = int(getenv("KNOWLEDGE_CONTEXT_TOKENS_AGENT", "4000"))
+KNOWLEDGE_CONTEXT_TOKENS_TEAM = int(getenv("KNOWLEDGE_CONTEXT_TOKENS_TEAM", "2000"))
+# Chunks buscados = num_documents * KNOWLEDGE_CONTEXT_CANDIDATES (o empacotamento escolhe o que cabe)
+KNOWLEDGE_CONTEXT_CANDIDATES = int(getenv("KNOWLEDGE_CONTEXT_CANDIDATES", "2"))
+# Encoding do tiktoken (o200k_base: gpt-4o / gpt-4.1)
+KNOWLEDGE_CONTEXT_ENCODING = getenv("KNOWLEDGE_CONTEXT_ENCODING", "o200k_base")
+# Sobra mínima do orçamento para incluir um trecho cortado
+_MIN_TRUNCATED_TOKENS = 100
+# Maior sobreposição procurada entre o fim de um chunk e o início do seguinte (caracteres)
+_MAX_OVERLAP_CHARS = 2000
+
+
+@lru_cache(maxsize=1)
+def _encoding() -> Any:
+    try:
+        import tiktoken
+
+        return tiktoken.get_encoding(KNOWLEDGE_CONTEXT_ENCODING)
+    except Exception as e:
+        logger.warning("tiktoken indisponível (%s); contagem de tokens estimada por caracteres", e)
+        return None
+
+
+def count_tokens(text: str) -> int:
+    encoding = _encoding()
+    if encoding is None:
+        return estimate_tokens(text)
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def truncate_tokens(text: str, max_tokens: int) -> str:
+    encoding = _encoding()
+    if encoding is None:
+        return text[: max_tokens * 4]
+    return encoding.decode(encoding.encode(text, disallowed_special=())[:max_tokens])
+
+
+def _overlap(left: str, right: str) -> int:
+    """Tamanho do maior sufixo de `left` que é prefixo de `right`."""
+    for size in range(min(len(left), len(right), _MAX_OVERLAP_CHARS), 0, -1):
+        if left.endswith(right[:size]):
+            return size
+    return 0
+
+
+@dataclass
+class _Passage:
+    """Trecho contínuo de um documento (um ou mais chunks adjacentes)."""
+
+    rank: int
+    name: Optional[str]
+    page: Any
+    chunks: list[int]
+    content: str
+    meta_data: dict[str, Any] = field(default_factory=dict)
+
+
+def _chunk_number(doc: Document) -> Optional[int]:
+    chunk = (doc.meta_data or {}).get("chunk")
+    return chunk if isinstance(chunk, int) else None
+
+
+def merge_chunks(documents: list[Document]) -> list[_Passage]:
+    """Deduplica e une chunks adjacentes; a ordem é a do melhor chunk de cada trecho."""
+    passages: list[_Passage] = []
+    seen: set[str] = set()
+    for rank, doc in enumerate(documents):
+        content = (doc.content or "").strip()
+        if not content or content in seen:
+            continue
+        seen.add(content)
+        meta = doc.meta_data or {}
+        passages.append(_Passage(rank, doc.name, meta.get("page"), [], content, dict(meta)))
+        chunk = _chunk_number(doc)
+        if chunk is not None:
+            passages[-1].chunks.append(chunk)
+
+    # Chunks contidos em outro trecho (janelas sobrepostas, páginas repetidas)
+    passages = [
+        p
+        for p in passages
+        if not any(len(o.content) > len(p.content) and p.content in o.content for o in passages)
+    ]
+
+    # Une chunks consecutivos do mesmo documento/página, mantendo a posição do mais relevante
+    by_position = sorted(
+        (p for p in passages if p.chunks),
+        key=lambda p: (str(p.name), str(p.page), p.chunks[0]),
+    )
+    merged: list[_Passage] = [p for p in passages if not p.chunks]
+    for passage in by_position:
+        previous = merged[-1] if merged and merged[-1].chunks else None
+        if (
+            previous is not None
+            and previous.name == passage.name
+            and previous.page == passage.page
+            and passage.chunks[0] == previous.chunks[-1] + 1
+        ):
+            size = _overlap(previous.content, passage.content)
+            previous.content = previous.content + ("" if size else "\n") + passage.content[size:]
+            previous.chunks.extend(passage.chunks)
+            previous.rank = min(previous.rank, passage.rank)
+        else:
+            merged.append(passage)
+    return sorted(merged, key=lambda p: p.rank)
+
+
+def pack_documents(documents: list[Document], token_budget: int) -> list[dict[str, Any]]:
+    """Trechos (name, meta_data, content) na ordem de relevância até esgotar o orçamento de tokens."""
+    packed: list[dict[str, Any]] = []
+    remaining = token_budget
+    for passage in merge_chunks(documents):
+        tokens = count_tokens(passage.content)
+        content = passage.content
+        if tokens > remaining:
+            if remaining < _MIN_TRUNCATED_TOKENS and packed:
+                continue
+            content = truncate_tokens(content, remaining)
+            tokens = remaining
+        meta_data = {k: v for k, v in passage.meta_data.items() if k != "chunk"}
+        if passage.chunks:
+            meta_data["chunks"] = passage.chunks
+        packed.append({"name": passage.name, "meta_data": meta_data, "content": content})
+        remaining -= tokens
+        if remaining <= 0:
+            break
+    logger.debug(
+        "Contexto RAG: %d chunk(s) -> %d trecho(s), %d/%d tokens",
+        len(documents),
+        len(packed),
+        token_budget - remaining,
+        token_budget,
+    )
+    return packed
+
+
+def _called_from_coroutine() -> bool:
+    """Se quem chamou o knowledge_retriever é uma corrotina (caminho assíncrono do Agno, que aguarda o retorno)."""
+    frame = inspect.currentframe()
+    caller = frame.f_back.f_back if frame and frame.f_back else None
+    return bool(caller and caller.f_code.co_flags & inspect.CO_COROUTINE)
+
+
+def build_knowledge_retriever(token_budget: int) -> Callable[..., Any]:
+    """
+    knowledge_retriever (Agent/Team) que busca candidatos na Knowledge e empacota no orçamento.
+    O Agno tem um único knowledge_retriever: o caminho assíncrono (aget_relevant_docs_from_knowledge)
+    aguarda o retorno se for awaitable, o síncrono usa o retorno direto. Chamado de uma corrotina,
+    a busca (embedding da consulta, SQL, reranking) roda em thread, fora do event loop; chamado de
+    código síncrono (inclusive dentro de um loop), retorna a lista pronta.
+    """
+
+    def retrieve(query: str, num_documents: Optional[int], filters: Any) -> list[dict[str, Any]] | None:
+        from knowledge import get_knowledge
+
+        knowledge = get_knowledge()
+        limit = (num_documents or knowledge.max_results) * max(1, KNOWLEDGE_CONTEXT_CANDIDATES)
+        documents = knowledge.search(query=query, max_results=limit, filters=filters)
+        return pack_documents(documents, token_budget) or None
+
+    def knowledge_retriever(query: str, num_documents: Optional[int] = None, filters: Any = None, **kwargs: Any) -> Any:
+        if _called_from_coroutine():
+            return asyncio.to_thread(retrieve, query, num_documents, filters)
+        return retrieve(query, num_documents, filters)
+
+    return knowledge_retriever
@@ -0,0 +1,265 @@
+"""
+Cache de embeddings compartilhado entre ingestão e busca.
+CachedEmbedder envolve o embedder real (Azure OpenAI / OpenAI) com dois níveis de cache:
+LRU em memória (por processo) e tabela no PostgreSQL (entre processos e restarts),
+ambos indexados por hash de (modelo, dimensões, texto). Falhas do cache nunca impedem o embedding.
+"""
+import asyncio
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from os import getenv
+from typing import Any, Optional
+
+from agno.knowledge.embedder.base import Embedder
+from pgvector.sqlalchemy import Vector
+from sqlalchemy import Column, DateTime, MetaData, String, Table, create_engine, func, select
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+EMBEDDING_CACHE_TABLE = "embedding_cache"
+EMBEDDING_CACHE_SCHEMA = "ai"
+# Entradas no LRU em memória (1536 floats ~ 12 KB cada)
+EMBEDDING_CACHE_LRU_SIZE = int(getenv("EMBEDDING_CACHE_LRU_SIZE", "5000"))
+# Desliga o nível PostgreSQL (mantém apenas o LRU)
+EMBEDDING_CACHE_DB_ENABLED = getenv("EMBEDDING_CACHE_DB_ENABLED", "true").lower() in ("1", "true", "yes")
+
+
+class EmbeddingCache:
+    """LRU em memória + tabela embedding_cache (key, model, embedding)."""
+
+    def __init__(
+        self,
+        db_url: str | None = None,
+        db_engine: Engine | None = None,
+        max_entries: int = EMBEDDING_CACHE_LRU_SIZE,
+    ) -> None:
+        self._db_url = db_url
+        self._engine = db_engine
+        self._max_entries = max_entries
+        self._lru: OrderedDict[str, list[float]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._table: Table | None = None
+        self._db_disabled = not EMBEDDING_CACHE_DB_ENABLED or (db_url is None and db_engine is None)
+        self._stats = {"memory_hits": 0, "db_hits": 0, "misses": 0, "db_errors": 0}
+
+    # --- LRU ---
+
+    def _lru_get(self, key: str) -> list[float] | None:
+        with self._lock:
+            value = self._lru.get(key)
+            if value is not None:
+                self._lru.move_to_end(key)
+            return value
+
+    def _lru_put(self, key: str, value: list[float]) -> None:
+        with self._lock:
+            self._lru[key] = value
+            self._lru.move_to_end(key)
+            while len(self._lru) > self._max_entries:
+                self._lru.popitem(last=False)
+
+    # --- PostgreSQL ---
+
+    def _get_table(self) -> Table | None:
+        if self._db_disabled:
+            return None
+        if self._table is None:
+            table = Table(
+                EMBEDDING_CACHE_TABLE,
+                MetaData(schema=EMBEDDING_CACHE_SCHEMA),
+                Column("key", String, primary_key=True),
+                Column("model", String, nullable=False),
+                Column("embedding", Vector(), nullable=False),
+                Column("created_at", DateTime(timezone=True), server_default=func.now()),
+            )
+            try:
+                if self._engine is None:
+                    self._engine = create_engine(self._db_url, pool_pre_ping=True)
+                table.create(self._engine, checkfirst=True)
+            except Exception:
+                # Sem tabela, o cache segue só em memória neste processo
+                self._db_disabled = True
+                raise
+            self._table = table
+        return self._table
+
+    def _count(self, **deltas: int) -> None:
+        with self._lock:
+            for name, delta in deltas.items():
+                self._stats[name] += delta
+
+    def _db_get_many(self, keys: list[str]) -> dict[str, list[float]]:
+        try:
+            table = self._get_table()
+            if table is None or not keys:
+                return {}
+            with self._engine.connect() as conn:
+                rows = conn.execute(select(table.c.key, table.c.embedding).where(table.c.key.in_(keys)))
+                return {row.key: list(row.embedding) for row in rows}
+        except Exception as e:
+            self._count(db_errors=1)
+            logger.warning("Cache de embeddings (PostgreSQL) indisponível na leitura: %s", e)
+            return {}
+
+    def _db_put_many(self, model: str, items: dict[str, list[float]]) -> None:
+        try:
+            table = self._get_table()
+            if table is None or not items:
+                return
+            stmt = postgresql.insert(table).on_conflict_do_nothing(index_elements=["key"])
+            with self._engine.begin() as conn:
+                conn.execute(stmt, [{"key": k, "model": model, "embedding": v} for k, v in items.items()])
+        except Exception as e:
+            self._count(db_errors=1)
+            logger.warning("Cache de embeddings (PostgreSQL) indisponível na escrita: %s", e)
+
+    # --- API ---
+
+    def get_many(self, keys: list[str]) -> dict[str, list[float]]:
+        """Busca no LRU e, para o que faltar, no PostgreSQL (promovendo ao LRU)."""
+        found: dict[str, list[float]] = {}
+        missing: list[str] = []
+        for key in keys:
+            value = self._lru_get(key)
+            if value is not None:
+                found[key] = value
+            else:
+                missing.append(key)
+        self._count(memory_hits=len(found))
+        if missing:
+            from_db = self._db_get_many(missing)
+            for key, value in from_db.items():
+                self._lru_put(key, value)
+            found.update(from_db)
+            self._count(db_hits=len(from_db), misses=len(missing) - len(from_db))
+        return found
+
+    def put_many(self, model: str, items: dict[str, list[float]]) -> None:
+        items = {k: v for k, v in items.items() if v}
+        for key, value in items.items():
+            self._lru_put(key, value)
+        self._db_put_many(model, items)
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+            lru_entries = len(self._lru)
+        lookups = stats["memory_hits"] + stats["db_hits"] + stats["misses"]
+        hits = stats["memory_hits"] + stats["db_hits"]
+        return {
+            **stats,
+            "lru_entries": lru_entries,
+            "hit_ratio": round(hits / lookups, 4) if lookups else None,
+        }
+
+
+@dataclass
+class CachedEmbedder(Embedder):
+    """Embedder que consulta o EmbeddingCache antes de chamar o embedder real."""
+
+    embedder: Optional[Embedder] = None
+    cache: Optional[EmbeddingCache] = field(default=None, repr=False)
+
+    def __post_init__(self):
+        if self.embedder is None:
+            raise ValueError("CachedEmbedder requer um embedder")
+        if self.cache is None:
+            self.cache = EmbeddingCache()
+        self.dimensions = self.embedder.dimensions
+        self.enable_batch = self.embedder.enable_batch
+        self.batch_size = self.embedder.batch_size
+
+    @property
+    def model_id(self) -> str:
+        # Embedder por tenant: o deployment da organização atual
+        deployment = getattr(self.embedder, "deployment", None)
+        return str(deployment or getattr(self.embedder, "id", type(self.embedder).__name__))
+
+    def cache_key(self, text: str) -> str:
+        raw = f"{self.model_id}:{self.dimensions}:{text}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    # --- Sync ---
+
+    def get_embedding(self, text: str) -> list[float]:
+        return self.get_embedding_and_usage(text)[0]
+
+    def get_embedding_and_usage(self, text: str) -> tuple[list[float], Optional[dict]]:
+        key = self.cache_key(text)
+        cached = self.cache.get_many([key]).get(key)
+        if cached is not None:
+            return cached, None
+        embedding, usage = self.embedder.get_embedding_and_usage(text)
+        self.cache.put_many(self.model_id, {key: embedding})
+        return embedding, usage
+
+    # --- Async ---
+
+    async def async_get_embedding(self, text: str) -> list[float]:
+        return (await self.async_get_embedding_and_usage(text))[0]
+
+    async def async_get_embedding_and_usage(self, text: str) -> tuple[list[float], Optional[dict]]:
+        key = self.cache_key(text)
+        cached = (await asyncio.to_thread(self.cache.get_many, [key])).get(key)
+        if cached is not None:
+            return cached, None
+        embedding, usage = await self.embedder.async_get_embedding_and_usage(text)
+        await asyncio.to_thread(self.cache.put_many, self.model_id, {key: embedding})
+        return embedding, usage
+
+    async def async_get_embeddings_batch_and_usage(
+        self, texts: list[str]
+    ) -> tuple[list[list[float]], list[Optional[dict]]]:
+        """Embeda em lote apenas os textos ausentes do cache, preservando a ordem de entrada."""
+        keys = [self.cache_key(text) for text in texts]
+        cached = await asyncio.to_thread(self.cache.get_many, keys)
+        missing = [i for i, key in enumerate(keys) if key not in cached]
+
+        computed: dict[int, tuple[list[float], Optional[dict]]] = {}
+        if missing:
+            missing_texts = [texts[i] for i in missing]
+            if hasattr(self.embedder, "async_get_embeddings_batch_and_usage"):
+                embeddings, usages = await self.embedder.async_get_embeddings_batch_and_usage(missing_texts)
+            else:
+                results = await asyncio.gather(
+                    *(self.embedder.async_get_embedding_and_usage(t) for t in missing_texts)
+                )
+                embeddings, usages = [r[0] for r in results], [r[1] for r in results]
+            if len(embeddings) != len(missing_texts) or len(usages) != len(missing_texts):
+                # zip descartaria o excedente em silêncio e os textos sem resposta ficariam com vetor vazio
+                raise RuntimeError(
+                    f"Embedder retornou {len(embeddings)} embedding(s) para {len(missing_texts)} texto(s)"
+                )
+            for i, embedding, usage in zip(missing, embeddings, usages):
+                computed[i] = (embedding, usage)
+            await asyncio.to_thread(
+                self.cache.put_many, self.model_id, {keys[i]: emb for i, (emb, _) in computed.items()}
+            )
+
+        all_embeddings: list[list[float]] = []
+        all_usages: list[Optional[dict]] = []
+        for i, key in enumerate(keys):
+            embedding, usage = computed[i] if i in computed else (cached[key], None)
+            all_embeddings.append(embedding)
+            all_usages.append(usage)
+        return all_embeddings, all_usages
+
+
+_embedding_cache: EmbeddingCache | None = None
+_embedding_cache_lock = threading.Lock()
+
+
+def get_embedding_cache() -> EmbeddingCache:
+    """Cache de embeddings do processo (singleton), compartilhado por ingestão e busca."""
+    global _embedding_cache
+    with _embedding_cache_lock:
+        if _embedding_cache is None:
+            from db.engine import get_engine
+
+            _embedding_cache = EmbeddingCache(db_engine=get_engine())
+        return _embedding_cache
@@ -0,0 +1,181 @@
+"""
+Pipeline de embeddings da ingestão.
+Agrupa os chunks em lotes do tamanho aceito pelo provedor, envia vários lotes em paralelo
+(limite de requisições em voo por processo) e respeita os limites do Azure OpenAI: token bucket
+local por requisições/min e tokens/min (config.ratelimit) e, em 429, pausa pelo Retry-After antes de repetir
+(limites e pausa por organização: cada tenant tem o próprio recurso Azure).
+Consulta o cache de embeddings (CachedEmbedder) e só envia ao provedor o que faltar.
+"""
+import contextvars
+import logging
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from os import getenv
+from typing import Any, Optional
+
+from agno.knowledge.document import Document
+from agno.knowledge.embedder.base import Embedder
+from openai import APIConnectionError, APITimeoutError, InternalServerError, RateLimitError
+
+from config.organization_context import get_current_organization
+from config.ratelimit import RateLimiter, estimate_tokens
+from knowledge.embedding_cache import CachedEmbedder
+
+logger = logging.getLogger(__name__)
+
+# Textos por requisição de embedding (Azure aceita até 2048 entradas por chamada)
+EMBEDDING_BATCH_SIZE = int(getenv("EMBEDDING_BATCH_SIZE", "64"))
+# Lotes enviados em paralelo (por processo, somando todas as ingestões)
+EMBEDDING_MAX_IN_FLIGHT = int(getenv("EMBEDDING_MAX_IN_FLIGHT", "4"))
+# Cota do deployment de embeddings; 0 = sem limite local (apenas reação a 429)
+EMBEDDING_RPM = int(getenv("EMBEDDING_RPM", "0"))
+EMBEDDING_TPM = int(getenv("EMBEDDING_TPM", "0"))
+EMBEDDING_MAX_RETRIES = int(getenv("EMBEDDING_MAX_RETRIES", "6"))
+_MAX_BACKOFF_SECONDS = 60.0
+
+
+def _retry_after_seconds(error: RateLimitError) -> Optional[float]:
+    """Lê retry-after-ms / retry-after (segundos) da resposta 429."""
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    for header, scale in (("retry-after-ms", 0.001), ("retry-after", 1.0)):
+        value = headers.get(header)
+        if value:
+            try:
+                return float(value) * scale
+            except ValueError:
+                continue
+    return None
+
+
+def _backoff_seconds(attempt: int) -> float:
+    return min(_MAX_BACKOFF_SECONDS, 2.0**attempt) * (0.5 + random.random() / 2)
+
+
+_executor: ThreadPoolExecutor | None = None
+# Por organização (cada tenant tem o próprio recurso Azure e a própria cota); None = ambiente
+_limiters: dict[str | None, RateLimiter] = {}
+_init_lock = threading.Lock()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _init_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=EMBEDDING_MAX_IN_FLIGHT, thread_name_prefix="embedding")
+        return _executor
+
+
+def get_rate_limiter(tenant: str | None = None) -> RateLimiter:
+    """Rate limiter de embeddings da organização (um por tenant, criado sob demanda)."""
+    with _init_lock:
+        if tenant not in _limiters:
+            _limiters[tenant] = RateLimiter(EMBEDDING_RPM, EMBEDDING_TPM)
+        return _limiters[tenant]
+
+
+class EmbeddingPipeline:
+    """Embeda documentos em lotes concorrentes, com cache, pacing e retry em 429."""
+
+    def __init__(self, embedder: Embedder, batch_size: int = EMBEDDING_BATCH_SIZE) -> None:
+        self.cached = embedder if isinstance(embedder, CachedEmbedder) else None
+        self.embedder = self.cached.embedder if self.cached else embedder
+        self.batch_size = max(1, batch_size)
+        # Resolvidos no contexto do chamador (organização do request): os lotes rodam no pool
+        org = get_current_organization()
+        self.limiter = get_rate_limiter(org.name if org else None)
+        self._openai_client = (
+            self.embedder.client.with_options(max_retries=0) if hasattr(self.embedder, "client") else None
+        )
+
+    def embed_documents(self, documents: list[Document]) -> None:
+        """Preenche embedding e usage de cada documento."""
+        embeddings, usages = self.embed_texts([doc.content for doc in documents])
+        for doc, embedding, usage in zip(documents, embeddings, usages):
+            doc.embedding = embedding
+            doc.usage = usage
+
+    def embed_texts(self, texts: list[str]) -> tuple[list[list[float]], list[Optional[dict]]]:
+        embeddings: list[Optional[list[float]]] = [None] * len(texts)
+        usages: list[Optional[dict]] = [None] * len(texts)
+
+        keys: list[str] = []
+        if self.cached:
+            keys = [self.cached.cache_key(text) for text in texts]
+            hits = self.cached.cache.get_many(keys)
+            for i, key in enumerate(keys):
+                embeddings[i] = hits.get(key)
+        missing = [i for i, embedding in enumerate(embeddings) if embedding is None]
+
+        batches = [missing[i : i + self.batch_size] for i in range(0, len(missing), self.batch_size)]
+        if batches:
+            logger.info(
+                "Embeddings: %d texto(s), %d do cache, %d lote(s) de até %d",
+                len(texts),
+                len(texts) - len(missing),
+                len(batches),
+                self.batch_size,
+            )
+        # Cada lote roda no contexto do chamador (organização do request, ContextVars)
+        executor = _get_executor()
+        futures = [
+            executor.submit(contextvars.copy_context().run, self._embed_batch, [texts[i] for i in idx])
+            for idx in batches
+        ]
+        for idx, future in zip(batches, futures):
+            batch_embeddings, usage = future.result()
+            if len(batch_embeddings) != len(idx):
+                # zip deixaria os textos sem resposta com embedding None em silêncio
+                raise RuntimeError(f"Provedor retornou {len(batch_embeddings)} embedding(s) para {len(idx)} texto(s)")
+            for i, embedding in zip(idx, batch_embeddings):
+                embeddings[i] = embedding
+                usages[i] = usage
+
+        if self.cached and missing:
+            self.cached.cache.put_many(self.cached.model_id, {keys[i]: embeddings[i] for i in missing})
+        return embeddings, usages  # type: ignore[return-value]
+
+    # --- Chamada ao provedor ---
+
+    def _request_params(self, texts: list[str]) -> dict[str, Any]:
+        embedder = self.embedder
+        params: dict[str, Any] = {
+            "input": texts,
+            "model": embedder.id,
+            "encoding_format": getattr(embedder, "encoding_format", "float"),
+        }
+        if getattr(embedder, "user", None) is not None:
+            params["user"] = embedder.user
+        if embedder.id.startswith("text-embedding-3") or getattr(embedder, "base_url", None) is not None:
+            params["dimensions"] = embedder.dimensions
+        if getattr(embedder, "request_params", None):
+            params.update(embedder.request_params)
+        return params
+
+    def _embed_batch(self, texts: list[str]) -> tuple[list[list[float]], Optional[dict]]:
+        if not hasattr(self.embedder, "client"):
+            results = [self.embedder.get_embedding_and_usage(text) for text in texts]
+            return [embedding for embedding, _ in results], None
+
+        tokens = sum(estimate_tokens(text) for text in texts)
+        for attempt in range(EMBEDDING_MAX_RETRIES):
+            try:
+                return self._create_embeddings(texts, tokens)
+            except RateLimitError as e:
+                delay = _retry_after_seconds(e) or _backoff_seconds(attempt)
+                logger.warning("Embeddings: 429 do provedor; pausando %.1fs (tentativa %d)", delay, attempt + 1)
+                self.limiter.pause(delay)
+            except (APIConnectionError, APITimeoutError, InternalServerError) as e:
+                delay = _backoff_seconds(attempt)
+                logger.warning("Embeddings: erro transitório (%s); nova tentativa em %.1fs", e, delay)
+                time.sleep(delay)
+        # Última tentativa: o erro do provedor sobe para o chamador
+        return self._create_embeddings(texts, tokens)
+
+    def _create_embeddings(self, texts: list[str], tokens: int) -> tuple[list[list[float]], Optional[dict]]:
+        self.limiter.acquire(tokens)
+        response = self._openai_client.embeddings.create(**self._request_params(texts))
+        data = sorted(response.data, key=lambda item: item.index)
+        usage = response.usage.model_dump() if response.usage else None
+        return [item.embedding for item in data], usage
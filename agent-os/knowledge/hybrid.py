@@ -0,0 +1,71 @@
+"""
+Busca híbrida da Knowledge: full-text (tsvector + índice GIN) e vetorial em paralelo,
+combinadas por reciprocal rank fusion (RRF). Consultas que são um identificador exato
+(código de produto, SKU, versão, termo entre aspas) vão direto para o full-text, sem embedding.
+"""
+import contextvars
+import re
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from os import getenv
+from typing import Any, Callable
+
+from agno.knowledge.document import Document
+from agno.vectordb.search import SearchType
+
+# hybrid | vector | keyword
+KNOWLEDGE_SEARCH_TYPE = SearchType(getenv("KNOWLEDGE_SEARCH_TYPE", "hybrid").lower())
+# Configuração de text search do PostgreSQL ('simple' não aplica stemming: bom para marcas e códigos)
+KNOWLEDGE_FTS_LANGUAGE = getenv("KNOWLEDGE_FTS_LANGUAGE", "simple").lower()
+# Candidatos buscados em cada lado = top_k * KNOWLEDGE_HYBRID_CANDIDATES
+KNOWLEDGE_HYBRID_CANDIDATES = int(getenv("KNOWLEDGE_HYBRID_CANDIDATES", "4"))
+# Constante k do RRF: score = soma de 1 / (k + posição)
+KNOWLEDGE_RRF_K = int(getenv("KNOWLEDGE_RRF_K", "60"))
+# Consultas full-text paralelas à busca vetorial (por processo)
+KNOWLEDGE_SEARCH_WORKERS = int(getenv("KNOWLEDGE_SEARCH_WORKERS", "8"))
+
+if not re.fullmatch(r"[a-z_]+", KNOWLEDGE_FTS_LANGUAGE):
+    raise ValueError(f"KNOWLEDGE_FTS_LANGUAGE inválido: {KNOWLEDGE_FTS_LANGUAGE!r}")
+
+# Um único token com pelo menos um dígito (SKU-1234, PRJ_42, v2.3.1) ou um termo entre aspas
+_IDENTIFIER = re.compile(r"(?=[^\s]*\d)[A-Za-z0-9][A-Za-z0-9._/#:-]{1,63}")
+_QUOTED = re.compile(r'"[^"]+"')
+
+
+def is_exact_identifier(query: str) -> bool:
+    query = query.strip()
+    return bool(_IDENTIFIER.fullmatch(query) or _QUOTED.fullmatch(query))
+
+
+def reciprocal_rank_fusion(rankings: list[list[Document]], k: int = KNOWLEDGE_RRF_K) -> list[Document]:
+    """Combina rankings pelo RRF; o documento mantém os meta_data de todos os lados + rrf_score."""
+    scores: dict[str, float] = {}
+    documents: dict[str, Document] = {}
+    for ranking in rankings:
+        for position, doc in enumerate(ranking, start=1):
+            scores[doc.id] = scores.get(doc.id, 0.0) + 1.0 / (k + position)
+            if doc.id in documents:
+                for key, value in (doc.meta_data or {}).items():
+                    documents[doc.id].meta_data.setdefault(key, value)
+            else:
+                documents[doc.id] = doc
+    ordered = sorted(scores, key=scores.__getitem__, reverse=True)
+    for doc_id in ordered:
+        documents[doc_id].meta_data["rrf_score"] = round(scores[doc_id], 6)
+    return [documents[doc_id] for doc_id in ordered]
+
+
+_executor: ThreadPoolExecutor | None = None
+_executor_lock = threading.Lock()
+
+
+def submit_search(fn: Callable[..., Any], *args: Any) -> Future:
+    """Executa a consulta em paralelo, no mesmo contexto (tenant) de quem chamou."""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=KNOWLEDGE_SEARCH_WORKERS, thread_name_prefix="knowledge-search"
+                )
+    return _executor.submit(contextvars.copy_context().run, fn, *args)
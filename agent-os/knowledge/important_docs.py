@@ -0,0 +1,173 @@
+"""
+Documentos importantes por tenant (OrganizationSettings.important_doc_ids) fixados em memória.
+Os chunks dos documentos listados na config (general/business/quality) são carregados da tabela
+de vetores do tenant no startup e mantidos em memória; o caminho mais comum (DoR, DoD,
+templates) vira uma consulta em dicionário, sem embedding nem busca vetorial. Qualquer gravação
+ou remoção na Knowledge do tenant, ou mudança na config da organização, marca os documentos
+dele para recarga no próximo acesso. Essa invalidação só vale no processo que fez a gravação:
+os demais workers/pods recarregam quando a cópia passa de KNOWLEDGE_IMPORTANT_DOCS_TTL segundos.
+A recarga chamada do event loop (instruções do agente em run assíncrono) roda em thread; enquanto
+isso, o request usa a cópia anterior (ou nenhum documento, se não houver).
+Um id casa com o nome do documento com ou sem extensão ("DoR" -> "DoR.md").
+"""
+import asyncio
+import contextvars
+import logging
+import threading
+import time
+from os import getenv
+
+from agno.knowledge.document import Document
+
+from config.organization_config import OrganizationSettings, organization_config_manager
+from config.organization_context import (
+    clear_current_organization,
+    get_current_organization,
+    set_current_organization,
+)
+from knowledge.tenancy import tenant_key
+
+logger = logging.getLogger(__name__)
+
+# Carrega os documentos importantes de todos os tenants no startup
+KNOWLEDGE_IMPORTANT_DOCS_PRELOAD = getenv("KNOWLEDGE_IMPORTANT_DOCS_PRELOAD", "true").lower() in ("1", "true", "yes")
+# Limite de caracteres dos documentos importantes injetados nas instruções do agente (0 = sem limite)
+KNOWLEDGE_IMPORTANT_DOCS_MAX_CHARS = int(getenv("KNOWLEDGE_IMPORTANT_DOCS_MAX_CHARS", "24000"))
+# Idade máxima da cópia em memória (segundos; 0 = só recarrega por invalidação neste processo)
+KNOWLEDGE_IMPORTANT_DOCS_TTL = int(getenv("KNOWLEDGE_IMPORTANT_DOCS_TTL", "60"))
+
+
+def _important_ids(org: OrganizationSettings) -> list[str]:
+    ids: list[str] = []
+    lists = org.important_doc_ids.values() if isinstance(org.important_doc_ids, dict) else [org.important_doc_ids]
+    for doc_ids in lists:
+        ids.extend(doc_id for doc_id in doc_ids if doc_id not in ids)
+    return ids
+
+
+class ImportantDocs:
+    """Chunks dos documentos importantes por organização: {org: {doc_id: [chunks em ordem]}}."""
+
+    def __init__(self, ttl: int = KNOWLEDGE_IMPORTANT_DOCS_TTL) -> None:
+        self.ttl = ttl
+        # {org: (carregado em, {doc_id: chunks})}
+        self._docs: dict[str, tuple[float, dict[str, list[Document]]]] = {}
+        # Organizações com recarga em background em andamento
+        self._loading: set[str] = set()
+        self._lock = threading.Lock()
+
+    def load(self, org: OrganizationSettings) -> dict[str, list[Document]]:
+        """(Re)carrega os documentos do tenant `org`; deve rodar no contexto desse tenant."""
+        from knowledge import get_knowledge
+
+        ids = _important_ids(org)
+        docs = get_knowledge().vector_db.documents_by_name(ids) if ids else {}
+        missing = [doc_id for doc_id in ids if doc_id not in docs]
+        if missing:
+            logger.warning("Documentos importantes de %s não encontrados na Knowledge: %s", org.name, missing)
+        with self._lock:
+            self._docs[org.name] = (time.monotonic(), docs)
+        logger.info("Documentos importantes de %s em memória: %d de %d", org.name, len(docs), len(ids))
+        return docs
+
+    def get(self, profile_type: str | None = None) -> list[Document]:
+        """Chunks dos documentos importantes do tenant atual (general + profile), na ordem da config."""
+        org = get_current_organization()
+        if org is None:
+            return []
+        entry = self._docs.get(org.name)
+        docs = entry[1] if entry else {}
+        if entry is None or (self.ttl > 0 and time.monotonic() - entry[0] > self.ttl):
+            if _in_event_loop():
+                self._load_background(org)
+            else:
+                try:
+                    docs = self.load(org)
+                except Exception as e:
+                    logger.warning("Não foi possível carregar os documentos importantes de %s: %s", org.name, e)
+        chunks: list[Document] = []
+        for doc_id in dict.fromkeys(org.get_important_docs_for_profile(profile_type)):
+            chunks.extend(docs.get(doc_id, []))
+        return chunks
+
+    def _load_background(self, org: OrganizationSettings) -> None:
+        """Recarrega em thread, no contexto (tenant) atual; uma recarga por organização por vez."""
+        with self._lock:
+            if org.name in self._loading:
+                return
+            self._loading.add(org.name)
+
+        def run() -> None:
+            try:
+                self.load(org)
+            except Exception as e:
+                logger.warning("Não foi possível carregar os documentos importantes de %s: %s", org.name, e)
+            finally:
+                with self._lock:
+                    self._loading.discard(org.name)
+
+        context = contextvars.copy_context()
+        threading.Thread(target=context.run, args=(run,), name="knowledge-important-docs", daemon=True).start()
+
+    def invalidate(self, tenant: str | None) -> None:
+        """Conteúdo do tenant mudou: recarrega no próximo acesso (None = tabela compartilhada, todos)."""
+        with self._lock:
+            for name in [name for name in self._docs if tenant is None or tenant_key(name) == tenant]:
+                del self._docs[name]
+
+    def forget(self, names: set[str]) -> None:
+        """Configuração das organizações mudou (ex.: important_doc_ids): recarrega no próximo acesso."""
+        with self._lock:
+            for name in names:
+                self._docs.pop(name, None)
+
+    def preload(self) -> None:
+        """Carrega os documentos importantes de todas as organizações configuradas."""
+        for org in organization_config_manager.get_all_organizations().values():
+            if not _important_ids(org):
+                continue
+            set_current_organization(org)
+            try:
+                self.load(org)
+            except Exception as e:
+                logger.warning("Não foi possível pré-carregar os documentos importantes de %s: %s", org.name, e)
+        clear_current_organization()
+
+
+def _in_event_loop() -> bool:
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return False
+    return True
+
+
+_important_docs: ImportantDocs | None = None
+
+
+def get_important_docs() -> ImportantDocs:
+    """Documentos importantes do processo (singleton)."""
+    global _important_docs
+    if _important_docs is None:
+        _important_docs = ImportantDocs()
+        organization_config_manager.add_listener(_important_docs.forget)
+    return _important_docs
+
+
+def important_docs_context(profile_type: str | None = None) -> str:
+    """Documentos importantes do tenant atual formatados para as instruções do agente ("" se não houver)."""
+    sections: list[str] = []
+    total = 0
+    current_name = None
+    for chunk in get_important_docs().get(profile_type):
+        if KNOWLEDGE_IMPORTANT_DOCS_MAX_CHARS and total + len(chunk.content) > KNOWLEDGE_IMPORTANT_DOCS_MAX_CHARS:
+            logger.warning("Documentos importantes truncados em %d caracteres", KNOWLEDGE_IMPORTANT_DOCS_MAX_CHARS)
+            break
+        if chunk.name != current_name:
+            current_name = chunk.name
+            sections.append(f"\n### {chunk.name}\n")
+        sections.append(chunk.content)
+        total += len(chunk.content)
+    if not sections:
+        return ""
+    return "**Documentos de referência da organização**\n" + "\n".join(sections)
@@ -0,0 +1,313 @@
+"""
+Fila de ingestão da Knowledge (RAG) em background.
+O upload apenas grava os arquivos em temp e enfileira um job; um pool limitado de threads
+executa knowledge.insert (chunk + embed + PgVector) fora do event loop do uvicorn.
+Os arquivos de um mesmo upload são ingeridos em paralelo, até INGEST_JOB_CONCURRENCY por job,
+de modo que o tempo total do job é limitado pelo arquivo mais lento, não pela soma.
+O status dos jobs fica em memória no processo que os executa e é espelhado na tabela
+ai.knowledge_ingestion_jobs, de modo que GET /knowledge/jobs/{id} responde em qualquer worker/pod.
+Cada job pertence ao tenant do upload e só é visível para ele.
+"""
+import contextvars
+import logging
+import threading
+import time
+import uuid
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import timedelta
+from os import getenv
+from pathlib import Path
+from typing import Any
+
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, delete, func, select
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.engine import Engine
+
+from knowledge import get_knowledge
+from knowledge.tenancy import current_tenant_key
+
+logger = logging.getLogger(__name__)
+
+INGEST_JOBS_TABLE = "knowledge_ingestion_jobs"
+INGEST_JOBS_SCHEMA = "ai"
+
+# Tipos permitidos (extensões) alinhados aos readers do Agno
+ALLOWED_EXTENSIONS = {".pdf", ".docx", ".md", ".txt", ".csv"}
+# Workers que executam chunk + embed + insert em paralelo (por processo uvicorn)
+INGEST_WORKERS = int(getenv("KNOWLEDGE_INGEST_WORKERS", "4"))
+# Documentos de um mesmo job processados ao mesmo tempo (o restante aguarda a vez do job)
+INGEST_JOB_CONCURRENCY = int(getenv("KNOWLEDGE_INGEST_JOB_CONCURRENCY", "3"))
+# Máximo de documentos aguardando/em processamento; acima disso o upload é recusado (503)
+INGEST_MAX_PENDING = int(getenv("KNOWLEDGE_INGEST_MAX_PENDING", "50"))
+# Jobs finalizados são descartados da memória após este tempo
+JOB_TTL_SECONDS = int(getenv("KNOWLEDGE_JOB_TTL_SECONDS", "3600"))
+# Espelha o status dos jobs no PostgreSQL (consultável de qualquer worker); false = só no processo
+KNOWLEDGE_INGEST_JOBS_DB_ENABLED = getenv("KNOWLEDGE_INGEST_JOBS_DB_ENABLED", "true").lower() in ("1", "true", "yes")
+
+# Status por documento (ok/error alinhados à resposta original do upload)
+DOC_QUEUED = "queued"
+DOC_PROCESSING = "processing"
+DOC_OK = "ok"
+DOC_UNCHANGED = "unchanged"
+DOC_ERROR = "error"
+
+
+class IngestionQueueFull(Exception):
+    """A fila de ingestão atingiu INGEST_MAX_PENDING documentos."""
+
+
+@dataclass
+class DocumentStatus:
+    filename: str
+    status: str = DOC_QUEUED
+    message: str | None = None
+    started_at: float | None = None
+    finished_at: float | None = None
+
+    def to_dict(self) -> dict[str, Any]:
+        data: dict[str, Any] = {"filename": self.filename, "status": self.status}
+        if self.message:
+            data["message"] = self.message
+        if self.started_at and self.finished_at:
+            data["duration_ms"] = int((self.finished_at - self.started_at) * 1000)
+        return data
+
+
+@dataclass
+class IngestionJob:
+    """Um upload (um ou mais arquivos) e o progresso de cada documento."""
+    id: str
+    documents: list[DocumentStatus]
+    # Tenant do upload (None = modo simples): só ele consulta o job
+    tenant: str | None = None
+    created_at: float = field(default_factory=time.time)
+    # Resolvido quando todos os documentos terminam (POST /knowledge/upload?wait=true)
+    done: Future = field(default_factory=Future, repr=False)
+
+    @property
+    def ingested(self) -> int:
+        return sum(1 for d in self.documents if d.status == DOC_OK)
+
+    @property
+    def finished(self) -> bool:
+        return all(d.status in (DOC_OK, DOC_UNCHANGED, DOC_ERROR) for d in self.documents)
+
+    @property
+    def status(self) -> str:
+        if all(d.status == DOC_QUEUED for d in self.documents):
+            return "queued"
+        if not self.finished:
+            return "processing"
+        succeeded = sum(1 for d in self.documents if d.status in (DOC_OK, DOC_UNCHANGED))
+        if succeeded == len(self.documents):
+            return "completed"
+        return "partial" if succeeded else "failed"
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "ingested": self.ingested,
+            "documents": [d.to_dict() for d in self.documents],
+        }
+
+
+def ingest_file(path: Path, filename: str) -> bool:
+    """
+    Chunk + embed + insert de um arquivo (bloqueante; roda no pool de ingestão).
+    Retorna False quando o arquivo é idêntico ao já ingerido com o mesmo nome.
+    """
+    return get_knowledge().insert_file(path, name=filename)
+
+
+class IngestionQueue:
+    """Pool limitado de workers + registro dos jobs de ingestão (em memória e no PostgreSQL)."""
+
+    def __init__(
+        self,
+        max_workers: int = INGEST_WORKERS,
+        max_pending: int = INGEST_MAX_PENDING,
+        job_concurrency: int = INGEST_JOB_CONCURRENCY,
+        db_engine: Engine | None = None,
+    ) -> None:
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="knowledge-ingest")
+        self._max_pending = max_pending
+        self._job_concurrency = max(1, job_concurrency)
+        self._pending = 0
+        self._jobs: dict[str, IngestionJob] = {}
+        # Documentos de cada job aguardando uma vaga do limite por job
+        self._waiting: dict[str, deque[tuple[contextvars.Context, DocumentStatus, Path]]] = {}
+        self._lock = threading.Lock()
+        # Versão do status de cada job gravado na tabela (gravações fora de ordem não regridem o status)
+        self._versions: dict[str, int] = {}
+        self._engine = db_engine
+        self._table: Table | None = None
+        self._db_disabled = not KNOWLEDGE_INGEST_JOBS_DB_ENABLED or db_engine is None
+
+    def submit(
+        self,
+        files: list[tuple[str, Path]],
+        rejected: list[DocumentStatus] | None = None,
+    ) -> IngestionJob:
+        """
+        Enfileira os arquivos (filename, caminho temp) de um upload e retorna o job.
+        Arquivos recusados na validação entram no job já com status error.
+        Até job_concurrency documentos do job rodam em paralelo; ao terminar um, o próximo
+        do mesmo job é enviado ao pool. O worker remove o arquivo temp ao final.
+        Grava o status no PostgreSQL (bloqueante: chamar fora do event loop).
+        """
+        with self._lock:
+            self._prune()
+            if self._pending + len(files) > self._max_pending:
+                raise IngestionQueueFull(
+                    f"Fila de ingestão cheia ({self._pending}/{self._max_pending} documentos)"
+                )
+            self._pending += len(files)
+            queued = [DocumentStatus(filename=filename) for filename, _ in files]
+            job = IngestionJob(
+                id=uuid.uuid4().hex, documents=queued + list(rejected or []), tenant=current_tenant_key()
+            )
+            self._jobs[job.id] = job
+            # Copia o contexto do request (ex.: organização do X-Tenant) para cada worker
+            self._waiting[job.id] = deque(
+                (contextvars.copy_context(), doc, path) for doc, (_, path) in zip(queued, files)
+            )
+            ready = [self._waiting[job.id].popleft() for _ in range(min(self._job_concurrency, len(files)))]
+            if not files:
+                del self._waiting[job.id]
+                job.done.set_result(None)
+
+        self._save(job, prune=True)
+        for ctx, doc, path in ready:
+            self._executor.submit(ctx.run, self._run, job, doc, path)
+        logger.info("Job de ingestão %s: %d documento(s) na fila", job.id, len(files))
+        return job
+
+    def get_job(self, job_id: str) -> IngestionJob | None:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def job_status(self, job_id: str, tenant: str | None) -> dict[str, Any] | None:
+        """
+        Status do job do tenant: do processo que o executa ou, se ele roda em outro worker/pod,
+        da tabela (bloqueante). None se o job não existe, expirou ou é de outro tenant.
+        """
+        job = self.get_job(job_id)
+        if job is not None:
+            return job.to_dict() if job.tenant == tenant else None
+        if self._db_disabled:
+            return None
+        try:
+            return self._db_status(job_id, tenant)
+        except Exception as e:
+            logger.warning("Status de jobs de ingestão (PostgreSQL) indisponível na leitura: %s", e)
+            return None
+
+    def _run(self, job: IngestionJob, doc: DocumentStatus, path: Path) -> None:
+        doc.status = DOC_PROCESSING
+        doc.started_at = time.time()
+        self._save(job)
+        try:
+            doc.status = DOC_OK if ingest_file(path, doc.filename) else DOC_UNCHANGED
+        except Exception as e:
+            logger.exception("Erro ao ingerir %s", doc.filename)
+            doc.status = DOC_ERROR
+            doc.message = str(e)
+        finally:
+            doc.finished_at = time.time()
+            path.unlink(missing_ok=True)
+            with self._lock:
+                self._pending -= 1
+                waiting = self._waiting.get(job.id)
+                next_doc = waiting.popleft() if waiting else None
+                if not waiting:
+                    self._waiting.pop(job.id, None)
+                if job.finished and not job.done.done():
+                    job.done.set_result(None)
+            self._save(job)
+            if next_doc is not None:
+                ctx, doc, path = next_doc
+                self._executor.submit(ctx.run, self._run, job, doc, path)
+
+    def _prune(self) -> None:
+        """Remove jobs finalizados há mais de JOB_TTL_SECONDS (chamado com o lock)."""
+        cutoff = time.time() - JOB_TTL_SECONDS
+        expired = [
+            job_id
+            for job_id, job in self._jobs.items()
+            if job.finished and max((d.finished_at or job.created_at) for d in job.documents) < cutoff
+        ]
+        for job_id in expired:
+            del self._jobs[job_id]
+            self._versions.pop(job_id, None)
+
+    # --- Status no PostgreSQL ---
+
+    def _get_table(self) -> Table:
+        if self._table is None:
+            table = Table(
+                INGEST_JOBS_TABLE,
+                MetaData(schema=INGEST_JOBS_SCHEMA),
+                Column("id", String, primary_key=True),
+                Column("tenant", String, nullable=False),
+                Column("version", Integer, nullable=False),
+                Column("status", postgresql.JSONB, nullable=False),
+                Column("updated_at", DateTime(timezone=True), server_default=func.now(), nullable=False),
+            )
+            try:
+                table.create(self._engine, checkfirst=True)
+            except Exception:
+                # Sem tabela, o status fica só no processo que executa o job
+                self._db_disabled = True
+                raise
+            self._table = table
+        return self._table
+
+    def _save(self, job: IngestionJob, prune: bool = False) -> None:
+        """Grava o status atual do job (no upload, também remove da tabela os jobs expirados)."""
+        if self._db_disabled:
+            return
+        with self._lock:
+            version = self._versions[job.id] = self._versions.get(job.id, 0) + 1
+            status = job.to_dict()
+        try:
+            table = self._get_table()
+            stmt = postgresql.insert(table).values(
+                id=job.id, tenant=job.tenant or "", version=version, status=status, updated_at=func.now()
+            )
+            stmt = stmt.on_conflict_do_update(
+                index_elements=["id"],
+                set_={"version": stmt.excluded.version, "status": stmt.excluded.status, "updated_at": func.now()},
+                where=table.c.version < stmt.excluded.version,
+            )
+            with self._engine.begin() as conn:
+                conn.execute(stmt)
+                if prune:
+                    cutoff = func.now() - timedelta(seconds=JOB_TTL_SECONDS)
+                    conn.execute(delete(table).where(table.c.updated_at < cutoff))
+        except Exception as e:
+            logger.warning("Status de jobs de ingestão (PostgreSQL) indisponível na escrita: %s", e)
+
+    def _db_status(self, job_id: str, tenant: str | None) -> dict[str, Any] | None:
+        table = self._get_table()
+        cutoff = func.now() - timedelta(seconds=JOB_TTL_SECONDS)
+        stmt = select(table.c.status).where(
+            table.c.id == job_id, table.c.tenant == (tenant or ""), table.c.updated_at >= cutoff
+        )
+        with self._engine.connect() as conn:
+            return conn.execute(stmt).scalar()
+
+
+_ingestion_queue: IngestionQueue | None = None
+
+
+def get_ingestion_queue() -> IngestionQueue:
+    """Retorna a fila de ingestão do processo (singleton, criada sob demanda)."""
+    global _ingestion_queue
+    if _ingestion_queue is None:
+        from db.engine import get_engine
+
+        _ingestion_queue = IngestionQueue(db_engine=get_engine())
+    return _ingestion_queue
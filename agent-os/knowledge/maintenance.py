@@ -0,0 +1,83 @@
+"""
+Limpeza periódica da tabela de vetores da Knowledge.
+Vetores cujo documento não existe mais em knowledge_contents (remoções antigas, ingestões
+interrompidas) são apagados em lotes em todas as tabelas (base e de tenants) e as tabelas que
+perderam muitas linhas passam por VACUUM (ANALYZE), mantendo o índice ANN e a tabela enxutos.
+Roda em background a cada KNOWLEDGE_VACUUM_INTERVAL_SECONDS e sob demanda em
+POST /knowledge/admin/vacuum, no mesmo slot das operações de índice (nunca em paralelo a um build).
+O agendador roda em cada worker/pod; um advisory lock no PostgreSQL garante uma limpeza por vez
+no cluster inteiro (os demais processos pulam a rodada).
+"""
+import logging
+import threading
+import time
+from os import getenv
+from typing import Any
+
+from sqlalchemy import text
+
+from knowledge.vector_index import IndexOperationRunning, start_index_operation
+
+logger = logging.getLogger(__name__)
+
+# Intervalo entre limpezas automáticas (0 desativa; a rota admin continua disponível)
+KNOWLEDGE_VACUUM_INTERVAL_SECONDS = int(getenv("KNOWLEDGE_VACUUM_INTERVAL_SECONDS", "21600"))
+# Vetores órfãos removidos por transação
+KNOWLEDGE_VACUUM_BATCH_SIZE = int(getenv("KNOWLEDGE_VACUUM_BATCH_SIZE", "5000"))
+# Remoções numa tabela a partir das quais ela passa por VACUUM (ANALYZE)
+KNOWLEDGE_VACUUM_MIN_ROWS = int(getenv("KNOWLEDGE_VACUUM_MIN_ROWS", "1000"))
+# Chave do advisory lock da limpeza (compartilhada por todos os processos da aplicação)
+VACUUM_LOCK_KEY = 7_316_421_905_284_337
+
+
+def vacuum_orphan_vectors() -> str:
+    """Remove os vetores órfãos de todas as tabelas de vetores; retorna o resumo."""
+    from knowledge import get_knowledge
+
+    knowledge = get_knowledge()
+    vector_db = knowledge.vector_db
+    contents_db = knowledge.contents_db
+    contents_table = f'"{contents_db.db_schema}"."{contents_db.knowledge_table_name}"'
+    # Lock de transação (funciona também via PgBouncer em transaction pooling), liberado no commit
+    with vector_db.db_engine.begin() as conn:
+        if not conn.execute(text("SELECT pg_try_advisory_xact_lock(:key)"), {"key": VACUUM_LOCK_KEY}).scalar():
+            logger.info("Limpeza de vetores em andamento em outro processo; rodada ignorada")
+            return "Limpeza em andamento em outro processo"
+        return _vacuum_tables(vector_db, contents_table)
+
+
+def _vacuum_tables(vector_db: Any, contents_table: str) -> str:
+    removed: dict[str, int] = {}
+    for table_name in vector_db.vector_tables():
+        deleted = vector_db.delete_orphan_vectors(table_name, contents_table, KNOWLEDGE_VACUUM_BATCH_SIZE)
+        if deleted:
+            removed[table_name] = deleted
+            logger.info("%d vetor(es) órfão(s) removidos de %s", deleted, table_name)
+        if deleted >= KNOWLEDGE_VACUUM_MIN_ROWS:
+            vector_db.vacuum_table(table_name)
+    if not removed:
+        return "Nenhum vetor órfão"
+    return "Vetores órfãos removidos: " + ", ".join(f"{name}={count}" for name, count in removed.items())
+
+
+def start_vacuum() -> dict:
+    """Inicia a limpeza em background (IndexOperationRunning se houver operação em andamento)."""
+    return start_index_operation("vacuum", vacuum_orphan_vectors).to_dict()
+
+
+def start_vacuum_scheduler() -> None:
+    """Thread que dispara a limpeza a cada KNOWLEDGE_VACUUM_INTERVAL_SECONDS."""
+    if KNOWLEDGE_VACUUM_INTERVAL_SECONDS <= 0:
+        return
+
+    def loop() -> None:
+        while True:
+            time.sleep(KNOWLEDGE_VACUUM_INTERVAL_SECONDS)
+            try:
+                start_vacuum()
+            except IndexOperationRunning:
+                logger.info("Limpeza de vetores adiada: operação de índice em andamento")
+            except Exception as e:
+                logger.warning("Falha ao iniciar a limpeza de vetores: %s", e)
+
+    threading.Thread(target=loop, name="knowledge-vacuum-scheduler", daemon=True).start()
@@ -0,0 +1,157 @@
+"""
+Parse de PDF/DOCX fora do processo da API.
+O parse desses formatos é CPU-bound e segura o GIL; aqui ele roda num pool de processos
+dedicado (spawn) e só os Documents (texto + chunks) voltam para a etapa de embedding.
+Cada arquivo tem timeout e cada worker tem limite de memória (RLIMIT_AS): um PDF patológico
+derruba/trava só o worker dele, que é encerrado e substituído, e o documento falha com erro.
+"""
+import inspect
+import logging
+import multiprocessing
+import os
+import queue
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FuturesTimeout
+from concurrent.futures.process import BrokenProcessPool
+from os import getenv
+from pathlib import Path
+from typing import Any, Optional
+
+from agno.knowledge.document import Document
+
+logger = logging.getLogger(__name__)
+
+# Processos de parse (0 = parse no próprio processo, como antes)
+KNOWLEDGE_PARSE_WORKERS = int(getenv("KNOWLEDGE_PARSE_WORKERS", "2"))
+# Tempo máximo de parse por arquivo; estourado, o worker é encerrado e o documento falha
+KNOWLEDGE_PARSE_TIMEOUT_SECONDS = int(getenv("KNOWLEDGE_PARSE_TIMEOUT_SECONDS", "120"))
+# Limite de memória (address space) de cada worker, em MB (0 = sem limite)
+KNOWLEDGE_PARSE_MEMORY_MB = int(getenv("KNOWLEDGE_PARSE_MEMORY_MB", "2048"))
+# Arquivos por worker antes de reciclar o processo (devolve a memória fragmentada ao SO)
+KNOWLEDGE_PARSE_MAX_TASKS_PER_CHILD = int(getenv("KNOWLEDGE_PARSE_MAX_TASKS_PER_CHILD", "50"))
+
+# Extensões parseadas no pool (as demais são leves e continuam no processo)
+PARSE_POOL_EXTENSIONS = {".pdf", ".docx"}
+
+
+class DocumentParseError(RuntimeError):
+    """Parse do arquivo falhou no pool (timeout, limite de memória ou worker encerrado)."""
+
+
+def _init_worker(memory_mb: int, worker_pids: Any) -> None:
+    # Registra o PID para que o pool possa encerrar este worker num timeout
+    worker_pids.put(os.getpid())
+    if memory_mb <= 0:
+        return
+    try:
+        import resource
+
+        limit = memory_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+    except (ImportError, ValueError, OSError) as e:
+        logger.warning("Não foi possível limitar a memória do worker de parse: %s", e)
+
+
+def _ready() -> None:
+    """Tarefa vazia: espera o worker ficar pronto."""
+
+
+def _parse_file(reader: Any, path: str, name: Optional[str], password: Optional[str]) -> list[Document]:
+    """Executado no worker: mesma chamada de Knowledge._read."""
+    if password is not None and "password" in inspect.signature(reader.read).parameters:
+        return reader.read(Path(path), name=name, password=password)
+    return reader.read(Path(path), name=name)
+
+
+class _Worker:
+    """Um processo de parse: executor de um único worker e o PID informado pelo initializer."""
+
+    def __init__(self, memory_mb: int, max_tasks_per_child: int) -> None:
+        # spawn: o processo da API tem threads (pools, engines); fork herdaria locks em uso
+        context = multiprocessing.get_context("spawn")
+        self.pids = context.SimpleQueue()
+        self.executor = ProcessPoolExecutor(
+            max_workers=1,
+            mp_context=context,
+            initializer=_init_worker,
+            initargs=(memory_mb, self.pids),
+            max_tasks_per_child=max_tasks_per_child or None,
+        )
+        # Sobe o processo antes do primeiro arquivo: o timeout do parse não conta o spawn e os imports
+        self.executor.submit(_ready).result()
+
+    def kill(self) -> None:
+        """Encerra o processo (travado no parse) e descarta o executor."""
+        pids = set()
+        while not self.pids.empty():
+            pids.add(self.pids.get())
+        # Só filhos vivos deste processo: um PID de worker já reciclado não atinge outro processo
+        for process in multiprocessing.active_children():
+            if process.pid in pids:
+                process.kill()
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        self.pids.close()
+
+
+class ParsePool:
+    """
+    Pool de processos de parse. Cada processo é um executor próprio e atende um arquivo por vez:
+    quem chega com todos ocupados espera uma vaga (fora do timeout, que mede só o parse), e um
+    timeout ou queda encerra apenas o processo daquele arquivo, sem afetar os parses em andamento.
+    """
+
+    def __init__(
+        self,
+        max_workers: int = KNOWLEDGE_PARSE_WORKERS,
+        timeout: int = KNOWLEDGE_PARSE_TIMEOUT_SECONDS,
+        memory_mb: int = KNOWLEDGE_PARSE_MEMORY_MB,
+        max_tasks_per_child: int = KNOWLEDGE_PARSE_MAX_TASKS_PER_CHILD,
+    ) -> None:
+        self.max_workers = max(1, max_workers)
+        self.timeout = timeout
+        self.memory_mb = memory_mb
+        self.max_tasks_per_child = max_tasks_per_child
+        # Vagas livres; None = processo ainda não criado (ou descartado), criado no próximo uso
+        self._idle: queue.SimpleQueue[_Worker | None] = queue.SimpleQueue()
+        for _ in range(self.max_workers):
+            self._idle.put(None)
+
+    def parse(self, reader: Any, path: Path, name: Optional[str], password: Optional[str] = None) -> list[Document]:
+        """Documents do arquivo (bloqueante). Levanta DocumentParseError se o parse não terminar."""
+        worker = self._idle.get()
+        try:
+            if worker is None:
+                worker = _Worker(self.memory_mb, self.max_tasks_per_child)
+            future = worker.executor.submit(_parse_file, reader, str(path), name, password)
+            try:
+                return future.result(timeout=self.timeout or None)
+            except FuturesTimeout:
+                worker.kill()
+                worker = None
+                raise DocumentParseError(f"Parse de {name} excedeu {self.timeout}s") from None
+            except BrokenProcessPool:
+                worker.kill()
+                worker = None
+                raise DocumentParseError(f"Worker de parse encerrado ao processar {name}") from None
+            except MemoryError:
+                raise DocumentParseError(
+                    f"Parse de {name} excedeu o limite de memória ({self.memory_mb} MB)"
+                ) from None
+        finally:
+            self._idle.put(worker)
+
+
+_parse_pool: ParsePool | None = None
+_parse_pool_lock = threading.Lock()
+
+
+def get_parse_pool() -> ParsePool | None:
+    """Pool de parse do processo (singleton); None quando KNOWLEDGE_PARSE_WORKERS=0."""
+    global _parse_pool
+    if KNOWLEDGE_PARSE_WORKERS <= 0:
+        return None
+    with _parse_pool_lock:
+        if _parse_pool is None:
+            _parse_pool = ParsePool()
+        return _parse_pool
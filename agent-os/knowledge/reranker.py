@@ -0,0 +1,164 @@
+"""
+Reranker local (CPU) dos resultados de busca da Knowledge.
+A busca traz top_k * KNOWLEDGE_RERANKER_CANDIDATES candidatos e o reranker devolve os top_k
+mais relevantes: BM25 sobre os candidatos combinado por RRF à ordem original (sem modelo,
+microssegundos por chunk) ou um cross-encoder pequeno (sentence-transformers, opcional).
+A pontuação é feita em lotes e, se passar do orçamento de latência, o ranking original é mantido.
+O modelo é carregado em background; até ficar pronto, as buscas usam o ranking original.
+"""
+import logging
+import math
+import re
+import threading
+import time
+from collections import Counter
+from os import getenv
+from typing import Any, Optional
+
+from agno.knowledge.document import Document
+from agno.knowledge.reranker.base import Reranker
+
+from knowledge.hybrid import KNOWLEDGE_RRF_K
+
+logger = logging.getLogger(__name__)
+
+# none | bm25 | cross-encoder
+KNOWLEDGE_RERANKER = getenv("KNOWLEDGE_RERANKER", "none").lower()
+KNOWLEDGE_RERANKER_MODEL = getenv("KNOWLEDGE_RERANKER_MODEL", "cross-encoder/ms-marco-MiniLM-L-6-v2")
+# Candidatos buscados = top_k * KNOWLEDGE_RERANKER_CANDIDATES
+KNOWLEDGE_RERANKER_CANDIDATES = int(getenv("KNOWLEDGE_RERANKER_CANDIDATES", "4"))
+# Pares (consulta, chunk) pontuados por lote
+KNOWLEDGE_RERANKER_BATCH_SIZE = int(getenv("KNOWLEDGE_RERANKER_BATCH_SIZE", "16"))
+# Tempo máximo de reranking por busca; estourado, vale o ranking original
+KNOWLEDGE_RERANKER_BUDGET_MS = int(getenv("KNOWLEDGE_RERANKER_BUDGET_MS", "150"))
+
+_TOKEN = re.compile(r"\w+", re.UNICODE)
+_BM25_K1 = 1.2
+_BM25_B = 0.75
+
+# Cross-encoders carregados (None = falhou) e em carregamento, por nome do modelo
+_models: dict[str, Any] = {}
+_loading: set[str] = set()
+_models_lock = threading.Lock()
+
+
+def _tokens(text: str) -> list[str]:
+    return _TOKEN.findall(text.lower())
+
+
+def _load_cross_encoder(model: str) -> None:
+    try:
+        from sentence_transformers import CrossEncoder
+
+        encoder = CrossEncoder(model)
+        logger.info("Cross-encoder %s carregado", model)
+    except Exception as e:
+        logger.error("Não foi possível carregar o cross-encoder %s (%s); reranking desativado", model, e)
+        encoder = None
+    with _models_lock:
+        _models[model] = encoder
+
+
+def _cross_encoder(model: str) -> Any:
+    """Modelo carregado ou None (o primeiro pedido dispara o carregamento em background)."""
+    with _models_lock:
+        if model in _models:
+            return _models[model]
+        if model not in _loading:
+            _loading.add(model)
+            threading.Thread(target=_load_cross_encoder, args=(model,), name="reranker-load", daemon=True).start()
+    return None
+
+
+class LocalReranker(Reranker):
+    """Reranker BM25 ou cross-encoder com pontuação em lotes e orçamento de latência."""
+
+    method: str = "bm25"
+    model: str = KNOWLEDGE_RERANKER_MODEL
+    batch_size: int = KNOWLEDGE_RERANKER_BATCH_SIZE
+    budget_ms: int = KNOWLEDGE_RERANKER_BUDGET_MS
+
+    def _bm25_scorer(self, query: str, documents: list[Document]) -> Any:
+        """Pontuação BM25 da consulta contra cada candidato (IDF calculado sobre os candidatos)."""
+        terms = set(_tokens(query))
+        counts = [Counter(_tokens(doc.content or "")) for doc in documents]
+        lengths = [sum(c.values()) for c in counts]
+        avg_length = (sum(lengths) / len(lengths)) or 1.0
+        idf = {}
+        for term in terms:
+            df = sum(1 for c in counts if term in c)
+            idf[term] = math.log(1 + (len(documents) - df + 0.5) / (df + 0.5))
+
+        def score(batch: range) -> list[float]:
+            scores = []
+            for i in batch:
+                norm = _BM25_K1 * (1 - _BM25_B + _BM25_B * lengths[i] / avg_length)
+                scores.append(
+                    sum(idf[t] * counts[i][t] * (_BM25_K1 + 1) / (counts[i][t] + norm) for t in terms if counts[i][t])
+                )
+            return scores
+
+        return score
+
+    def _cross_encoder_scorer(self, query: str, documents: list[Document]) -> Any:
+        encoder = _cross_encoder(self.model)
+        if encoder is None:
+            return None
+
+        def score(batch: range) -> list[float]:
+            pairs = [[query, documents[i].content or ""] for i in batch]
+            return [float(s) for s in encoder.predict(pairs, batch_size=len(pairs), show_progress_bar=False)]
+
+        return score
+
+    def rerank(self, query: str, documents: list[Document]) -> list[Document]:
+        if len(documents) < 2:
+            return documents
+        started = time.monotonic()
+        deadline = started + self.budget_ms / 1000
+        try:
+            if self.method == "cross-encoder":
+                scorer = self._cross_encoder_scorer(query, documents)
+            else:
+                scorer = self._bm25_scorer(query, documents)
+            if scorer is None:
+                return documents
+            scores: list[float] = []
+            for start in range(0, len(documents), max(1, self.batch_size)):
+                if time.monotonic() > deadline:
+                    logger.warning(
+                        "Reranking excedeu %d ms (%d/%d pontuados); mantendo o ranking original",
+                        self.budget_ms,
+                        len(scores),
+                        len(documents),
+                    )
+                    return documents
+                scores.extend(scorer(range(start, min(start + self.batch_size, len(documents)))))
+        except Exception as e:
+            logger.error("Erro no reranking (%s); mantendo o ranking original", e)
+            return documents
+
+        for doc, score in zip(documents, scores):
+            doc.reranking_score = score
+            doc.meta_data["reranking_score"] = round(score, 6)
+        # Empate (ex.: nenhum termo da consulta no chunk): mantém a ordem original
+        order = sorted(range(len(documents)), key=lambda i: (-scores[i], i))
+        if self.method == "bm25":
+            # BM25 sozinho ignora a similaridade semântica: combina as duas posições por RRF
+            lexical = {i: position for position, i in enumerate(order)}
+            fused = {i: 1 / (KNOWLEDGE_RRF_K + i) + 1 / (KNOWLEDGE_RRF_K + lexical[i]) for i in lexical}
+            order = sorted(fused, key=lambda i: (-fused[i], i))
+        logger.debug("Reranking de %d candidatos em %.1f ms", len(documents), (time.monotonic() - started) * 1000)
+        return [documents[i] for i in order]
+
+
+def build_reranker() -> Optional[LocalReranker]:
+    """Reranker configurado no ambiente (None = desativado)."""
+    if KNOWLEDGE_RERANKER in ("bm25", "cross-encoder"):
+        reranker = LocalReranker(method=KNOWLEDGE_RERANKER)
+        if reranker.method == "cross-encoder":
+            _cross_encoder(reranker.model)
+        return reranker
+    if KNOWLEDGE_RERANKER not in ("", "none"):
+        logger.warning("KNOWLEDGE_RERANKER desconhecido: %s (use none, bm25 ou cross-encoder)", KNOWLEDGE_RERANKER)
+    return None
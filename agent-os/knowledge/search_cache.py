@@ -0,0 +1,205 @@
+"""
+Cache de resultados de busca da Knowledge.
+Chave: (tenant, tipo de busca, consulta normalizada, top_k, filtros); valor: ids dos chunks
+ranqueados e seus scores. Um hit evita o embedding da consulta e a busca ANN/full-text (só um
+SELECT por chave primária). Cada tenant tem uma geração: ingestão ou remoção de conteúdo do
+tenant incrementa a geração e invalida todas as entradas dele de uma vez.
+A geração também fica na tabela ai.knowledge_search_generations, compartilhada por todos os
+workers/pods: a gravação em um processo invalida o cache dos demais em até
+KNOWLEDGE_SEARCH_CACHE_SYNC_SECONDS (a geração compartilhada é relida no máximo nesse intervalo).
+Sem a tabela (KNOWLEDGE_SEARCH_CACHE_DB_ENABLED=false ou banco indisponível), os outros processos
+só deixam de servir o resultado antigo quando a entrada expira (KNOWLEDGE_SEARCH_CACHE_TTL).
+"""
+import hashlib
+import json
+import logging
+import re
+import threading
+import time
+from collections import OrderedDict
+from os import getenv
+from typing import Any
+
+from sqlalchemy import BigInteger, Column, MetaData, String, Table, select
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+SEARCH_GENERATIONS_TABLE = "knowledge_search_generations"
+SEARCH_GENERATIONS_SCHEMA = "ai"
+
+KNOWLEDGE_SEARCH_CACHE_SIZE = int(getenv("KNOWLEDGE_SEARCH_CACHE_SIZE", "2000"))
+# Validade máxima de uma entrada (segundos); 0 desliga o cache
+KNOWLEDGE_SEARCH_CACHE_TTL = int(getenv("KNOWLEDGE_SEARCH_CACHE_TTL", "300"))
+# Geração compartilhada no PostgreSQL (invalidação entre workers/pods) e intervalo de releitura (segundos)
+KNOWLEDGE_SEARCH_CACHE_DB_ENABLED = getenv("KNOWLEDGE_SEARCH_CACHE_DB_ENABLED", "true").lower() in ("1", "true", "yes")
+KNOWLEDGE_SEARCH_CACHE_SYNC_SECONDS = float(getenv("KNOWLEDGE_SEARCH_CACHE_SYNC_SECONDS", "2"))
+# Chaves de meta_data recalculadas a cada busca (guardadas junto com o id)
+SCORE_KEYS = ("similarity_score", "keyword_rank", "rrf_score", "reranking_score")
+
+
+def normalize_query(query: str) -> str:
+    return re.sub(r"\s+", " ", query).strip().lower()
+
+
+def _filters_key(filters: Any) -> str:
+    if filters is None:
+        return ""
+    if isinstance(filters, dict):
+        return json.dumps(filters, sort_keys=True, default=str)
+    return json.dumps([f.to_dict() if hasattr(f, "to_dict") else f for f in filters], sort_keys=True, default=str)
+
+
+class SearchCache:
+    """LRU com TTL e gerações por tenant (locais e compartilhadas no PostgreSQL)."""
+
+    def __init__(
+        self,
+        max_entries: int = KNOWLEDGE_SEARCH_CACHE_SIZE,
+        ttl: int = KNOWLEDGE_SEARCH_CACHE_TTL,
+        db_engine: Engine | None = None,
+        sync_seconds: float = KNOWLEDGE_SEARCH_CACHE_SYNC_SECONDS,
+    ) -> None:
+        self._max_entries = max_entries
+        self._ttl = ttl
+        self._entries: OrderedDict[str, tuple[float, list[tuple[str, dict]]]] = OrderedDict()
+        self._generations: dict[str | None, int] = {}
+        # Geração compartilhada por tenant: (lida em, valor)
+        self._shared: dict[str | None, tuple[float, int]] = {}
+        self._sync_seconds = sync_seconds
+        self._engine = db_engine
+        self._table: Table | None = None
+        self._db_disabled = not KNOWLEDGE_SEARCH_CACHE_DB_ENABLED or db_engine is None
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "invalidations": 0, "db_errors": 0}
+
+    @property
+    def enabled(self) -> bool:
+        return self._ttl > 0 and self._max_entries > 0
+
+    def key(self, tenant: str | None, search_type: str, query: str, limit: int, filters: Any) -> str:
+        """Chave da consulta na geração atual do tenant (calculada antes de buscar)."""
+        shared = self._shared_generation(tenant)
+        with self._lock:
+            generation = f"{self._generations.get(tenant, 0)}.{shared}"
+        raw = "\x1f".join(
+            [tenant or "", generation, search_type, normalize_query(query), str(limit), _filters_key(filters)]
+        )
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> list[tuple[str, dict]] | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self._stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._stats["hits"] += 1
+            return entry[1]
+
+    def put(self, key: str, ranked: list[tuple[str, dict]]) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self._ttl, ranked)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, tenant: str | None) -> None:
+        """Conteúdo do tenant mudou: entradas antigas deixam de ser alcançáveis (e saem pelo LRU/TTL)."""
+        with self._lock:
+            self._generations[tenant] = self._generations.get(tenant, 0) + 1
+            self._stats["invalidations"] += 1
+        if self._db_disabled:
+            return
+        try:
+            generation = self._db_bump(tenant)
+        except Exception as e:
+            self._count_db_error()
+            logger.warning("Geração compartilhada do cache de buscas indisponível na escrita: %s", e)
+            return
+        with self._lock:
+            self._shared[tenant] = (time.monotonic(), generation)
+
+    # --- Geração compartilhada (PostgreSQL) ---
+
+    def _count_db_error(self) -> None:
+        with self._lock:
+            self._stats["db_errors"] += 1
+
+    def _shared_generation(self, tenant: str | None) -> int:
+        """Geração do tenant na tabela compartilhada, relida no máximo a cada sync_seconds."""
+        if self._db_disabled:
+            return 0
+        with self._lock:
+            entry = self._shared.get(tenant)
+        now = time.monotonic()
+        if entry is not None and now - entry[0] < self._sync_seconds:
+            return entry[1]
+        try:
+            generation = self._db_generation(tenant)
+        except Exception as e:
+            self._count_db_error()
+            logger.warning("Geração compartilhada do cache de buscas indisponível na leitura: %s", e)
+            generation = entry[1] if entry else 0
+        with self._lock:
+            self._shared[tenant] = (now, generation)
+        return generation
+
+    def _get_table(self) -> Table:
+        if self._table is None:
+            table = Table(
+                SEARCH_GENERATIONS_TABLE,
+                MetaData(schema=SEARCH_GENERATIONS_SCHEMA),
+                Column("tenant", String, primary_key=True),
+                Column("generation", BigInteger, nullable=False),
+            )
+            try:
+                table.create(self._engine, checkfirst=True)
+            except Exception:
+                # Sem tabela, a invalidação entre processos fica só pelo TTL neste processo
+                self._db_disabled = True
+                raise
+            self._table = table
+        return self._table
+
+    def _db_generation(self, tenant: str | None) -> int:
+        table = self._get_table()
+        with self._engine.connect() as conn:
+            value = conn.execute(select(table.c.generation).where(table.c.tenant == (tenant or ""))).scalar()
+        return int(value or 0)
+
+    def _db_bump(self, tenant: str | None) -> int:
+        table = self._get_table()
+        stmt = postgresql.insert(table).values(tenant=tenant or "", generation=1)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["tenant"], set_={"generation": table.c.generation + 1}
+        ).returning(table.c.generation)
+        with self._engine.begin() as conn:
+            return int(conn.execute(stmt).scalar_one())
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+            entries = len(self._entries)
+        lookups = stats["hits"] + stats["misses"]
+        return {
+            **stats,
+            "entries": entries,
+            "hit_ratio": round(stats["hits"] / lookups, 4) if lookups else None,
+        }
+
+
+_search_cache: SearchCache | None = None
+
+
+def get_search_cache() -> SearchCache:
+    """Cache de buscas do processo (singleton)."""
+    global _search_cache
+    if _search_cache is None:
+        from db.engine import get_engine
+
+        _search_cache = SearchCache(db_engine=get_engine())
+    return _search_cache
@@ -0,0 +1,44 @@
+"""
+Chave de tenant da Knowledge.
+Resolvida da organização do request (get_current_organization, definida pelo X-Tenant);
+cada tenant tem a própria tabela de vetores (e o próprio índice ANN). Sem tenant (modo simples)
+os dados ficam na tabela base, como antes.
+A chave identifica o dono dos conteúdos e vetores (metadata "tenant") com ou sem tabelas por tenant:
+com KNOWLEDGE_TENANT_TABLES=false todos ficam na tabela base e as buscas filtram por essa metadata.
+"""
+import hashlib
+import re
+from os import getenv
+
+from config.organization_context import get_current_organization
+
+# Separa os vetores por tenant em tabelas próprias (knowledge_vectors__<tenant>)
+KNOWLEDGE_TENANT_TABLES = getenv("KNOWLEDGE_TENANT_TABLES", "true").lower() in ("1", "true", "yes")
+# Tamanho máximo da chave: tabela + "_hnsw_index_rebuild" cabem no limite de 63 do PostgreSQL
+_MAX_KEY_LENGTH = 24
+# Chave (metadata de conteúdos e vetores) com o tenant dono do documento
+TENANT_METADATA_KEY = "tenant"
+
+
+def tenant_key(name: str) -> str:
+    """Slug seguro para identificadores SQL; nomes que precisaram ser alterados ganham um hash."""
+    slug = re.sub(r"[^a-z0-9]+", "_", name.lower()).strip("_") or "tenant"
+    if slug != name or len(slug) > _MAX_KEY_LENGTH:
+        digest = hashlib.sha1(name.encode("utf-8")).hexdigest()[:8]
+        slug = f"{slug[: _MAX_KEY_LENGTH - 9]}_{digest}"
+    return slug
+
+
+def current_tenant_key() -> str | None:
+    """Tenant do contexto atual (None = modo simples); vale para filtros e posse dos documentos."""
+    org = get_current_organization()
+    return tenant_key(org.name) if org else None
+
+
+def current_table_tenant() -> str | None:
+    """Tenant que escolhe a tabela de vetores (None = tabela base, inclusive com tabelas por tenant desativadas)."""
+    return current_tenant_key() if KNOWLEDGE_TENANT_TABLES else None
+
+
+def tenant_table_name(base: str, tenant: str | None) -> str:
+    return f"{base}__{tenant}" if tenant else base
@@ -0,0 +1,821 @@
+"""
+PgVector da Knowledge com re-ingestão incremental.
+Cada chunk é identificado pelo hash do seu conteúdo: ao reenviar um documento já ingerido,
+chunks inalterados mantêm o vetor existente (sem novo embedding), apenas os chunks novos são
+embedados/inseridos e os vetores de chunks que deixaram de existir são removidos.
+Os embeddings dos chunks novos são gerados pelo EmbeddingPipeline (lotes concorrentes com
+controle de rate limit) antes da gravação. Com use_copy (padrão), remoções e inserções de um
+documento vão numa única transação com COPY binário (VectorCopyWriter), em vez de
+INSERT ... ON CONFLICT por lote; após grandes volumes gravados a tabela passa por ANALYZE.
+O índice ANN (HNSW/IVFFlat, ver knowledge.vector_index) é criado/reconstruído CONCURRENTLY e
+cada busca ajusta hnsw.ef_search / ivfflat.probes ao top_k pedido. A busca híbrida
+(knowledge.hybrid) combina full-text sobre um índice GIN de tsvector com a busca vetorial.
+Resultados de busca ficam no cache de consultas (knowledge.search_cache) e os documentos
+importantes do tenant ficam em memória (knowledge.important_docs); ambos são invalidados a cada
+gravação ou remoção no tenant.
+Multi-tenant: table/table_name são resolvidos pelo tenant do contexto (knowledge.tenancy);
+cada tenant grava e busca apenas na própria tabela (criada no primeiro uso) e no próprio índice.
+Com KNOWLEDGE_TENANT_TABLES=false a tabela base é compartilhada e as buscas filtram pela metadata "tenant".
+"""
+import asyncio
+import contextvars
+import hashlib
+import logging
+import threading
+import time
+from hashlib import md5
+from math import sqrt
+from os import getenv
+from typing import Any, Optional, Union
+
+from agno.filters import FilterExpr
+from agno.knowledge.document import Document
+from agno.vectordb.distance import Distance
+from agno.vectordb.pgvector import HNSW, Ivfflat, PgVector
+from agno.vectordb.score import normalize_score, score_to_distance_threshold
+from agno.vectordb.search import SearchType
+from psycopg.errors import UniqueViolation
+from sqlalchemy import Table, and_, bindparam, func, literal_column, or_, select, text
+from sqlalchemy.engine import Connection
+
+from db.engine import get_maintenance_engine, maintenance_session_state
+from knowledge.embedding_pipeline import EmbeddingPipeline
+from knowledge.hybrid import (
+    KNOWLEDGE_FTS_LANGUAGE,
+    KNOWLEDGE_HYBRID_CANDIDATES,
+    is_exact_identifier,
+    reciprocal_rank_fusion,
+    submit_search,
+)
+from knowledge.important_docs import get_important_docs
+from knowledge.reranker import KNOWLEDGE_RERANKER_CANDIDATES
+from knowledge.search_cache import SCORE_KEYS, get_search_cache
+from knowledge.tenancy import (
+    KNOWLEDGE_TENANT_TABLES,
+    TENANT_METADATA_KEY,
+    current_table_tenant,
+    current_tenant_key,
+    tenant_table_name,
+)
+from knowledge.vector_index import KNOWLEDGE_INDEX_AUTO_CREATE
+from knowledge.vector_writer import DELETE_BATCH_SIZE, VectorCopyWriter, update_meta_data
+
+logger = logging.getLogger(__name__)
+
+# Grava os chunks com COPY binário (uma transação por documento) em vez de INSERT por lote
+KNOWLEDGE_VECTOR_COPY = getenv("KNOWLEDGE_VECTOR_COPY", "true").lower() in ("1", "true", "yes")
+# Linhas gravadas via COPY (no processo) que disparam um ANALYZE da tabela de vetores
+KNOWLEDGE_ANALYZE_AFTER_ROWS = int(getenv("KNOWLEDGE_ANALYZE_AFTER_ROWS", "20000"))
+
+# Linhas gravadas desde o último ANALYZE, por tabela (fora da instância: PgVector é copiado com deepcopy)
+_rows_since_analyze: dict[str, int] = {}
+_analyze_lock = threading.Lock()
+# Tabelas cujo índice já foi verificado neste processo (KNOWLEDGE_INDEX_AUTO_CREATE)
+_index_checked: set[str] = set()
+# Tabelas SQLAlchemy por (schema, nome), compartilhadas entre cópias da instância
+_tables: dict[tuple[str, str], Table] = {}
+_tables_lock = threading.Lock()
+
+_DISTANCE_OPS = {
+    Distance.l2: "vector_l2_ops",
+    Distance.max_inner_product: "vector_ip_ops",
+    Distance.cosine: "vector_cosine_ops",
+}
+
+
+def chunk_hash(content: str) -> str:
+    """Hash do conteúdo de um chunk (identidade do chunk dentro do documento)."""
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+class KnowledgePgVector(PgVector):
+    """PgVector com upsert incremental por hash de chunk e embeddings em lote."""
+
+    use_copy: bool = KNOWLEDGE_VECTOR_COPY
+    auto_create_index: bool = KNOWLEDGE_INDEX_AUTO_CREATE
+
+    # --- Tabela por tenant ---
+
+    @property
+    def table_name(self) -> str:
+        return tenant_table_name(self.base_table_name, current_table_tenant())
+
+    @table_name.setter
+    def table_name(self, value: str) -> None:
+        self.base_table_name = value
+
+    @property
+    def table(self) -> Table:
+        """Tabela do tenant atual; a de um tenant novo é criada (com índices) no primeiro uso."""
+        name = self.table_name
+        table = _tables.get((self.schema, name))
+        if table is not None:
+            return table
+        with _tables_lock:
+            table = _tables.get((self.schema, name))
+            if table is None:
+                table = self.get_table()
+                if name != self.base_table_name:
+                    table.create(self.db_engine, checkfirst=True)
+                    logger.info("Tabela de vetores do tenant pronta: %s.%s", self.schema, name)
+                _tables[(self.schema, name)] = table
+        return table
+
+    @table.setter
+    def table(self, value: Table) -> None:
+        # PgVector.__init__/__deepcopy__ atribuem a tabela base; as de tenant são criadas sob demanda
+        if value.name == self.base_table_name:
+            with _tables_lock:
+                _tables[(self.schema, value.name)] = value
+
+    def _record_id(self, doc_id: str, content_hash: str) -> str:
+        # Mesma fórmula de PgVector._get_document_record
+        return md5(f"{doc_id}_{content_hash}".encode()).hexdigest()
+
+    def _existing_records(self, content_hash: str) -> dict[str, tuple[dict[str, Any], Any]]:
+        """Registros já gravados para o content_hash: {id: (meta_data, filters)}."""
+        with self.Session() as sess, sess.begin():
+            stmt = select(self.table.c.id, self.table.c.meta_data, self.table.c.filters).where(
+                self.table.c.content_hash == content_hash
+            )
+            return {row.id: (row.meta_data or {}, row.filters) for row in sess.execute(stmt)}
+
+    def _delete_record_ids(self, ids: list[str]) -> None:
+        with self.Session() as sess, sess.begin():
+            for i in range(0, len(ids), DELETE_BATCH_SIZE):
+                sess.execute(self.table.delete().where(self.table.c.id.in_(ids[i : i + DELETE_BATCH_SIZE])))
+
+    def _plan_upsert(
+        self, content_hash: str, documents: list[Document], filters: Optional[dict[str, Any]] = None
+    ) -> tuple[list[Document], list[str], dict[str, tuple[dict[str, Any], Any]]]:
+        """
+        Compara os chunks recebidos com os já gravados para o content_hash e retorna
+        (documentos que precisam de embedding, ids de registros de chunks que sumiram,
+        {id: (meta_data, filters)} dos chunks mantidos cuja metadata mudou, ex.: índice do chunk ou página).
+        """
+        by_record_id: dict[str, Document] = {}
+        for doc in documents:
+            doc.id = chunk_hash(self._clean_content(doc.content))
+            by_record_id[self._record_id(doc.id, content_hash)] = doc
+
+        existing = self._existing_records(content_hash)
+        stale = [record_id for record_id in existing if record_id not in by_record_id]
+        new_docs: list[Document] = []
+        updates: dict[str, tuple[dict[str, Any], Any]] = {}
+        for record_id, doc in by_record_id.items():
+            if record_id not in existing:
+                new_docs.append(doc)
+                continue
+            # Mesma metadata que _get_document_record gravaria para o chunk
+            meta_data = {**(doc.meta_data or {}), **(filters or {})}
+            if (meta_data, filters) != existing[record_id]:
+                updates[record_id] = (meta_data, filters)
+        logger.info(
+            "Upsert incremental %s: %d chunk(s) novos, %d inalterados (%d com metadata atualizada), %d removidos",
+            content_hash[:12],
+            len(new_docs),
+            len(by_record_id) - len(new_docs),
+            len(updates),
+            len(stale),
+        )
+        return new_docs, stale, updates
+
+    def _get_document_record(
+        self, doc: Document, filters: Optional[dict[str, Any]] = None, content_hash: str = ""
+    ) -> dict[str, Any]:
+        # Chunks já embedados pelo pipeline não passam de novo pelo embedder (um request por chunk)
+        if doc.embedding is None:
+            doc.embed(embedder=self.embedder)
+        cleaned_content = self._clean_content(doc.content)
+        meta_data = doc.meta_data or {}
+        if filters:
+            meta_data.update(filters)
+        return {
+            "id": self._record_id(doc.id or md5(cleaned_content.encode()).hexdigest(), content_hash),
+            "name": doc.name,
+            "meta_data": meta_data,
+            "filters": filters,
+            "content": cleaned_content,
+            "embedding": doc.embedding,
+            "usage": doc.usage,
+            "content_hash": content_hash,
+            "content_id": doc.content_id,
+        }
+
+    def _copy_write(
+        self,
+        content_hash: str,
+        documents: list[Document],
+        stale_ids: list[str],
+        filters: Optional[dict[str, Any]] = None,
+        updates: Optional[dict[str, tuple[dict[str, Any], Any]]] = None,
+    ) -> None:
+        """
+        Remove os chunks obsoletos, atualiza a metadata dos mantidos e grava os novos (já embedados)
+        com COPY, numa transação.
+        """
+        with VectorCopyWriter(self.db_engine, self.table) as writer:
+            writer.delete_ids(stale_ids)
+            writer.update_meta_data(updates or {})
+            written: set[str] = set()
+            for doc in documents:
+                record = self._get_document_record(doc, filters, content_hash)
+                if record["id"] not in written:
+                    written.add(record["id"])
+                    writer.add(record)
+        logger.info("COPY %s: %d registro(s) gravados, %d removidos", content_hash[:12], len(written), len(stale_ids))
+        self._maybe_analyze(len(written))
+
+    def _maybe_analyze(self, rows: int) -> None:
+        """ANALYZE após KNOWLEDGE_ANALYZE_AFTER_ROWS linhas em massa (estatísticas do planner)."""
+        with _analyze_lock:
+            total = _rows_since_analyze.get(self.table_name, 0) + rows
+            due = KNOWLEDGE_ANALYZE_AFTER_ROWS > 0 and total >= KNOWLEDGE_ANALYZE_AFTER_ROWS
+            _rows_since_analyze[self.table_name] = 0 if due else total
+        if due:
+            with self.db_engine.begin() as conn:
+                conn.execute(text(f'ANALYZE "{self.schema}"."{self.table_name}"'))
+            logger.info("ANALYZE %s.%s após %d linha(s) gravadas", self.schema, self.table_name, total)
+
+    # --- Vetores órfãos ---
+
+    def vector_tables(self) -> list[str]:
+        """Tabela base e tabelas de tenant existentes no schema."""
+        sql = text(
+            r"""
+            SELECT tablename FROM pg_tables
+            WHERE schemaname = :schema AND (tablename = :base OR tablename LIKE :prefix ESCAPE '\')
+            ORDER BY tablename
+            """
+        )
+        params = {
+            "schema": self.schema,
+            "base": self.base_table_name,
+            "prefix": self.base_table_name.replace("_", r"\_") + r"\_\_%",
+        }
+        with self.db_engine.connect() as conn:
+            return list(conn.execute(sql, params).scalars())
+
+    def delete_orphan_vectors(self, table_name: str, contents_table: str, batch_size: int) -> int:
+        """
+        Remove, em lotes (uma transação por lote), os vetores cujo content_id não existe mais em
+        `contents_table` ("schema"."tabela" já citado). Retorna o total removido.
+        """
+        table = f'"{self.schema}"."{table_name}"'
+        sql = text(
+            f"""
+            DELETE FROM {table} WHERE ctid = ANY(ARRAY(
+                SELECT v.ctid FROM {table} v
+                WHERE v.content_id IS NOT NULL
+                  AND NOT EXISTS (SELECT 1 FROM {contents_table} c WHERE c.id = v.content_id)
+                LIMIT :batch
+            ))
+            """
+        )
+        deleted = 0
+        while True:
+            with self.db_engine.begin() as conn:
+                count = conn.execute(sql, {"batch": batch_size}).rowcount
+            deleted += count
+            if count < batch_size:
+                break
+        if deleted:
+            tenant = table_name.split("__", 1)[1] if table_name != self.base_table_name else None
+            get_search_cache().invalidate(tenant)
+            get_important_docs().invalidate(tenant)
+        return deleted
+
+    def vacuum_table(self, table_name: str) -> None:
+        """VACUUM (ANALYZE): devolve o espaço dos vetores removidos e atualiza as estatísticas."""
+        with self._maintenance_connection() as conn:
+            conn.execute(text(f'VACUUM (ANALYZE) "{self.schema}"."{table_name}"'))
+
+    def _maintenance_connection(self) -> Connection:
+        """Conexão AUTOCOMMIT para DDL/VACUUM (direta ao PostgreSQL em modo PgBouncer, se configurada)."""
+        return get_maintenance_engine(self.db_engine).connect().execution_options(isolation_level="AUTOCOMMIT")
+
+    # --- Índice ANN ---
+
+    @property
+    def vector_index_name(self) -> str | None:
+        if self.vector_index is None:
+            return None
+        kind = "ivfflat" if isinstance(self.vector_index, Ivfflat) else "hnsw"
+        return self.vector_index.name or f"{self.table_name}_{kind}_index"
+
+    def vector_indexes(self, methods: tuple[str, ...] = ("hnsw", "ivfflat")) -> list[dict[str, Any]]:
+        """Índices da tabela com os métodos dados (padrão: ANN): nome, método, válido, tamanho e definição."""
+        sql = text(
+            """
+            SELECT c.relname AS name, am.amname AS method, i.indisvalid AS valid,
+                   pg_relation_size(c.oid) AS size_bytes, pg_get_indexdef(c.oid) AS definition
+            FROM pg_index i
+            JOIN pg_class c ON c.oid = i.indexrelid
+            JOIN pg_class t ON t.oid = i.indrelid
+            JOIN pg_namespace n ON n.oid = t.relnamespace
+            JOIN pg_am am ON am.oid = c.relam
+            WHERE n.nspname = :schema AND t.relname = :table AND am.amname = ANY(:methods)
+            """
+        )
+        params = {"schema": self.schema, "table": self.table_name, "methods": list(methods)}
+        with self.db_engine.connect() as conn:
+            return [dict(row._mapping) for row in conn.execute(sql, params)]
+
+    def index_build_progress(self) -> dict[str, Any] | None:
+        """Progresso de CREATE INDEX / REINDEX em andamento (pg_stat_progress_create_index)."""
+        sql = text(
+            """
+            SELECT p.command, p.phase, p.blocks_done, p.blocks_total, p.tuples_done, p.tuples_total
+            FROM pg_stat_progress_create_index p
+            WHERE p.relid = to_regclass(:table)
+            """
+        )
+        with self.db_engine.connect() as conn:
+            row = conn.execute(sql, {"table": f'"{self.schema}"."{self.table_name}"'}).first()
+        return dict(row._mapping) if row else None
+
+    def _index_ddl(self, index_name: str, conn) -> str:
+        ops = _DISTANCE_OPS.get(self.distance, "vector_cosine_ops")
+        table = f'"{self.schema}"."{self.table_name}"'
+        if isinstance(self.vector_index, Ivfflat):
+            lists = self.vector_index.lists
+            if self.vector_index.dynamic_lists:
+                rows = conn.execute(
+                    text("SELECT GREATEST(reltuples, 0)::bigint FROM pg_class WHERE oid = to_regclass(:t)"),
+                    {"t": table},
+                ).scalar() or 0
+                lists = max(int(rows / 1000), 1) if rows < 1_000_000 else max(int(sqrt(rows)), 1)
+            return (
+                f'CREATE INDEX CONCURRENTLY IF NOT EXISTS "{index_name}" ON {table} '
+                f"USING ivfflat (embedding {ops}) WITH (lists = {int(lists)})"
+            )
+        return (
+            f'CREATE INDEX CONCURRENTLY IF NOT EXISTS "{index_name}" ON {table} '
+            f"USING hnsw (embedding {ops}) "
+            f"WITH (m = {int(self.vector_index.m)}, ef_construction = {int(self.vector_index.ef_construction)})"
+        )
+
+    def build_vector_index(self, rebuild: bool = False) -> str:
+        """
+        Cria o índice configurado com CREATE INDEX CONCURRENTLY (não bloqueia escrita).
+        rebuild=True constrói um índice novo (ex.: parâmetros/tipo alterados) e só depois remove
+        o anterior e qualquer outro índice ANN da tabela. Índices inválidos (build interrompido)
+        são descartados e refeitos.
+        """
+        name = self.vector_index_name
+        if name is None:
+            return "Índice vetorial desabilitado (KNOWLEDGE_VECTOR_INDEX=none)"
+        if not self.table_exists():
+            return "Tabela de vetores ainda não existe"
+        existing = {index["name"]: index for index in self.vector_indexes()}
+        current = existing.get(name)
+        if current and current["valid"] and not rebuild:
+            return f"Índice {name} já existe"
+
+        target = f"{name}_rebuild" if current and current["valid"] else name
+        build_memory = (self.vector_index.configuration or {}).get("maintenance_work_mem")
+        if build_memory and not maintenance_session_state():
+            # Via PgBouncer (transaction pooling) o SET de sessão não chega ao CREATE INDEX
+            logger.warning("maintenance_work_mem ignorado: defina DB_DIRECT_HOST para builds de índice")
+            build_memory = None
+        with self._maintenance_connection() as conn:
+            for index_name in (name, target):
+                if index_name in existing and not existing[index_name]["valid"]:
+                    conn.execute(text(f'DROP INDEX CONCURRENTLY IF EXISTS "{self.schema}"."{index_name}"'))
+            if build_memory:
+                conn.execute(text("SELECT set_config('maintenance_work_mem', :v, false)"), {"v": build_memory})
+            try:
+                started = time.monotonic()
+                conn.execute(text(self._index_ddl(target, conn)))
+            finally:
+                if build_memory:
+                    conn.execute(text("RESET maintenance_work_mem"))
+            obsolete = [n for n, index in existing.items() if n != target and (rebuild or n == name) and index["valid"]]
+            for index_name in obsolete:
+                conn.execute(text(f'DROP INDEX CONCURRENTLY IF EXISTS "{self.schema}"."{index_name}"'))
+            if target != name:
+                conn.execute(text(f'ALTER INDEX "{self.schema}"."{target}" RENAME TO "{name}"'))
+        message = f"Índice {name} construído em {time.monotonic() - started:.1f}s"
+        logger.info(message)
+        return message
+
+    @property
+    def keyword_index_name(self) -> str:
+        return f"{self.table_name}_content_fts_index"
+
+    def build_keyword_index(self) -> str:
+        """Índice GIN de to_tsvector(KNOWLEDGE_FTS_LANGUAGE, content), CONCURRENTLY, para a busca full-text."""
+        if not self.table_exists():
+            return "Tabela de vetores ainda não existe"
+        name = self.keyword_index_name
+        existing = {index["name"]: index for index in self.vector_indexes(("gin",))}
+        if name in existing and existing[name]["valid"]:
+            return f"Índice {name} já existe"
+        with self._maintenance_connection() as conn:
+            if name in existing:
+                conn.execute(text(f'DROP INDEX CONCURRENTLY IF EXISTS "{self.schema}"."{name}"'))
+            conn.execute(
+                text(
+                    f'CREATE INDEX CONCURRENTLY IF NOT EXISTS "{name}" ON "{self.schema}"."{self.table_name}" '
+                    f"USING gin (to_tsvector('{KNOWLEDGE_FTS_LANGUAGE}'::regconfig, content))"
+                )
+            )
+        message = f"Índice {name} construído"
+        logger.info(message)
+        return message
+
+    def reindex_vector_index(self) -> str:
+        """REINDEX INDEX CONCURRENTLY do índice configurado (ex.: após muitas remoções)."""
+        name = self.vector_index_name
+        if name is None or name not in {index["name"] for index in self.vector_indexes()}:
+            return self.build_vector_index()
+        started = time.monotonic()
+        with self._maintenance_connection() as conn:
+            conn.execute(text(f'REINDEX INDEX CONCURRENTLY "{self.schema}"."{name}"'))
+        message = f"Índice {name} reindexado em {time.monotonic() - started:.1f}s"
+        logger.info(message)
+        return message
+
+    def drop_vector_index(self) -> None:
+        """Remove o índice vetorial (carga em massa: recriado uma vez no final)."""
+        if self.vector_index_name is not None:
+            self._drop_index(self.vector_index_name)
+
+    def _ensure_vector_index(self) -> None:
+        """Na primeira gravação do processo, cria os índices (ANN e full-text) em background se faltarem."""
+        if not self.auto_create_index:
+            return
+        with _analyze_lock:
+            if self.table_name in _index_checked:
+                return
+            _index_checked.add(self.table_name)
+
+        def create() -> None:
+            try:
+                if self.search_type != SearchType.vector:
+                    self.build_keyword_index()
+                if self.vector_index is not None:
+                    self.build_vector_index()
+            except Exception as e:
+                logger.warning("Não foi possível criar os índices de %s: %s", self.table_name, e)
+
+        # A thread herda o tenant do contexto atual (tabela/índice do tenant)
+        ctx = contextvars.copy_context()
+        threading.Thread(target=ctx.run, args=(create,), name="knowledge-index-create", daemon=True).start()
+
+    # --- Busca ---
+
+    def _search_settings(self, limit: int) -> list[str]:
+        """SET LOCAL por consulta: ef_search/probes nunca abaixo do top_k pedido."""
+        if isinstance(self.vector_index, HNSW):
+            return [f"SET LOCAL hnsw.ef_search = {max(int(self.vector_index.ef_search), limit)}"]
+        if isinstance(self.vector_index, Ivfflat):
+            return [f"SET LOCAL ivfflat.probes = {int(self.vector_index.probes)}"]
+        return []
+
+    def _tenant_conditions(self) -> list[Any]:
+        """Tabela base compartilhada (KNOWLEDGE_TENANT_TABLES=false): só os vetores do tenant atual."""
+        tenant = current_tenant_key()
+        if KNOWLEDGE_TENANT_TABLES or tenant is None:
+            return []
+        return [self.table.c.meta_data.contains({TENANT_METADATA_KEY: tenant})]
+
+    def _filter_conditions(self, filters: Optional[Union[dict[str, Any], list[FilterExpr]]]) -> list[Any]:
+        conditions = self._tenant_conditions()
+        if filters is None:
+            return conditions
+        if isinstance(filters, dict):
+            return [*conditions, self.table.c.meta_data.contains(filters)]
+        return [
+            *conditions,
+            *(self._dsl_to_sqlalchemy(f.to_dict() if hasattr(f, "to_dict") else f, self.table) for f in filters),
+        ]
+
+    def _row_document(self, row: Any, meta_data: dict[str, Any]) -> Document:
+        return Document(
+            id=row.id,
+            name=row.name,
+            meta_data=meta_data,
+            content=row.content,
+            embedder=self.embedder,
+            embedding=row.embedding,
+            usage=row.usage,
+        )
+
+    def _vector_candidates(
+        self, query_embedding: list[float], limit: int, filters: Optional[Union[dict[str, Any], list[FilterExpr]]]
+    ) -> list[Document]:
+        if self.distance == Distance.l2:
+            distance_expr = self.table.c.embedding.l2_distance(query_embedding)
+        elif self.distance == Distance.max_inner_product:
+            distance_expr = self.table.c.embedding.max_inner_product(query_embedding)
+        else:
+            distance_expr = self.table.c.embedding.cosine_distance(query_embedding)
+
+        stmt = select(
+            self.table.c.id,
+            self.table.c.name,
+            self.table.c.meta_data,
+            self.table.c.content,
+            self.table.c.embedding,
+            self.table.c.usage,
+            distance_expr.label("distance"),
+        )
+        conditions = self._filter_conditions(filters)
+        if self.similarity_threshold is not None:
+            threshold = score_to_distance_threshold(self.similarity_threshold, self.distance)
+            if self.distance == Distance.max_inner_product:
+                conditions.append(distance_expr <= -threshold)
+            else:
+                conditions.append(distance_expr <= threshold)
+        if conditions:
+            stmt = stmt.where(and_(*conditions))
+        stmt = stmt.order_by(distance_expr).limit(limit)
+
+        with self.Session() as sess, sess.begin():
+            for setting in self._search_settings(limit):
+                sess.execute(text(setting))
+            rows = sess.execute(stmt).fetchall()
+
+        results: list[Document] = []
+        for row in rows:
+            distance = -row.distance if self.distance == Distance.max_inner_product else row.distance
+            meta_data = dict(row.meta_data) if row.meta_data else {}
+            meta_data["similarity_score"] = normalize_score(distance, self.distance)
+            results.append(self._row_document(row, meta_data))
+        return results
+
+    def _fts_vector(self) -> Any:
+        # Mesma expressão do índice GIN (regconfig literal), senão o índice não é usado
+        return func.to_tsvector(literal_column(f"'{KNOWLEDGE_FTS_LANGUAGE}'::regconfig"), self.table.c.content)
+
+    def _keyword_candidates(
+        self, query: str, limit: int, filters: Optional[Union[dict[str, Any], list[FilterExpr]]]
+    ) -> list[Document]:
+        ts_vector = self._fts_vector()
+        ts_query = func.websearch_to_tsquery(
+            literal_column(f"'{KNOWLEDGE_FTS_LANGUAGE}'::regconfig"), bindparam("query", value=query)
+        )
+        rank = func.ts_rank_cd(ts_vector, ts_query)
+        stmt = (
+            select(
+                self.table.c.id,
+                self.table.c.name,
+                self.table.c.meta_data,
+                self.table.c.content,
+                self.table.c.embedding,
+                self.table.c.usage,
+                rank.label("rank"),
+            )
+            .where(ts_vector.op("@@")(ts_query), *self._filter_conditions(filters))
+            .order_by(rank.desc())
+            .limit(limit)
+        )
+        with self.Session() as sess, sess.begin():
+            rows = sess.execute(stmt).fetchall()
+
+        results: list[Document] = []
+        for row in rows:
+            meta_data = dict(row.meta_data) if row.meta_data else {}
+            meta_data["keyword_rank"] = float(row.rank)
+            results.append(self._row_document(row, meta_data))
+        return results
+
+    def _candidate_limit(self, limit: int) -> int:
+        """Candidatos buscados: com reranker, limit * KNOWLEDGE_RERANKER_CANDIDATES."""
+        if self.reranker:
+            return limit * max(1, KNOWLEDGE_RERANKER_CANDIDATES)
+        return limit
+
+    def _rerank(self, query: str, documents: list[Document], limit: int) -> list[Document]:
+        if self.reranker and documents:
+            documents = self.reranker.rerank(query=query, documents=documents)
+        return documents[:limit]
+
+    def vector_search(
+        self, query: str, limit: int = 5, filters: Optional[Union[dict[str, Any], list[FilterExpr]]] = None
+    ) -> list[Document]:
+        """Busca por similaridade com os parâmetros do índice ajustados à consulta."""
+        try:
+            query_embedding = self.embedder.get_embedding(query)
+            if not query_embedding:
+                logger.error("Embedding vazio para a consulta")
+                return []
+            results = self._vector_candidates(query_embedding, self._candidate_limit(limit), filters)
+        except Exception as e:
+            logger.error("Erro na busca vetorial: %s", e)
+            return []
+        return self._rerank(query, results, limit)
+
+    def keyword_search(
+        self, query: str, limit: int = 5, filters: Optional[Union[dict[str, Any], list[FilterExpr]]] = None
+    ) -> list[Document]:
+        """Full-text (websearch_to_tsquery) sobre o índice GIN, ordenado por ts_rank_cd."""
+        try:
+            results = self._keyword_candidates(query, self._candidate_limit(limit), filters)
+        except Exception as e:
+            logger.error("Erro na busca full-text: %s", e)
+            return []
+        return self._rerank(query, results, limit)
+
+    def hybrid_search(
+        self, query: str, limit: int = 5, filters: Optional[Union[dict[str, Any], list[FilterExpr]]] = None
+    ) -> list[Document]:
+        """
+        Full-text e vetorial em paralelo (a consulta full-text roda enquanto o embedding é gerado),
+        combinadas por RRF. Identificadores exatos usam só o full-text quando ele encontra algo.
+        """
+        if is_exact_identifier(query):
+            results = self.keyword_search(query, limit, filters)
+            if results:
+                return results
+
+        fused_limit = self._candidate_limit(limit)
+        candidates = max(limit * max(1, KNOWLEDGE_HYBRID_CANDIDATES), fused_limit)
+        keyword_future = submit_search(self._keyword_candidates, query, candidates, filters)
+        vector_results: list[Document] = []
+        try:
+            query_embedding = self.embedder.get_embedding(query)
+            if query_embedding:
+                vector_results = self._vector_candidates(query_embedding, candidates, filters)
+        except Exception as e:
+            logger.error("Erro na busca vetorial (híbrida): %s", e)
+        try:
+            keyword_results = keyword_future.result()
+        except Exception as e:
+            logger.error("Erro na busca full-text (híbrida): %s", e)
+            keyword_results = []
+
+        fused = reciprocal_rank_fusion([vector_results, keyword_results])[:fused_limit]
+        return self._rerank(query, fused, limit)
+
+    def _documents_by_ids(self, ranked: list[tuple[str, dict[str, Any]]]) -> list[Document] | None:
+        """Recarrega um resultado do cache pela chave primária (None se algum chunk não existe mais)."""
+        ids = [doc_id for doc_id, _ in ranked]
+        if not ids:
+            return []
+        stmt = select(
+            self.table.c.id,
+            self.table.c.name,
+            self.table.c.meta_data,
+            self.table.c.content,
+            self.table.c.embedding,
+            self.table.c.usage,
+        ).where(self.table.c.id.in_(ids))
+        with self.Session() as sess, sess.begin():
+            rows = {row.id: row for row in sess.execute(stmt)}
+        if len(rows) != len(set(ids)):
+            return None
+        results: list[Document] = []
+        for doc_id, scores in ranked:
+            row = rows[doc_id]
+            results.append(self._row_document(row, {**(dict(row.meta_data) if row.meta_data else {}), **scores}))
+        return results
+
+    def documents_by_name(self, names: list[str]) -> dict[str, list[Document]]:
+        """Chunks (em ordem) dos documentos com estes nomes, com ou sem extensão: {nome pedido: chunks}."""
+        stem = func.regexp_replace(self.table.c.name, r"\.[^./]+$", "")
+        stmt = (
+            select(
+                self.table.c.id,
+                self.table.c.name,
+                self.table.c.meta_data,
+                self.table.c.content,
+                self.table.c.embedding,
+                self.table.c.usage,
+                stem.label("stem"),
+            )
+            .where(or_(self.table.c.name.in_(names), stem.in_(names)), *self._tenant_conditions())
+            .order_by(self.table.c.name, self.table.c.meta_data["chunk"].as_integer(), self.table.c.id)
+        )
+        with self.Session() as sess, sess.begin():
+            rows = sess.execute(stmt).fetchall()
+        docs: dict[str, list[Document]] = {}
+        for row in rows:
+            key = row.name if row.name in names else row.stem
+            docs.setdefault(key, []).append(self._row_document(row, dict(row.meta_data) if row.meta_data else {}))
+        return docs
+
+    def search(
+        self, query: str, limit: int = 5, filters: Optional[Union[dict[str, Any], list[FilterExpr]]] = None
+    ) -> list[Document]:
+        """Busca com cache: um hit não gera embedding nem consulta o índice."""
+        cache = get_search_cache()
+        if not cache.enabled:
+            return super().search(query=query, limit=limit, filters=filters)
+        # Chave calculada antes da busca: uma gravação concorrente invalida este resultado
+        key = cache.key(current_tenant_key(), self.search_type.value, query, limit, filters)
+        ranked = cache.get(key)
+        if ranked is not None:
+            try:
+                cached = self._documents_by_ids(ranked)
+            except Exception as e:
+                logger.warning("Erro ao recarregar busca do cache: %s", e)
+                cached = None
+            if cached is not None:
+                return cached
+
+        results = super().search(query=query, limit=limit, filters=filters)
+        if results:
+            cache.put(
+                key,
+                [(doc.id, {k: v for k, v in (doc.meta_data or {}).items() if k in SCORE_KEYS}) for doc in results],
+            )
+        return results
+
+    def _content_changed(self) -> None:
+        """Invalida o cache de buscas e os documentos importantes do tenant."""
+        tenant = current_tenant_key()
+        get_search_cache().invalidate(tenant)
+        get_important_docs().invalidate(tenant)
+
+    # --- Gravação e remoção (invalidam o cache de buscas e os documentos importantes do tenant) ---
+
+    async def _async_embed_documents(self, batch_docs: list[Document]) -> None:
+        await asyncio.to_thread(EmbeddingPipeline(self.embedder).embed_documents, batch_docs)
+
+    def upsert(
+        self,
+        content_hash: str,
+        documents: list[Document],
+        filters: Optional[dict[str, Any]] = None,
+        batch_size: int = 100,
+    ) -> None:
+        new_docs, stale_ids, updates = self._plan_upsert(content_hash, documents, filters)
+        self._ensure_vector_index()
+        if new_docs:
+            EmbeddingPipeline(self.embedder).embed_documents(new_docs)
+        try:
+            if self.use_copy:
+                try:
+                    self._copy_write(content_hash, new_docs, stale_ids, filters, updates)
+                    return
+                except UniqueViolation:
+                    # Outro processo gravou o mesmo chunk no meio tempo: cai para o upsert por lote
+                    logger.warning("COPY %s encontrou ids existentes; usando upsert", content_hash[:12])
+            if stale_ids:
+                self._delete_record_ids(stale_ids)
+            if updates:
+                with self.Session() as sess, sess.begin():
+                    update_meta_data(sess, self.table, updates)
+            if new_docs:
+                self._upsert(content_hash, new_docs, filters, batch_size)
+        finally:
+            if new_docs or stale_ids or updates:
+                self._content_changed()
+
+    async def async_upsert(
+        self,
+        content_hash: str,
+        documents: list[Document],
+        filters: Optional[dict[str, Any]] = None,
+        batch_size: int = 100,
+    ) -> None:
+        # Mesmo plano e mesma pipeline (embedding em lote + COPY) do upsert síncrono, fora do event loop
+        await asyncio.to_thread(self.upsert, content_hash, documents, filters, batch_size)
+
+    def update_metadata(self, content_id: str, metadata: dict[str, Any]) -> None:
+        super().update_metadata(content_id, metadata)
+        self._content_changed()
+
+    def delete(self) -> bool:
+        try:
+            return super().delete()
+        finally:
+            self._content_changed()
+
+    def delete_by_id(self, id: str) -> bool:
+        try:
+            return super().delete_by_id(id)
+        finally:
+            self._content_changed()
+
+    def delete_by_name(self, name: str) -> bool:
+        try:
+            return super().delete_by_name(name)
+        finally:
+            self._content_changed()
+
+    def delete_by_metadata(self, metadata: dict[str, Any]) -> bool:
+        try:
+            return super().delete_by_metadata(metadata)
+        finally:
+            self._content_changed()
+
+    def delete_by_content_id(self, content_id: str) -> bool:
+        try:
+            return super().delete_by_content_id(content_id)
+        finally:
+            self._content_changed()
+
+    def _delete_by_content_hash(self, content_hash: str) -> bool:
+        try:
+            return super()._delete_by_content_hash(content_hash)
+        finally:
+            self._content_changed()
+
+    def drop(self) -> None:
+        try:
+            super().drop()
+        finally:
+            self._content_changed()
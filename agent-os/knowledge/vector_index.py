@@ -0,0 +1,108 @@
+"""
+Índice ANN (HNSW / IVFFlat) da tabela de vetores da Knowledge.
+Tipo e parâmetros vêm do ambiente (por deployment). A criação usa CREATE INDEX CONCURRENTLY
+(sem bloquear a ingestão), o rebuild cria um índice novo e só então descarta o antigo, e o
+reindex usa REINDEX INDEX CONCURRENTLY. ef_search/probes são aplicados por consulta (SET LOCAL).
+Operações longas rodam em background e são acompanhadas por GET /knowledge/admin/index.
+"""
+import contextvars
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from os import getenv
+from typing import Any, Callable
+
+from agno.vectordb.pgvector import HNSW, Ivfflat
+
+logger = logging.getLogger(__name__)
+
+# hnsw | ivfflat | none
+KNOWLEDGE_VECTOR_INDEX = getenv("KNOWLEDGE_VECTOR_INDEX", "hnsw").lower()
+KNOWLEDGE_HNSW_M = int(getenv("KNOWLEDGE_HNSW_M", "16"))
+KNOWLEDGE_HNSW_EF_CONSTRUCTION = int(getenv("KNOWLEDGE_HNSW_EF_CONSTRUCTION", "64"))
+# Mínimo por consulta; cada busca usa max(ef_search, limit) para não truncar o top_k
+KNOWLEDGE_HNSW_EF_SEARCH = int(getenv("KNOWLEDGE_HNSW_EF_SEARCH", "40"))
+# 0 = dinâmico: linhas/1000 até 1M linhas, sqrt(linhas) acima disso
+KNOWLEDGE_IVFFLAT_LISTS = int(getenv("KNOWLEDGE_IVFFLAT_LISTS", "0"))
+KNOWLEDGE_IVFFLAT_PROBES = int(getenv("KNOWLEDGE_IVFFLAT_PROBES", "10"))
+# maintenance_work_mem da sessão que constrói o índice
+KNOWLEDGE_INDEX_BUILD_MEMORY = getenv("KNOWLEDGE_INDEX_BUILD_MEMORY", "512MB")
+# Cria o índice (CONCURRENTLY, em background) após a primeira gravação do processo, se faltar
+KNOWLEDGE_INDEX_AUTO_CREATE = getenv("KNOWLEDGE_INDEX_AUTO_CREATE", "true").lower() in ("1", "true", "yes")
+
+INDEX_ACTIONS = ("create", "rebuild", "reindex")
+
+
+def build_vector_index() -> HNSW | Ivfflat | None:
+    """Configuração do índice vetorial a partir do ambiente."""
+    if KNOWLEDGE_VECTOR_INDEX == "ivfflat":
+        return Ivfflat(
+            lists=KNOWLEDGE_IVFFLAT_LISTS or 100,
+            probes=KNOWLEDGE_IVFFLAT_PROBES,
+            dynamic_lists=KNOWLEDGE_IVFFLAT_LISTS == 0,
+            configuration={"maintenance_work_mem": KNOWLEDGE_INDEX_BUILD_MEMORY},
+        )
+    if KNOWLEDGE_VECTOR_INDEX == "hnsw":
+        return HNSW(
+            m=KNOWLEDGE_HNSW_M,
+            ef_construction=KNOWLEDGE_HNSW_EF_CONSTRUCTION,
+            ef_search=KNOWLEDGE_HNSW_EF_SEARCH,
+            configuration={"maintenance_work_mem": KNOWLEDGE_INDEX_BUILD_MEMORY},
+        )
+    return None
+
+
+class IndexOperationRunning(Exception):
+    """Já existe uma operação de índice em andamento neste processo."""
+
+
+@dataclass
+class IndexOperation:
+    action: str
+    status: str = "running"
+    started_at: float = 0.0
+    finished_at: float | None = None
+    message: str | None = None
+
+    def to_dict(self) -> dict[str, Any]:
+        data: dict[str, Any] = {"action": self.action, "status": self.status, "started_at": int(self.started_at)}
+        if self.finished_at:
+            data["duration_ms"] = int((self.finished_at - self.started_at) * 1000)
+        if self.message:
+            data["message"] = self.message
+        return data
+
+
+_operation: IndexOperation | None = None
+_operation_lock = threading.Lock()
+
+
+def current_operation() -> IndexOperation | None:
+    return _operation
+
+
+def start_index_operation(action: str, run: Callable[[], str | None]) -> IndexOperation:
+    """Executa `run` numa thread (uma operação por vez no processo); o retorno vira a mensagem final."""
+    global _operation
+    with _operation_lock:
+        if _operation is not None and _operation.status == "running":
+            raise IndexOperationRunning(f"Operação '{_operation.action}' em andamento")
+        operation = IndexOperation(action=action, started_at=time.time())
+        _operation = operation
+
+    def worker() -> None:
+        try:
+            operation.message = run()
+            operation.status = "completed"
+        except Exception as e:
+            logger.exception("Falha na operação de índice %s", action)
+            operation.status = "failed"
+            operation.message = str(e)
+        finally:
+            operation.finished_at = time.time()
+
+    # Mesmo tenant do request (tabela/índice do tenant)
+    ctx = contextvars.copy_context()
+    threading.Thread(target=ctx.run, args=(worker,), name=f"knowledge-index-{action}", daemon=True).start()
+    return operation
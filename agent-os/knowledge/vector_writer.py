@@ -0,0 +1,108 @@
+"""
+Gravação em massa de vetores com COPY binário (psycopg3).
+VectorCopyWriter acumula as linhas de chunk de um documento e as envia com
+COPY ... FROM STDIN (FORMAT BINARY) em blocos de COPY_FLUSH_ROWS, numa única transação junto
+com a remoção dos chunks que deixaram de existir e a atualização da metadata dos chunks mantidos:
+o documento nunca fica gravado pela metade.
+"""
+import logging
+from os import getenv
+from typing import Any
+
+from pgvector.psycopg import register_vector
+from sqlalchemy import Table, bindparam
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+# Linhas acumuladas antes de cada COPY (o buffer guarda os embeddings em memória)
+COPY_FLUSH_ROWS = int(getenv("KNOWLEDGE_COPY_FLUSH_ROWS", "1000"))
+# Quantidade de ids por DELETE ... WHERE id IN (...)
+DELETE_BATCH_SIZE = 500
+# Colunas preenchidas no COPY (created_at/updated_at ficam com os defaults da tabela)
+COPY_COLUMNS = ("id", "name", "meta_data", "filters", "content", "embedding", "usage", "content_hash", "content_id")
+COPY_TYPES = ("text", "text", "jsonb", "jsonb", "text", "vector", "jsonb", "text", "text")
+
+
+def update_meta_data(
+    conn: Connection | Session, table: Table, updates: dict[str, tuple[dict[str, Any], Any]]
+) -> None:
+    """Regrava meta_data e filters dos registros {id: (meta_data, filters)}, sem tocar nos embeddings."""
+    if not updates:
+        return
+    stmt = (
+        table.update()
+        .where(table.c.id == bindparam("record_id"))
+        .values(meta_data=bindparam("new_meta_data"), filters=bindparam("new_filters"))
+    )
+    conn.execute(
+        stmt,
+        [
+            {"record_id": record_id, "new_meta_data": meta_data, "new_filters": filters}
+            for record_id, (meta_data, filters) in updates.items()
+        ],
+    )
+
+
+class VectorCopyWriter:
+    """
+    Uso:
+        with VectorCopyWriter(engine, table) as writer:
+            writer.delete_ids(stale_ids)
+            writer.update_meta_data(updates)
+            for record in records:
+                writer.add(record)
+    Commit ao sair do bloco; qualquer erro desfaz o documento inteiro.
+    """
+
+    def __init__(self, engine: Engine, table: Table, flush_rows: int = COPY_FLUSH_ROWS) -> None:
+        self._engine = engine
+        self._table = table
+        self._flush_rows = max(1, flush_rows)
+        self._buffer: list[tuple[Any, ...]] = []
+        self._copy_sql = (
+            f'COPY "{table.schema}"."{table.name}" ({", ".join(COPY_COLUMNS)}) FROM STDIN (FORMAT BINARY)'
+        )
+        self.rows_written = 0
+        self.rows_deleted = 0
+
+    def __enter__(self) -> "VectorCopyWriter":
+        self._transaction = self._engine.begin()
+        self._conn = self._transaction.__enter__()
+        self._raw = self._conn.connection.driver_connection
+        # Adapta list[float] para o tipo vector no formato binário
+        register_vector(self._raw)
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        if exc_type is None:
+            try:
+                self.flush()
+            except BaseException as e:
+                return self._transaction.__exit__(type(e), e, e.__traceback__)
+        return self._transaction.__exit__(exc_type, exc, tb)
+
+    def delete_ids(self, ids: list[str]) -> None:
+        for i in range(0, len(ids), DELETE_BATCH_SIZE):
+            batch = ids[i : i + DELETE_BATCH_SIZE]
+            self._conn.execute(self._table.delete().where(self._table.c.id.in_(batch)))
+        self.rows_deleted += len(ids)
+
+    def update_meta_data(self, updates: dict[str, tuple[dict[str, Any], Any]]) -> None:
+        update_meta_data(self._conn, self._table, updates)
+
+    def add(self, record: dict[str, Any]) -> None:
+        self._buffer.append(tuple(record[column] for column in COPY_COLUMNS))
+        if len(self._buffer) >= self._flush_rows:
+            self.flush()
+
+    def flush(self) -> None:
+        if not self._buffer:
+            return
+        with self._raw.cursor() as cursor, cursor.copy(self._copy_sql) as copy:
+            copy.set_types(COPY_TYPES)
+            for row in self._buffer:
+                copy.write_row(row)
+        self.rows_written += len(self._buffer)
+        self._buffer.clear()
@@ -2,13 +2,20 @@
 Middleware multi-tenant: define organização a partir do header X-Tenant.
 Se o header estiver presente e o tenant existir na config, o contexto é preenchido.
 Caso contrário (sem header, vazio ou tenant inexistente), contexto fica None = modo simples (env).
+Middleware ASGI puro (sem BaseHTTPMiddleware): não cria task nem stream de memória por request e
+repassa o corpo das respostas (SSE dos agentes) sem bufferizar; o contexto vale até o fim do stream.
+Benchmark: scripts/bench_tenant_middleware.py.
+Requests que iniciam runs (POST /agents|teams|workflows/{id}/runs) passam pelo escalonador por
+tenant (middleware.run_scheduler): limite de concorrência, fila justa e 429 com Retry-After.
 """
 import logging
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.requests import Request
 
-from config.organization_config import organization_config_manager
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from config.organization_config import RunLimits, organization_config_manager
 from config.organization_context import set_current_organization, clear_current_organization
+from middleware.run_scheduler import RUN_PATH, RunQueueFull, get_run_scheduler
 
 logger = logging.getLogger(__name__)
 
@@ -17,29 +24,57 @@ TENANT_HEADER = "X-Tenant"
 # Fallback para compatibilidade com clientes que ainda enviam X-Organization
 ORGANIZATION_HEADER_FALLBACK = "X-Organization"
 
+_TENANT_HEADER_KEY = TENANT_HEADER.lower().encode("latin-1")
+_ORGANIZATION_HEADER_KEY = ORGANIZATION_HEADER_FALLBACK.lower().encode("latin-1")
+
 
-def _get_tenant_id(request: Request) -> str | None:
-    """Lê o tenant do header X-Tenant ou, se ausente, X-Organization."""
-    value = request.headers.get(TENANT_HEADER) or request.headers.get(ORGANIZATION_HEADER_FALLBACK)
-    return value.strip() if value and value.strip() else None
+def _get_tenant_id(scope: Scope) -> str | None:
+    """Lê o tenant do header X-Tenant ou, se ausente, X-Organization (headers crus do scope)."""
+    tenant = organization = None
+    for name, value in scope.get("headers", ()):
+        if name == _TENANT_HEADER_KEY and tenant is None:
+            tenant = value.decode("latin-1").strip()
+        elif name == _ORGANIZATION_HEADER_KEY and organization is None:
+            organization = value.decode("latin-1").strip()
+    return tenant or organization or None
 
 
-class OrganizationMiddleware(BaseHTTPMiddleware):
+class OrganizationMiddleware:
     """Define a organização atual por request a partir do header X-Tenant (ou X-Organization)."""
 
-    async def dispatch(self, request: Request, call_next):
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] not in ("http", "websocket"):
+            await self.app(scope, receive, send)
+            return
         try:
-            tenant_id = _get_tenant_id(request)
+            org = None
+            tenant_id = _get_tenant_id(scope)
             if tenant_id:
                 org = organization_config_manager.get_organization(tenant_id)
                 if org:
-                    set_current_organization(org)
                     logger.debug("Tenant definido: %s", tenant_id)
                 else:
                     logger.warning("Tenant não configurado: %s (modo simples)", tenant_id)
-                    set_current_organization(None)
-            else:
-                set_current_organization(None)
-            return await call_next(request)
+            set_current_organization(org)
+            scheduler = get_run_scheduler()
+            if scheduler is None or scope.get("method") != "POST" or not RUN_PATH.match(scope["path"]):
+                await self.app(scope, receive, send)
+                return
+            try:
+                slot = scheduler.slot(org.name if org else "", org.run_limits if org else RunLimits())
+                await slot.__aenter__()
+            except RunQueueFull as e:
+                response = JSONResponse(
+                    {"detail": str(e)}, status_code=429, headers={"Retry-After": str(e.retry_after)}
+                )
+                await response(scope, receive, send)
+                return
+            try:
+                await self.app(scope, receive, send)
+            finally:
+                await slot.__aexit__(None, None, None)
         finally:
             clear_current_organization()
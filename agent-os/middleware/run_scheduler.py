@@ -0,0 +1,171 @@
+"""
+Escalonador de runs de agentes/times/workflows por tenant (POST .../runs e .../continue).
+Cada tenant tem limite de runs simultâneos e de runs na fila (OrganizationSettings.run_limits);
+fila cheia = 429 com Retry-After estimado pela duração média dos runs do tenant. Quando as vagas
+do processo (AGENT_RUNS_MAX_CONCURRENT) estão ocupadas, a próxima vaga vai para o run com a
+menor tag de término virtual (weighted fair queuing): cada run de um tenant avança a tag dele
+em 1/peso, então um tenant com dezenas de runs na fila não passa na frente dos demais.
+A vaga é mantida até o fim da resposta (inclusive o stream SSE). Limites por processo uvicorn.
+"""
+import asyncio
+import itertools
+import logging
+import math
+import re
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from os import getenv
+from typing import AsyncIterator
+
+from config.organization_config import RunLimits
+
+logger = logging.getLogger(__name__)
+
+# Runs simultâneos no processo, somando todos os tenants (0 desativa o escalonador)
+AGENT_RUNS_MAX_CONCURRENT = int(getenv("AGENT_RUNS_MAX_CONCURRENT", "32"))
+# Duração assumida de um run antes de haver medições (estimativa do Retry-After)
+_DEFAULT_RUN_SECONDS = 10.0
+_RUN_SECONDS_ALPHA = 0.2
+
+# Rotas do AgentOS que iniciam (ou retomam) um run
+RUN_PATH = re.compile(r"^/(agents|teams|workflows)/[^/]+/runs(/[^/]+/continue)?/?$")
+
+
+class RunQueueFull(Exception):
+    """A fila de runs do tenant está cheia."""
+
+    def __init__(self, tenant: str, retry_after: int) -> None:
+        super().__init__(f"Fila de runs do tenant {tenant or '(padrão)'} cheia")
+        self.retry_after = retry_after
+
+
+@dataclass
+class _Waiter:
+    finish: float
+    seq: int
+    future: asyncio.Future
+
+
+@dataclass
+class _TenantState:
+    limits: RunLimits
+    running: int = 0
+    queue: deque[_Waiter] = field(default_factory=deque)
+    # Tag de término virtual do último run admitido do tenant
+    last_finish: float = 0.0
+    # Média móvel da duração dos runs (segundos)
+    run_seconds: float = _DEFAULT_RUN_SECONDS
+
+
+class RunScheduler:
+    """Vagas de run por tenant e por processo, com fila justa ponderada entre tenants (asyncio)."""
+
+    def __init__(self, capacity: int = AGENT_RUNS_MAX_CONCURRENT) -> None:
+        self.capacity = capacity
+        self._running = 0
+        self._virtual_time = 0.0
+        self._seq = itertools.count()
+        self._tenants: dict[str, _TenantState] = {}
+
+    def _state(self, tenant: str, limits: RunLimits) -> _TenantState:
+        state = self._tenants.get(tenant)
+        if state is None:
+            state = self._tenants[tenant] = _TenantState(limits=limits)
+        # Limites atuais da organização (a configuração pode ter sido recarregada)
+        state.limits = limits
+        return state
+
+    def _finish_tag(self, state: _TenantState) -> float:
+        state.last_finish = max(self._virtual_time, state.last_finish) + 1 / state.limits.weight
+        return state.last_finish
+
+    def _retry_after(self, state: _TenantState) -> int:
+        waves = (len(state.queue) + state.running) / state.limits.max_concurrent_runs
+        return max(1, math.ceil(waves * state.run_seconds))
+
+    def _grant(self, state: _TenantState, finish: float) -> None:
+        state.running += 1
+        self._running += 1
+        self._virtual_time = max(self._virtual_time, finish)
+
+    def _dispatch(self) -> None:
+        """Entrega vagas livres aos runs na fila, menor tag de término primeiro."""
+        while self._running < self.capacity:
+            ready = [
+                s for s in self._tenants.values() if s.queue and s.running < s.limits.max_concurrent_runs
+            ]
+            if not ready:
+                return
+            state = min(ready, key=lambda s: (s.queue[0].finish, s.queue[0].seq))
+            waiter = state.queue.popleft()
+            if waiter.future.done():
+                continue
+            self._grant(state, waiter.finish)
+            waiter.future.set_result(None)
+
+    async def _acquire(self, tenant: str, limits: RunLimits) -> _TenantState:
+        state = self._state(tenant, limits)
+        if not state.queue and state.running < limits.max_concurrent_runs and self._running < self.capacity:
+            self._grant(state, self._finish_tag(state))
+            return state
+        if len(state.queue) >= limits.max_queued_runs:
+            raise RunQueueFull(tenant, self._retry_after(state))
+        waiter = _Waiter(self._finish_tag(state), next(self._seq), asyncio.get_running_loop().create_future())
+        state.queue.append(waiter)
+        try:
+            await waiter.future
+        except asyncio.CancelledError:
+            # Cliente desconectou na fila; se a vaga já tinha sido entregue, devolve
+            if waiter.future.done() and not waiter.future.cancelled():
+                self._release(state, None)
+            elif waiter in state.queue:
+                state.queue.remove(waiter)
+            raise
+        return state
+
+    def _release(self, state: _TenantState, started: float | None) -> None:
+        state.running -= 1
+        self._running -= 1
+        if started is not None:
+            elapsed = time.monotonic() - started
+            state.run_seconds += _RUN_SECONDS_ALPHA * (elapsed - state.run_seconds)
+        self._dispatch()
+
+    @asynccontextmanager
+    async def slot(self, tenant: str, limits: RunLimits) -> AsyncIterator[None]:
+        """Aguarda uma vaga para o run do tenant (RunQueueFull se a fila dele estiver cheia)."""
+        queued = time.monotonic()
+        state = await self._acquire(tenant, limits)
+        started = time.monotonic()
+        if started - queued > 0.1:
+            logger.info("Run do tenant %s aguardou %.1fs na fila", tenant or "(padrão)", started - queued)
+        try:
+            yield
+        finally:
+            self._release(state, started)
+
+    def stats(self) -> dict:
+        return {
+            "capacity": self.capacity,
+            "running": self._running,
+            "tenants": {
+                tenant or "(padrão)": {"running": s.running, "queued": len(s.queue)}
+                for tenant, s in self._tenants.items()
+                if s.running or s.queue
+            },
+        }
+
+
+_run_scheduler: RunScheduler | None = None
+
+
+def get_run_scheduler() -> RunScheduler | None:
+    """Escalonador do processo (singleton); None quando AGENT_RUNS_MAX_CONCURRENT=0."""
+    global _run_scheduler
+    if AGENT_RUNS_MAX_CONCURRENT <= 0:
+        return None
+    if _run_scheduler is None:
+        _run_scheduler = RunScheduler()
+    return _run_scheduler
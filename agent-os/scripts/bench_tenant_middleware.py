@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark do middleware de tenant: a implementação anterior com BaseHTTPMiddleware vs o
+OrganizationMiddleware ASGI puro (e sem middleware como referência).
+
+Cada variante é servida pelo uvicorn (em processo separado) numa porta local com dois endpoints que
+leem o tenant da ContextVar: /ping (JSON pequeno, mede requisições/s) e /stream (SSE como os streams
+dos agentes, mede o tempo até o primeiro token e o tempo total do stream). Toda requisição envia
+X-Tenant. Não precisa de banco nem de modelo.
+
+Uso (diretório agent-os):
+    python scripts/bench_tenant_middleware.py
+    python scripts/bench_tenant_middleware.py --requests 5000 --concurrency 64 --streams 200
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import socket
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+BENCH_TENANT = "bench"
+# Lido por config.organization_config na importação
+os.environ["TENANTS_CONFIG_JSON"] = json.dumps(
+    {
+        "organizations": {
+            BENCH_TENANT: {
+                "azure_openai": {"api_key": "-", "endpoint": "https://bench.invalid"},
+                "azure_search": {"api_key": "-", "endpoint": "https://bench.invalid", "index_name": "-"},
+            }
+        }
+    }
+)
+
+import httpx  # noqa: E402
+import uvicorn  # noqa: E402
+from starlette.applications import Starlette  # noqa: E402
+from starlette.middleware.base import BaseHTTPMiddleware  # noqa: E402
+from starlette.requests import Request  # noqa: E402
+from starlette.responses import JSONResponse, StreamingResponse  # noqa: E402
+from starlette.routing import Route  # noqa: E402
+
+from config.organization_config import organization_config_manager  # noqa: E402
+from config.organization_context import (  # noqa: E402
+    clear_current_organization,
+    get_current_organization,
+    set_current_organization,
+)
+from middleware.organization_middleware import OrganizationMiddleware  # noqa: E402
+
+
+class LegacyOrganizationMiddleware(BaseHTTPMiddleware):
+    """Implementação com BaseHTTPMiddleware substituída pelo OrganizationMiddleware."""
+
+    async def dispatch(self, request: Request, call_next):
+        try:
+            value = request.headers.get("X-Tenant") or request.headers.get("X-Organization")
+            tenant_id = value.strip() if value and value.strip() else None
+            set_current_organization(organization_config_manager.get_organization(tenant_id) if tenant_id else None)
+            return await call_next(request)
+        finally:
+            clear_current_organization()
+
+
+def build_app(variant: str, events: int, event_delay: float) -> Starlette:
+    def tenant_name() -> str | None:
+        org = get_current_organization()
+        return org.name if org else None
+
+    async def ping(request: Request) -> JSONResponse:
+        return JSONResponse({"tenant": tenant_name()})
+
+    async def stream(request: Request) -> StreamingResponse:
+        async def body():
+            for i in range(events):
+                yield f"data: {json.dumps({'i': i, 'tenant': tenant_name()})}\n\n"
+                await asyncio.sleep(event_delay)
+
+        return StreamingResponse(body(), media_type="text/event-stream")
+
+    app = Starlette(routes=[Route("/ping", ping), Route("/stream", stream)])
+    if variant == "base":
+        app.add_middleware(LegacyOrganizationMiddleware)
+    elif variant == "asgi":
+        app.add_middleware(OrganizationMiddleware)
+    return app
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def run_server(variant: str, port: int, events: int, event_delay: float) -> None:
+    app = build_app(variant, events, event_delay)
+    uvicorn.run(app, host="127.0.0.1", port=port, log_level="warning", lifespan="off")
+
+
+def serve(variant: str, port: int, events: int, event_delay: float) -> multiprocessing.Process:
+    """uvicorn em processo próprio, para o gerador de carga não disputar o GIL do servidor."""
+    process = multiprocessing.get_context("spawn").Process(
+        target=run_server, args=(variant, port, events, event_delay), daemon=True
+    )
+    process.start()
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=1):
+                return process
+        except OSError:
+            time.sleep(0.05)
+    process.kill()
+    raise RuntimeError(f"Servidor da variante {variant} não subiu")
+
+
+def percentile(values: list[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct))]
+
+
+async def bench_ping(base_url: str, requests: int, concurrency: int, expected: str | None) -> float:
+    headers = {"X-Tenant": BENCH_TENANT}
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, headers=headers, limits=limits) as client:
+        for _ in range(min(requests, 100)):  # aquecimento
+            await client.get("/ping")
+        remaining = iter(range(requests))
+
+        async def worker() -> None:
+            for _ in remaining:
+                response = await client.get("/ping")
+                if response.json()["tenant"] != expected:
+                    raise RuntimeError("tenant não propagado")
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        return requests / (time.perf_counter() - started)
+
+
+async def bench_stream(base_url: str, streams: int, concurrency: int) -> tuple[list[float], list[float]]:
+    headers = {"X-Tenant": BENCH_TENANT}
+    first_token: list[float] = []
+    total: list[float] = []
+    remaining = iter(range(streams))
+    async with httpx.AsyncClient(base_url=base_url, headers=headers, timeout=60) as client:
+
+        async def worker() -> None:
+            for _ in remaining:
+                started = time.perf_counter()
+                async with client.stream("GET", "/stream") as response:
+                    first = True
+                    async for _chunk in response.aiter_bytes():
+                        if first:
+                            first_token.append(time.perf_counter() - started)
+                            first = False
+                total.append(time.perf_counter() - started)
+
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return first_token, total
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=3000, help="Requisições /ping por variante")
+    parser.add_argument("--concurrency", type=int, default=32, help="Clientes simultâneos")
+    parser.add_argument("--streams", type=int, default=100, help="Requisições /stream por variante")
+    parser.add_argument("--events", type=int, default=20, help="Eventos SSE por stream")
+    parser.add_argument("--event-delay-ms", type=float, default=5.0, help="Intervalo entre eventos SSE (ms)")
+    parser.add_argument(
+        "--variants", default="none,base,asgi", help="Separadas por vírgula: none, base (BaseHTTPMiddleware), asgi"
+    )
+    return parser.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+    rows = []
+    for variant in args.variants.split(","):
+        port = free_port()
+        server = serve(variant, port, args.events, args.event_delay_ms / 1000)
+        base_url = f"http://127.0.0.1:{port}"
+        try:
+            expected = None if variant == "none" else BENCH_TENANT
+            rps = asyncio.run(bench_ping(base_url, args.requests, args.concurrency, expected))
+            first_token, total = asyncio.run(bench_stream(base_url, args.streams, args.concurrency))
+        finally:
+            server.kill()
+            server.join()
+        rows.append(
+            (
+                variant,
+                rps,
+                statistics.median(first_token) * 1000,
+                percentile(first_token, 0.95) * 1000,
+                statistics.median(total) * 1000,
+            )
+        )
+
+    print(f"{'variante':<8} {'req/s':>10} {'ttft p50 ms':>12} {'ttft p95 ms':>12} {'stream p50 ms':>14}")
+    for variant, rps, ttft_p50, ttft_p95, total_p50 in rows:
+        print(f"{variant:<8} {rps:>10.0f} {ttft_p50:>12.2f} {ttft_p95:>12.2f} {total_p50:>14.2f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
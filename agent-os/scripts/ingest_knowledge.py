@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+"""
+Carga em massa de um diretório ou tarball na Knowledge (ex.: popular um tenant novo).
+
+Cada arquivo com extensão em ALLOWED_EXTENSIONS passa pelos mesmos readers/chunking do
+POST /knowledge/upload, sem os limites de quantidade e tamanho de arquivos por request. Os chunks
+são embedados em lotes grandes e os vetores gravados com COPY binário (uma transação por arquivo).
+Cada arquivo concluído é anotado num checkpoint, então uma execução interrompida retoma de onde
+parou. Com --defer-index o índice vetorial é removido durante a carga e construído uma vez no
+final, bem mais rápido do que mantê-lo linha a linha. Com --tenant os arquivos vão para a tabela
+de vetores da organização (como nos uploads com o header X-Tenant).
+
+Uso (container agent-os, PYTHONPATH=/app):
+    python scripts/ingest_knowledge.py /data/docs --tenant acme
+    python scripts/ingest_knowledge.py /data/docs.tar.gz --workers 8 --batch-size 256 --defer-index
+"""
+import argparse
+import contextvars
+import json
+import logging
+import os
+import shutil
+import sys
+import tarfile
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Iterator
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+logger = logging.getLogger("ingest_knowledge")
+
+
+class Checkpoint:
+    """JSONL (só append) dos arquivos processados; entradas ok/unchanged são puladas ao retomar."""
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self.done: set[str] = set()
+        self._lock = threading.Lock()
+        if path.exists():
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue  # última linha incompleta de uma queda
+                    if entry.get("status") in ("ok", "unchanged"):
+                        self.done.add(entry["name"])
+                    else:
+                        self.done.discard(entry["name"])
+
+    def record(self, name: str, status: str, message: str | None = None) -> None:
+        entry = {"name": name, "status": status, "at": int(time.time())}
+        if message:
+            entry["message"] = message
+        with self._lock, open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+
+def iter_directory(root: Path, wanted: Callable[[str], bool]) -> Iterator[tuple[str, Path, bool]]:
+    """(nome do documento, caminho, is_temp) de cada arquivo aceito por `wanted`; nome relativo à raiz."""
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames.sort()
+        for filename in sorted(filenames):
+            path = Path(dirpath) / filename
+            name = path.relative_to(root).as_posix()
+            if wanted(name):
+                yield name, path, False
+
+
+def iter_tarball(archive: Path, wanted: Callable[[str], bool]) -> Iterator[tuple[str, Path, bool]]:
+    """
+    Extrai um membro por vez para um arquivo temporário (nunca o arquivo inteiro). Membros
+    recusados por `wanted` (ex.: já no checkpoint) não chegam a ser extraídos.
+    """
+    with tarfile.open(archive, "r:*") as tar:
+        for member in tar:
+            name = member.name.removeprefix("./")
+            if not member.isfile() or not wanted(name):
+                continue
+            src = tar.extractfile(member)
+            if src is None:
+                continue
+            tmp = tempfile.NamedTemporaryFile(delete=False, suffix=Path(name).suffix, prefix="knowledge_bulk_")
+            with src, tmp:
+                shutil.copyfileobj(src, tmp, 1024 * 1024)
+            yield name, Path(tmp.name), True
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Carga em massa de arquivos na Knowledge")
+    parser.add_argument("source", type=Path, help="Diretório ou arquivo tar (.tar, .tar.gz, .tgz, ...)")
+    parser.add_argument("--checkpoint", type=Path, help="Arquivo de checkpoint (padrão: <origem>.checkpoint.jsonl)")
+    parser.add_argument("--fresh", action="store_true", help="Ignora o checkpoint existente")
+    parser.add_argument("--tenant", help="Organização (como no X-Tenant) dona dos documentos")
+    parser.add_argument("--workers", type=int, default=4, help="Arquivos ingeridos em paralelo")
+    parser.add_argument("--batch-size", type=int, default=256, help="Textos por requisição de embedding")
+    parser.add_argument("--max-in-flight", type=int, default=8, help="Requisições de embedding simultâneas")
+    parser.add_argument(
+        "--defer-index",
+        action="store_true",
+        help="Remove o índice vetorial durante a carga e o reconstrói no final (carga inicial)",
+    )
+    return parser.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    if not args.source.exists():
+        print(f"Origem não encontrada: {args.source}", file=sys.stderr)
+        return 2
+
+    # Lidos por knowledge.embedding_pipeline na importação
+    os.environ["EMBEDDING_BATCH_SIZE"] = str(args.batch_size)
+    os.environ["EMBEDDING_MAX_IN_FLIGHT"] = str(args.max_in_flight)
+    from knowledge import get_knowledge
+    from knowledge.ingestion import ALLOWED_EXTENSIONS
+
+    if args.tenant:
+        from config.organization_config import organization_config_manager
+        from config.organization_context import set_current_organization
+
+        org = organization_config_manager.get_organization(args.tenant)
+        if org is None:
+            print(f"Tenant desconhecido: {args.tenant}", file=sys.stderr)
+            return 2
+        set_current_organization(org)
+
+    checkpoint_path = args.checkpoint or args.source.with_name(args.source.name + ".checkpoint.jsonl")
+    if args.fresh:
+        checkpoint_path.unlink(missing_ok=True)
+    checkpoint = Checkpoint(checkpoint_path)
+    if checkpoint.done:
+        logger.info("Retomando: %d arquivo(s) já ingerido(s) (%s)", len(checkpoint.done), checkpoint_path)
+
+    knowledge = get_knowledge()
+    knowledge.vector_db.use_copy = True
+    if args.defer_index:
+        logger.info("Removendo o índice vetorial até o fim da carga")
+        knowledge.vector_db.auto_create_index = False
+        knowledge.vector_db.drop_vector_index()
+
+    counts = {"ok": 0, "unchanged": 0, "error": 0, "skipped": 0}
+    counts_lock = threading.Lock()
+
+    def wanted(name: str) -> bool:
+        """Extensão aceita e ainda não ingerido (checkpoint); os demais contam como ignorados."""
+        if Path(name).suffix.lower() in ALLOWED_EXTENSIONS and name not in checkpoint.done:
+            return True
+        with counts_lock:
+            counts["skipped"] += 1
+        return False
+
+    if args.source.is_dir():
+        files = iter_directory(args.source, wanted)
+    else:
+        files = iter_tarball(args.source, wanted)
+
+    # Limita os arquivos extraídos/enfileirados à frente dos workers (disco temporário dos tarballs)
+    slots = threading.BoundedSemaphore(args.workers * 2)
+
+    def ingest(name: str, path: Path, is_temp: bool) -> None:
+        started = time.monotonic()
+        try:
+            status = "ok" if knowledge.insert_file(path, name=name) else "unchanged"
+            message = None
+        except Exception as e:
+            logger.exception("Falha ao ingerir %s", name)
+            status, message = "error", str(e)
+        finally:
+            if is_temp:
+                path.unlink(missing_ok=True)
+            slots.release()
+        checkpoint.record(name, status, message)
+        with counts_lock:
+            counts[status] += 1
+            processed = counts["ok"] + counts["unchanged"] + counts["error"]
+        logger.info("[%d] %s: %s (%.1fs)", processed, name, status, time.monotonic() - started)
+
+    started = time.monotonic()
+    with ThreadPoolExecutor(max_workers=args.workers, thread_name_prefix="bulk-ingest") as executor:
+        for name, path, is_temp in files:
+            slots.acquire()
+            # Os workers herdam o tenant definido acima
+            executor.submit(contextvars.copy_context().run, ingest, name, path, is_temp)
+
+    if args.defer_index:
+        logger.info("Reconstruindo o índice vetorial")
+        logger.info(knowledge.vector_db.build_vector_index())
+
+    logger.info(
+        "Concluído em %.0fs: %d ingerido(s), %d sem alteração, %d com falha, %d ignorado(s)",
+        time.monotonic() - started,
+        counts["ok"],
+        counts["unchanged"],
+        counts["error"],
+        counts["skipped"],
+    )
+    return 1 if counts["error"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -15,6 +15,7 @@ from agno.tools.websearch import WebSearchTools
 from tools.github import GitHubTools
 from db import get_postgres_db
 from knowledge import get_knowledge
+from knowledge.context_packing import KNOWLEDGE_CONTEXT_TOKENS_TEAM, build_knowledge_retriever
 
 content_creator_humanizer_team = Team(
     id="content-creator-humanizer-team",
@@ -23,6 +24,7 @@ content_creator_humanizer_team = Team(
     model=get_model(),
     tools=[WebSearchTools(), GitHubTools()],
     knowledge=get_knowledge(),
+    knowledge_retriever=build_knowledge_retriever(KNOWLEDGE_CONTEXT_TOKENS_TEAM),
     db=get_postgres_db(),
     instructions="""
 Você coordena o time **Content Creator + Humanizer**.
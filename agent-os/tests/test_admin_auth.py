@@ -0,0 +1,36 @@
+"""require_admin: fechado sem KNOWLEDGE_ADMIN_TOKEN, salvo KNOWLEDGE_ADMIN_OPEN."""
+import pytest
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+
+from app.routes import auth
+
+
+@pytest.fixture
+def client() -> TestClient:
+    app = FastAPI()
+
+    @app.post("/admin", dependencies=[Depends(auth.require_admin)])
+    def admin():
+        return {"ok": True}
+
+    return TestClient(app)
+
+
+def test_without_token_configured_is_closed(client, monkeypatch):
+    monkeypatch.setattr(auth, "KNOWLEDGE_ADMIN_TOKEN", None)
+    monkeypatch.setattr(auth, "KNOWLEDGE_ADMIN_OPEN", False)
+    assert client.post("/admin").status_code == 503
+
+
+def test_explicit_open_flag(client, monkeypatch):
+    monkeypatch.setattr(auth, "KNOWLEDGE_ADMIN_TOKEN", None)
+    monkeypatch.setattr(auth, "KNOWLEDGE_ADMIN_OPEN", True)
+    assert client.post("/admin").status_code == 200
+
+
+def test_token_required(client, monkeypatch):
+    monkeypatch.setattr(auth, "KNOWLEDGE_ADMIN_TOKEN", "s3cret")
+    assert client.post("/admin").status_code == 403
+    assert client.post("/admin", headers={"X-Admin-Token": "wrong"}).status_code == 403
+    assert client.post("/admin", headers={"X-Admin-Token": "s3cret"}).status_code == 200
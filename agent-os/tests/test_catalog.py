@@ -0,0 +1,16 @@
+"""Cursor de paginação por keyset do catálogo de documentos."""
+import pytest
+
+from knowledge.catalog import InvalidCursor, decode_cursor, encode_cursor
+
+
+def test_cursor_round_trip():
+    cursor = encode_cursor(1735689600, "doc-ção/1")
+    assert "=" not in cursor
+    assert decode_cursor(cursor) == (1735689600, "doc-ção/1")
+
+
+@pytest.mark.parametrize("cursor", ["", "não-base64!", encode_cursor(1, "a")[:-3], "WzFd"])
+def test_malformed_cursor_is_rejected(cursor):
+    with pytest.raises(InvalidCursor):
+        decode_cursor(cursor)
@@ -0,0 +1,125 @@
+"""Empacotamento do contexto RAG: deduplicação, união de chunks adjacentes e orçamento de tokens."""
+import asyncio
+import inspect
+import time
+
+import pytest
+from agno.knowledge.document import Document
+
+from knowledge import context_packing
+from knowledge.context_packing import build_knowledge_retriever, merge_chunks, pack_documents
+
+
+@pytest.fixture(autouse=True)
+def char_estimate(monkeypatch):
+    # Contagem por caracteres (~4 por token), com ou sem tiktoken instalado
+    monkeypatch.setattr(context_packing, "_encoding", lambda: None)
+
+
+def _chunk(content: str, name: str = "manual.pdf", chunk: int | None = None, page: int = 1) -> Document:
+    meta = {"page": page}
+    if chunk is not None:
+        meta["chunk"] = chunk
+    return Document(content=content, name=name, meta_data=meta)
+
+
+def test_adjacent_chunks_are_merged_without_repeating_the_overlap():
+    passages = merge_chunks(
+        [_chunk("fim do trecho. Início do próximo", chunk=2), _chunk("um começo e fim do trecho.", chunk=1)]
+    )
+    assert len(passages) == 1
+    assert passages[0].content == "um começo e fim do trecho. Início do próximo"
+    assert passages[0].chunks == [1, 2]
+    assert passages[0].rank == 0
+
+
+def test_duplicates_and_contained_chunks_are_dropped():
+    passages = merge_chunks(
+        [
+            _chunk("texto completo da seção de férias", chunk=1),
+            _chunk("texto completo da seção de férias", name="copia.pdf", chunk=7),
+            _chunk("seção de férias", name="outro.pdf", chunk=3),
+        ]
+    )
+    assert [p.content for p in passages] == ["texto completo da seção de férias"]
+
+
+def test_non_adjacent_chunks_keep_relevance_order():
+    passages = merge_chunks([_chunk("c5", chunk=5), _chunk("c1", chunk=1), _chunk("outro", name="b.pdf", chunk=2)])
+    assert [p.content for p in passages] == ["c5", "c1", "outro"]
+
+
+def test_pack_respects_the_token_budget():
+    documents = [_chunk(letter * 396, name=f"{letter}.pdf") for letter in "abcde"]  # 100 tokens cada
+    packed = pack_documents(documents, token_budget=250)
+    # O terceiro caberia só com 50 tokens: abaixo do mínimo para um trecho cortado
+    assert [p["name"] for p in packed] == ["a.pdf", "b.pdf"]
+    assert packed[0]["meta_data"] == {"page": 1}
+
+
+def test_first_passage_is_truncated_when_it_alone_exceeds_the_budget():
+    packed = pack_documents([_chunk("b" * 4000, chunk=1)], token_budget=50)
+    assert len(packed) == 1
+    assert packed[0]["content"] == "b" * 200
+    assert packed[0]["meta_data"]["chunks"] == [1]
+    assert "chunk" not in packed[0]["meta_data"]
+
+
+class _SlowKnowledge:
+    max_results = 2
+
+    def __init__(self, seconds: float) -> None:
+        self.seconds = seconds
+
+    def search(self, query: str, max_results: int, filters=None) -> list[Document]:
+        time.sleep(self.seconds)  # embedding da consulta + SQL
+        return [_chunk(f"resultado para {query}", chunk=1)]
+
+
+@pytest.fixture
+def slow_knowledge(monkeypatch):
+    import knowledge
+
+    fake = _SlowKnowledge(0.2)
+    monkeypatch.setattr(knowledge, "get_knowledge", lambda: fake)
+    return fake
+
+
+def test_async_run_searches_off_the_event_loop(slow_knowledge):
+    retriever = build_knowledge_retriever(token_budget=500)
+
+    async def scenario() -> tuple[list, int]:
+        ticks = 0
+
+        async def ticker() -> None:
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        task = asyncio.create_task(ticker())
+        await asyncio.sleep(0)
+        # Como o Agno no caminho assíncrono: chama e aguarda se o retorno for awaitable
+        result = retriever(query="férias", num_documents=1)
+        assert inspect.isawaitable(result)
+        result = await result
+        task.cancel()
+        return result, ticks
+
+    result, ticks = asyncio.run(scenario())
+    assert result[0]["content"] == "resultado para férias"
+    assert ticks >= 5
+
+
+def test_sync_call_returns_the_list_even_inside_a_loop(slow_knowledge):
+    slow_knowledge.seconds = 0
+    retriever = build_knowledge_retriever(token_budget=500)
+
+    def sync_path() -> list:
+        return retriever(query="férias", num_documents=1)
+
+    async def scenario() -> list:
+        return sync_path()
+
+    assert sync_path()[0]["content"] == "resultado para férias"
+    assert asyncio.run(scenario())[0]["content"] == "resultado para férias"
@@ -0,0 +1,46 @@
+"""CachedEmbedder em lote: só os textos ausentes vão ao embedder e a resposta precisa cobrir todos."""
+import asyncio
+from dataclasses import dataclass, field
+
+import pytest
+from agno.knowledge.embedder.base import Embedder
+
+from knowledge.embedding_cache import CachedEmbedder, EmbeddingCache
+
+
+@dataclass
+class _FakeEmbedder(Embedder):
+    id: str = "fake"
+    dimensions: int = 2
+    drop: int = 0
+    calls: list[list[str]] = field(default_factory=list)
+
+    async def async_get_embeddings_batch_and_usage(self, texts: list[str]):
+        self.calls.append(list(texts))
+        texts = texts[: len(texts) - self.drop]
+        return [[float(len(t)), 1.0] for t in texts], [{"tokens": len(t)} for t in texts]
+
+
+def _cached(embedder: _FakeEmbedder) -> CachedEmbedder:
+    return CachedEmbedder(embedder=embedder, cache=EmbeddingCache())
+
+
+def test_batch_embeds_only_missing_texts_in_input_order():
+    embedder = _FakeEmbedder()
+    cached = _cached(embedder)
+    asyncio.run(cached.async_get_embeddings_batch_and_usage(["bb"]))
+
+    embeddings, usages = asyncio.run(cached.async_get_embeddings_batch_and_usage(["a", "bb", "ccc"]))
+
+    assert embedder.calls == [["bb"], ["a", "ccc"]]
+    assert embeddings == [[1.0, 1.0], [2.0, 1.0], [3.0, 1.0]]
+    assert usages == [{"tokens": 1}, None, {"tokens": 3}]
+
+
+def test_short_batch_response_raises_instead_of_returning_empty_vectors():
+    cached = _cached(_FakeEmbedder(drop=1))
+
+    with pytest.raises(RuntimeError, match="1 embedding"):
+        asyncio.run(cached.async_get_embeddings_batch_and_usage(["a", "bb"]))
+    # Nada parcial foi para o cache
+    assert cached.cache.stats()["lru_entries"] == 0
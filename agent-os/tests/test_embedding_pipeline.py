@@ -0,0 +1,42 @@
+"""Pipeline de embeddings: lotes na ordem de entrada e resposta incompleta do provedor."""
+from dataclasses import dataclass, field
+from types import SimpleNamespace
+
+import pytest
+from agno.knowledge.embedder.base import Embedder
+
+from knowledge.embedding_pipeline import EmbeddingPipeline
+
+
+class _FakeClient:
+    def __init__(self, drop: int) -> None:
+        self.drop = drop
+        self.embeddings = self
+
+    def with_options(self, **kwargs):
+        return self
+
+    def create(self, input: list[str], **kwargs):
+        # Resposta fora de ordem, como o provedor pode devolver
+        data = [SimpleNamespace(index=i, embedding=[float(len(t))]) for i, t in enumerate(input)]
+        return SimpleNamespace(data=list(reversed(data[: len(data) - self.drop])), usage=None)
+
+
+@dataclass
+class _FakeEmbedder(Embedder):
+    id: str = "fake"
+    drop: int = 0
+    client: _FakeClient = field(init=False)
+
+    def __post_init__(self):
+        self.client = _FakeClient(self.drop)
+
+
+def test_batches_keep_input_order():
+    embeddings, _ = EmbeddingPipeline(_FakeEmbedder(), batch_size=2).embed_texts(["a", "bb", "ccc", "dddd", "e"])
+    assert embeddings == [[1.0], [2.0], [3.0], [4.0], [1.0]]
+
+
+def test_short_provider_response_raises():
+    with pytest.raises(RuntimeError, match="1 embedding"):
+        EmbeddingPipeline(_FakeEmbedder(drop=1), batch_size=2).embed_texts(["a", "bb"])
@@ -0,0 +1,64 @@
+"""Fusão de rankings da busca híbrida (RRF) e pool das consultas paralelas."""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from agno.knowledge.document import Document
+
+from knowledge import hybrid
+from knowledge.hybrid import reciprocal_rank_fusion, submit_search
+
+
+def _doc(doc_id: str, **meta) -> Document:
+    return Document(id=doc_id, content=doc_id, meta_data=dict(meta))
+
+
+def test_documents_in_both_rankings_come_first():
+    vector = [_doc("a"), _doc("b"), _doc("c")]
+    keyword = [_doc("c"), _doc("d")]
+    fused = reciprocal_rank_fusion([vector, keyword], k=60)
+    assert [doc.id for doc in fused] == ["c", "a", "b", "d"]
+    assert fused[0].meta_data["rrf_score"] == round(1 / 63 + 1 / 61, 6)
+
+
+def test_meta_data_from_every_ranking_is_kept():
+    fused = reciprocal_rank_fusion(
+        [[_doc("a", similarity_score=0.9)], [_doc("a", keyword_rank=0.4, similarity_score=0.1)]], k=60
+    )
+    assert len(fused) == 1
+    assert fused[0].meta_data["similarity_score"] == 0.9
+    assert fused[0].meta_data["keyword_rank"] == 0.4
+
+
+def test_ties_keep_first_seen_order():
+    fused = reciprocal_rank_fusion([[_doc("a")], [_doc("b")]], k=60)
+    assert [doc.id for doc in fused] == ["a", "b"]
+
+
+def test_concurrent_first_searches_share_one_executor(monkeypatch):
+    created: list[ThreadPoolExecutor] = []
+
+    def slow_executor(*args, **kwargs):
+        time.sleep(0.05)
+        executor = ThreadPoolExecutor(*args, **kwargs)
+        created.append(executor)
+        return executor
+
+    monkeypatch.setattr(hybrid, "_executor", None)
+    monkeypatch.setattr(hybrid, "ThreadPoolExecutor", slow_executor)
+    barrier = threading.Barrier(8)
+    results: list[int] = []
+
+    def search() -> None:
+        barrier.wait()
+        results.append(submit_search(lambda: 1).result())
+
+    threads = [threading.Thread(target=search) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results == [1] * 8
+    assert len(created) == 1
+    created[0].shutdown()
@@ -0,0 +1,85 @@
+"""Documentos importantes em memória: expiração da cópia e recarga fora do event loop."""
+import asyncio
+import threading
+import time
+
+import pytest
+from agno.knowledge.document import Document
+
+from config.organization_config import AzureOpenAIConfig, AzureSearchConfig, OrganizationSettings
+from config.organization_context import clear_current_organization, set_current_organization
+from knowledge import important_docs
+from knowledge.important_docs import ImportantDocs
+
+
+class _FakeVectorDb:
+    def __init__(self) -> None:
+        self.version = 1
+        self.loads: list[str] = []
+        self.release = threading.Event()
+        self.release.set()
+
+    def documents_by_name(self, names: list[str]) -> dict[str, list[Document]]:
+        self.loads.append(threading.current_thread().name)
+        self.release.wait(5)
+        return {name: [Document(name=name, content=f"{name} v{self.version}")] for name in names}
+
+
+@pytest.fixture
+def vector_db(monkeypatch):
+    import knowledge
+
+    fake = _FakeVectorDb()
+    knowledge_base = type("FakeKnowledge", (), {"vector_db": fake})()
+    monkeypatch.setattr(knowledge, "get_knowledge", lambda: knowledge_base)
+    return fake
+
+
+@pytest.fixture
+def org():
+    org = OrganizationSettings(
+        name="acme",
+        azure_openai=AzureOpenAIConfig(api_key="-", endpoint="https://acme.invalid"),
+        azure_search=AzureSearchConfig(api_key="-", endpoint="https://acme.invalid", index_name="-"),
+        important_doc_ids={"general": ["DoR"], "business": [], "quality": []},
+    )
+    set_current_organization(org)
+    yield org
+    clear_current_organization()
+
+
+def _contents(docs: ImportantDocs) -> list[str]:
+    return [chunk.content for chunk in docs.get()]
+
+
+def test_copy_is_reloaded_after_the_ttl(vector_db, org, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(important_docs.time, "monotonic", lambda: now[0])
+    docs = ImportantDocs(ttl=60)
+    assert _contents(docs) == ["DoR v1"]
+
+    # Outro worker trocou o documento: esta cópia ainda vale até o TTL
+    vector_db.version = 2
+    now[0] += 30
+    assert _contents(docs) == ["DoR v1"]
+    now[0] += 31
+    assert _contents(docs) == ["DoR v2"]
+    assert len(vector_db.loads) == 2
+
+
+def test_event_loop_never_loads_synchronously(vector_db, org):
+    docs = ImportantDocs(ttl=60)
+    vector_db.release.clear()
+
+    async def scenario() -> list[str]:
+        return _contents(docs)
+
+    # Sem cópia ainda: o request segue sem documentos e a carga roda em thread
+    assert asyncio.run(scenario()) == []
+    vector_db.release.set()
+    for _ in range(100):
+        if docs._docs:
+            break
+        time.sleep(0.01)
+    assert vector_db.loads == ["knowledge-important-docs"]
+    assert asyncio.run(scenario()) == ["DoR v1"]
@@ -0,0 +1,56 @@
+"""Carga em massa (scripts/ingest_knowledge.py): membros já no checkpoint não são extraídos do tarball."""
+import importlib.util
+import io
+import tarfile
+from pathlib import Path
+
+_SCRIPT = Path(__file__).resolve().parent.parent / "scripts" / "ingest_knowledge.py"
+_spec = importlib.util.spec_from_file_location("ingest_knowledge", _SCRIPT)
+ingest_knowledge = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(ingest_knowledge)
+
+
+def _tarball(path: Path, files: dict[str, bytes]) -> Path:
+    with tarfile.open(path, "w:gz") as tar:
+        for name, data in files.items():
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            tar.addfile(info, io.BytesIO(data))
+    return path
+
+
+def test_checkpointed_members_are_not_extracted(tmp_path, monkeypatch):
+    archive = _tarball(tmp_path / "docs.tar.gz", {"feito.md": b"a", "novo.md": b"b", "imagem.png": b"c"})
+    extracted: list[str] = []
+    extractfile = tarfile.TarFile.extractfile
+
+    def spy(self, member):
+        extracted.append(member.name)
+        return extractfile(self, member)
+
+    monkeypatch.setattr(tarfile.TarFile, "extractfile", spy)
+    skipped: list[str] = []
+
+    def wanted(name: str) -> bool:
+        if name.endswith(".md") and name != "feito.md":
+            return True
+        skipped.append(name)
+        return False
+
+    files = list(ingest_knowledge.iter_tarball(archive, wanted))
+
+    assert extracted == ["novo.md"]
+    assert skipped == ["feito.md", "imagem.png"]
+    assert [(name, is_temp) for name, _, is_temp in files] == [("novo.md", True)]
+    assert files[0][1].read_bytes() == b"b"
+    files[0][1].unlink()
+
+
+def test_directory_lists_only_wanted_files(tmp_path):
+    (tmp_path / "sub").mkdir()
+    for name in ("a.md", "sub/b.txt", "sub/c.md"):
+        (tmp_path / name).write_text(name)
+
+    files = list(ingest_knowledge.iter_directory(tmp_path, lambda name: name != "sub/b.txt"))
+
+    assert [(name, is_temp) for name, _, is_temp in files] == [("a.md", False), ("sub/c.md", False)]
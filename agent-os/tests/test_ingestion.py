@@ -0,0 +1,81 @@
+"""Jobs de ingestão: tenant dono do job e status consultável a partir de outro worker."""
+import pytest
+
+from config.organization_config import AzureOpenAIConfig, AzureSearchConfig, OrganizationSettings
+from config.organization_context import clear_current_organization, set_current_organization
+from knowledge import ingestion
+from knowledge.ingestion import IngestionQueue
+
+
+class _WorkerQueue(IngestionQueue):
+    """Fila de um worker com a tabela de jobs simulada por um dicionário compartilhado."""
+
+    def __init__(self, store: dict) -> None:
+        super().__init__(max_workers=2)
+        self._db_disabled = False
+        self._store = store
+
+    def _save(self, job, prune: bool = False) -> None:
+        with self._lock:
+            version = self._versions[job.id] = self._versions.get(job.id, 0) + 1
+            status = job.to_dict()
+        if self._store.get(job.id, (0,))[0] < version:
+            self._store[job.id] = (version, job.tenant or "", status)
+
+    def _db_status(self, job_id: str, tenant: str | None):
+        entry = self._store.get(job_id)
+        return entry[2] if entry and entry[1] == (tenant or "") else None
+
+
+def _org(name: str) -> OrganizationSettings:
+    return OrganizationSettings(
+        name=name,
+        azure_openai=AzureOpenAIConfig(api_key="-", endpoint=f"https://{name}.invalid"),
+        azure_search=AzureSearchConfig(api_key="-", endpoint=f"https://{name}.invalid", index_name="-"),
+    )
+
+
+@pytest.fixture
+def ingested(monkeypatch):
+    calls: list[str] = []
+
+    def ingest_file(path, filename):
+        calls.append(filename)
+        return True
+
+    monkeypatch.setattr(ingestion, "ingest_file", ingest_file)
+    yield calls
+    clear_current_organization()
+
+
+def _submit(queue: IngestionQueue, tmp_path, tenant: str):
+    set_current_organization(_org(tenant))
+    path = tmp_path / f"{tenant}.txt"
+    path.write_text("conteúdo")
+    job = queue.submit([(path.name, path)])
+    job.done.result(timeout=5)
+    return job
+
+
+def test_job_is_only_visible_to_its_tenant(ingested, tmp_path):
+    queue = IngestionQueue(max_workers=1)
+    job = _submit(queue, tmp_path, "acme")
+
+    assert job.tenant == "acme"
+    assert queue.job_status(job.id, "acme")["status"] == "completed"
+    assert queue.job_status(job.id, "globex") is None
+    assert queue.job_status(job.id, None) is None
+
+
+def test_status_is_served_by_other_workers(ingested, tmp_path):
+    store: dict = {}
+    worker_a, worker_b = _WorkerQueue(store), _WorkerQueue(store)
+    job = _submit(worker_a, tmp_path, "acme")
+    # O último save (documento concluído) roda depois de job.done: espera o pool do worker terminar
+    worker_a._executor.shutdown(wait=True)
+
+    status = worker_b.job_status(job.id, "acme")
+    assert status == job.to_dict()
+    assert status["status"] == "completed"
+    assert worker_b.job_status(job.id, "globex") is None
+    assert worker_b.job_status("inexistente", "acme") is None
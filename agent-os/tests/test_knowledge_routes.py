@@ -0,0 +1,51 @@
+"""DELETE /knowledge/{content_id}: documento inexistente e falha ao remover os vetores."""
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.routes import knowledge as knowledge_routes
+
+
+class _FakeKnowledge:
+    def __init__(self, result: bool | None = None, error: Exception | None = None) -> None:
+        self.result = result
+        self.error = error
+        self.deleted: list[str] = []
+
+    def delete_document(self, content_id: str) -> bool:
+        self.deleted.append(content_id)
+        if self.error is not None:
+            raise self.error
+        return bool(self.result)
+
+
+@pytest.fixture
+def client_for(monkeypatch):
+    def build(fake: _FakeKnowledge) -> TestClient:
+        monkeypatch.setattr(knowledge_routes, "get_knowledge", lambda: fake)
+        app = FastAPI()
+        app.include_router(knowledge_routes.router, prefix="/knowledge")
+        return TestClient(app)
+
+    return build
+
+
+def test_delete_removes_document(client_for):
+    fake = _FakeKnowledge(result=True)
+    response = client_for(fake).delete("/knowledge/doc-1")
+    assert response.status_code == 200
+    assert response.json() == {"content_id": "doc-1", "deleted": True}
+    assert fake.deleted == ["doc-1"]
+
+
+def test_delete_unknown_document_returns_404(client_for):
+    response = client_for(_FakeKnowledge(result=False)).delete("/knowledge/missing")
+    assert response.status_code == 404
+    assert response.json()["detail"] == "Documento não encontrado"
+
+
+def test_delete_vector_failure_returns_500(client_for):
+    fake = _FakeKnowledge(error=RuntimeError("Falha ao remover os vetores de doc-1"))
+    response = client_for(fake).delete("/knowledge/doc-1")
+    assert response.status_code == 500
+    assert response.json()["detail"] == "Falha ao remover os vetores de doc-1"
@@ -0,0 +1,81 @@
+"""Limpeza de vetores órfãos: uma por vez entre todos os processos (advisory lock)."""
+from contextlib import contextmanager
+
+import pytest
+
+from knowledge.maintenance import VACUUM_LOCK_KEY, vacuum_orphan_vectors
+
+
+class _Result:
+    def __init__(self, value) -> None:
+        self.value = value
+
+    def scalar(self):
+        return self.value
+
+
+class _FakeEngine:
+    """Simula o PostgreSQL: o lock pertence a quem o obteve até o fim da transação."""
+
+    def __init__(self) -> None:
+        self.locked = False
+        self.calls: list[dict] = []
+
+    @contextmanager
+    def begin(self):
+        acquired = []
+
+        class Conn:
+            def execute(conn, statement, params):
+                self.calls.append(params)
+                if self.locked:
+                    return _Result(False)
+                self.locked = True
+                acquired.append(True)
+                return _Result(True)
+
+        try:
+            yield Conn()
+        finally:
+            if acquired:
+                self.locked = False
+
+
+class _FakeVectorDb:
+    def __init__(self, engine: _FakeEngine) -> None:
+        self.db_engine = engine
+        self.deleted: list[str] = []
+
+    def vector_tables(self) -> list[str]:
+        return ["knowledge_vectors", "knowledge_vectors__acme"]
+
+    def delete_orphan_vectors(self, table_name: str, contents_table: str, batch_size: int) -> int:
+        self.deleted.append(table_name)
+        return 3 if table_name.endswith("acme") else 0
+
+    def vacuum_table(self, table_name: str) -> None:
+        raise AssertionError("abaixo de KNOWLEDGE_VACUUM_MIN_ROWS")
+
+
+@pytest.fixture
+def vector_db(monkeypatch):
+    import knowledge
+
+    fake = _FakeVectorDb(_FakeEngine())
+    contents_db = type("Contents", (), {"db_schema": "ai", "knowledge_table_name": "knowledge_contents"})()
+    knowledge_base = type("FakeKnowledge", (), {"vector_db": fake, "contents_db": contents_db})()
+    monkeypatch.setattr(knowledge, "get_knowledge", lambda: knowledge_base)
+    return fake
+
+
+def test_vacuum_runs_under_the_advisory_lock(vector_db):
+    assert vacuum_orphan_vectors() == "Vetores órfãos removidos: knowledge_vectors__acme=3"
+    assert vector_db.deleted == ["knowledge_vectors", "knowledge_vectors__acme"]
+    assert vector_db.db_engine.calls == [{"key": VACUUM_LOCK_KEY}]
+    assert not vector_db.db_engine.locked
+
+
+def test_vacuum_is_skipped_while_another_process_holds_the_lock(vector_db):
+    vector_db.db_engine.locked = True  # outro worker/pod no meio da limpeza
+    assert vacuum_orphan_vectors() == "Limpeza em andamento em outro processo"
+    assert vector_db.deleted == []
@@ -0,0 +1,52 @@
+"""Registro de clientes por tenant: pools HTTP substituídos no reload são fechados."""
+import asyncio
+import threading
+
+import pytest
+
+from config import model_registry
+from config.model_registry import ModelRegistry
+from config.organization_config import AzureOpenAIConfig, AzureSearchConfig, OrganizationSettings
+
+
+@pytest.fixture(autouse=True)
+def close_now(monkeypatch):
+    monkeypatch.setattr(model_registry, "TENANT_CLIENT_CLOSE_DELAY_SECONDS", 0)
+
+
+def _org(api_key: str = "chave-1") -> OrganizationSettings:
+    return OrganizationSettings(
+        name="acme",
+        azure_openai=AzureOpenAIConfig(api_key=api_key, endpoint="https://acme.invalid"),
+        azure_search=AzureSearchConfig(api_key="-", endpoint="https://acme.invalid", index_name="-"),
+    )
+
+
+def test_config_change_closes_the_replaced_pools():
+    registry = ModelRegistry()
+    old = registry.clients(_org())
+    assert registry.clients(_org()) is old
+
+    new = registry.clients(_org("chave-2"))
+
+    assert new is not old
+    assert old.http.is_closed and old.async_http.is_closed
+    assert not new.http.is_closed and not new.async_http.is_closed
+
+
+def test_invalidate_closes_the_async_pool_on_its_event_loop():
+    registry = ModelRegistry()
+
+    async def scenario():
+        clients = registry.clients(_org())
+        assert clients.loop is asyncio.get_running_loop()
+        # Reload da configuração (watcher) em outra thread
+        reload = threading.Thread(target=registry.invalidate, args=({"acme"},))
+        reload.start()
+        await asyncio.to_thread(reload.join)
+        await asyncio.sleep(0.05)
+        return clients
+
+    clients = asyncio.run(scenario())
+    assert clients.http.is_closed and clients.async_http.is_closed
+    assert registry.clients(_org()) is not clients
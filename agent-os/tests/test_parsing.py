@@ -0,0 +1,48 @@
+"""Pool de parse: o timeout mede só o parse e encerra apenas o worker do arquivo travado."""
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pytest
+
+from knowledge.parsing import DocumentParseError, ParsePool
+
+
+class SleepReader:
+    """Reader de teste (importável pelos workers spawn): dorme `name` segundos."""
+
+    def read(self, path: Path, name: str | None = None) -> list:
+        time.sleep(float(name))
+        return [name]
+
+
+class CrashReader:
+    """Reader de teste: derruba o processo do worker."""
+
+    def read(self, path: Path, name: str | None = None) -> list:
+        os._exit(1)
+
+
+def test_timeout_kills_only_the_stuck_worker():
+    pool = ParsePool(max_workers=2, timeout=3, memory_mb=0, max_tasks_per_child=0)
+
+    def parse(name: str):
+        try:
+            return pool.parse(SleepReader(), Path("x"), name)
+        except DocumentParseError as e:
+            return str(e)
+
+    # Um arquivo travado e mais arquivos que workers: os da fila esperam a vaga sem estourar o timeout
+    names = ["60"] + ["1"] * 4
+    with ThreadPoolExecutor(max_workers=len(names)) as threads:
+        results = list(threads.map(parse, names))
+    assert results[0] == "Parse de 60 excedeu 3s"
+    assert results[1:] == [["1"]] * 4
+
+
+def test_worker_crash_fails_only_that_file():
+    pool = ParsePool(max_workers=1, timeout=30, memory_mb=0, max_tasks_per_child=0)
+    with pytest.raises(DocumentParseError, match="encerrado"):
+        pool.parse(CrashReader(), Path("x"), "crash")
+    assert pool.parse(SleepReader(), Path("x"), "0") == ["0"]
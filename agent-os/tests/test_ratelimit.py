@@ -0,0 +1,68 @@
+"""Token bucket e rate limiter (config.ratelimit) com relógio controlado."""
+import pytest
+
+from config import ratelimit
+from config.ratelimit import RateLimiter, TokenBucket, estimate_tokens
+
+
+class _Clock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+        self.sleeps: list[float] = []
+
+    def monotonic(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float) -> None:
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = _Clock()
+    monkeypatch.setattr(ratelimit.time, "monotonic", clock.monotonic)
+    monkeypatch.setattr(ratelimit.time, "sleep", clock.sleep)
+    return clock
+
+
+def test_burst_up_to_capacity_then_waits_for_refill(clock):
+    bucket = TokenBucket(rate_per_minute=60)
+    for _ in range(60):
+        bucket.acquire()
+    assert clock.sleeps == []
+
+    bucket.acquire(2)
+    assert clock.sleeps == [pytest.approx(2.0)]
+
+
+def test_consume_adjusts_balance_both_ways(clock):
+    bucket = TokenBucket(rate_per_minute=600)
+    bucket.acquire(600)
+    bucket.consume(-300)  # uso real menor que a estimativa: devolve
+    bucket.acquire(300)
+    assert clock.sleeps == []
+
+    bucket.consume(100)  # uso real maior: saldo negativo atrasa o próximo
+    bucket.acquire(10)
+    assert clock.sleeps == [pytest.approx(11.0)]
+
+
+def test_zero_rate_disables_the_bucket(clock):
+    bucket = TokenBucket(rate_per_minute=0)
+    bucket.acquire(10_000)
+    bucket.consume(10_000)
+    assert clock.sleeps == []
+
+
+def test_rate_limiter_waits_out_the_pause(clock):
+    limiter = RateLimiter(rpm=0, tpm=0)
+    limiter.pause(5)
+    limiter.pause(2)  # pausa menor não encurta a atual
+    limiter.acquire(tokens=100)
+    assert sum(clock.sleeps) == pytest.approx(5.0)
+
+
+def test_estimate_tokens():
+    assert estimate_tokens("") == 1
+    assert estimate_tokens("a" * 400) == 101
@@ -0,0 +1,35 @@
+"""Reranker BM25: pontuação lexical combinada com a posição da busca."""
+from agno.knowledge.document import Document
+
+from knowledge.reranker import LocalReranker
+
+
+def _docs(*contents: str) -> list[Document]:
+    return [Document(id=str(i), content=content, meta_data={}) for i, content in enumerate(contents)]
+
+
+def test_lexical_match_moves_up_without_discarding_the_vector_rank():
+    reranker = LocalReranker(method="bm25", budget_ms=10_000)
+    documents = _docs(
+        "benefícios e convênios dos colaboradores",
+        "regras gerais de conduta",
+        "como solicitar férias: férias devem ser pedidas com 30 dias",
+    )
+    ranked = reranker.rerank("solicitar férias", documents)
+    # BM25 coloca o chunk 2 em primeiro; no RRF com a busca ele passa o chunk 1, mas não o 0
+    assert [doc.id for doc in ranked] == ["0", "2", "1"]
+    assert ranked[1].meta_data["reranking_score"] > 0
+    assert ranked[0].meta_data["reranking_score"] == 0
+
+
+def test_no_matching_terms_keeps_the_original_order():
+    reranker = LocalReranker(method="bm25", budget_ms=10_000)
+    ranked = reranker.rerank("inexistente", _docs("um", "dois", "três"))
+    assert [doc.id for doc in ranked] == ["0", "1", "2"]
+
+
+def test_exhausted_budget_keeps_the_original_order():
+    reranker = LocalReranker(method="bm25", budget_ms=-1)
+    documents = _docs("nada aqui", "férias férias")
+    assert reranker.rerank("férias", documents) == documents
+    assert "reranking_score" not in documents[1].meta_data
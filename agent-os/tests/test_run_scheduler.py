@@ -0,0 +1,85 @@
+"""Escalonador de runs: limites por tenant e fila justa ponderada entre tenants."""
+import asyncio
+
+import pytest
+
+from config.organization_config import RunLimits
+from middleware.run_scheduler import RunQueueFull, RunScheduler
+
+
+async def _hold(scheduler: RunScheduler, tenant: str, limits: RunLimits, started: list, release: asyncio.Event):
+    async with scheduler.slot(tenant, limits):
+        started.append(tenant)
+        await release.wait()
+
+
+def test_tenant_limit_and_queue_full():
+    async def scenario():
+        scheduler = RunScheduler(capacity=10)
+        limits = RunLimits(max_concurrent_runs=1, max_queued_runs=1, weight=1.0)
+        started: list[str] = []
+        release = asyncio.Event()
+        running = asyncio.create_task(_hold(scheduler, "acme", limits, started, release))
+        queued = asyncio.create_task(_hold(scheduler, "acme", limits, started, release))
+        await asyncio.sleep(0)
+        assert started == ["acme"]
+        assert scheduler.stats()["tenants"]["acme"] == {"running": 1, "queued": 1}
+
+        with pytest.raises(RunQueueFull) as exc:
+            async with scheduler.slot("acme", limits):
+                pass
+        assert exc.value.retry_after >= 1
+
+        release.set()
+        await asyncio.gather(running, queued)
+        assert started == ["acme", "acme"]
+        assert scheduler.stats() == {"capacity": 10, "running": 0, "tenants": {}}
+
+    asyncio.run(scenario())
+
+
+def test_free_slots_follow_tenant_weights():
+    async def scenario():
+        scheduler = RunScheduler(capacity=1)
+        heavy = RunLimits(max_concurrent_runs=10, max_queued_runs=10, weight=2.0)
+        light = RunLimits(max_concurrent_runs=10, max_queued_runs=10, weight=1.0)
+        order: list[str] = []
+        gate = asyncio.Event()
+
+        async def run(tenant: str, limits: RunLimits) -> None:
+            async with scheduler.slot(tenant, limits):
+                order.append(tenant)
+                await gate.wait()
+
+        blocker = asyncio.create_task(run("blocker", light))
+        await asyncio.sleep(0)
+        tasks = [asyncio.create_task(run("light", light)) for _ in range(3)]
+        tasks += [asyncio.create_task(run("heavy", heavy)) for _ in range(6)]
+        await asyncio.sleep(0)
+        gate.set()
+        await asyncio.gather(blocker, *tasks)
+        # Peso 2: o tenant pesado recebe duas vagas para cada vaga do leve
+        assert order[1:7].count("heavy") == 4
+        assert order[1:7].count("light") == 2
+
+    asyncio.run(scenario())
+
+
+def test_cancelled_waiter_leaves_the_queue():
+    async def scenario():
+        scheduler = RunScheduler(capacity=1)
+        limits = RunLimits(max_concurrent_runs=1, max_queued_runs=5, weight=1.0)
+        started: list[str] = []
+        release = asyncio.Event()
+        running = asyncio.create_task(_hold(scheduler, "acme", limits, started, release))
+        waiting = asyncio.create_task(_hold(scheduler, "acme", limits, started, release))
+        await asyncio.sleep(0)
+        waiting.cancel()
+        await asyncio.sleep(0)
+        assert scheduler.stats()["tenants"]["acme"] == {"running": 1, "queued": 0}
+        release.set()
+        await running
+        assert started == ["acme"]
+        assert scheduler.stats()["running"] == 0
+
+    asyncio.run(scenario())
@@ -0,0 +1,93 @@
+"""Cache de buscas: chave por tenant e invalidação por geração."""
+from knowledge import search_cache
+from knowledge.search_cache import SearchCache
+
+
+def _key(cache: SearchCache, tenant: str | None, query: str = "Política de  Férias") -> str:
+    return cache.key(tenant, "hybrid", query, 5, {"tipo": "rh"})
+
+
+def test_hit_for_the_same_normalized_query():
+    cache = SearchCache(max_entries=10, ttl=60)
+    cache.put(_key(cache, "acme"), [("chunk-1", {"rrf_score": 0.1})])
+    assert cache.get(_key(cache, "acme", "política de férias")) == [("chunk-1", {"rrf_score": 0.1})]
+
+
+def test_invalidate_only_affects_the_tenant():
+    cache = SearchCache(max_entries=10, ttl=60)
+    cache.put(_key(cache, "acme"), [("a", {})])
+    cache.put(_key(cache, "globex"), [("g", {})])
+
+    cache.invalidate("acme")
+
+    assert cache.get(_key(cache, "acme")) is None
+    assert cache.get(_key(cache, "globex")) == [("g", {})]
+    assert cache.stats()["invalidations"] == 1
+
+
+def test_entries_from_the_new_generation_are_served():
+    cache = SearchCache(max_entries=10, ttl=60)
+    cache.put(_key(cache, "acme"), [("old", {})])
+    cache.invalidate("acme")
+    cache.put(_key(cache, "acme"), [("new", {})])
+    assert cache.get(_key(cache, "acme")) == [("new", {})]
+
+
+def test_lru_evicts_the_oldest_entry():
+    cache = SearchCache(max_entries=2, ttl=60)
+    first, second, third = (_key(cache, None, q) for q in ("um", "dois", "tres"))
+    cache.put(first, [])
+    cache.put(second, [])
+    cache.get(first)
+    cache.put(third, [])
+    assert cache.get(second) is None
+    assert cache.get(first) == []
+
+
+class _SharedStore:
+    """Tabela knowledge_search_generations simulada, compartilhada por dois "workers"."""
+
+    def __init__(self) -> None:
+        self.generations: dict[str, int] = {}
+
+
+class _WorkerCache(SearchCache):
+    def __init__(self, store: _SharedStore, sync_seconds: float) -> None:
+        super().__init__(max_entries=10, ttl=300, sync_seconds=sync_seconds)
+        self._db_disabled = False
+        self.store = store
+
+    def _db_generation(self, tenant: str | None) -> int:
+        return self.store.generations.get(tenant or "", 0)
+
+    def _db_bump(self, tenant: str | None) -> int:
+        self.store.generations[tenant or ""] = self.store.generations.get(tenant or "", 0) + 1
+        return self.store.generations[tenant or ""]
+
+
+def test_invalidation_reaches_other_workers_through_the_shared_generation(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(search_cache.time, "monotonic", lambda: now[0])
+    store = _SharedStore()
+    reader, writer = _WorkerCache(store, sync_seconds=2), _WorkerCache(store, sync_seconds=2)
+    reader.put(_key(reader, "acme"), [("chunk-do-doc-removido", {})])
+
+    writer.invalidate("acme")
+
+    # Dentro do intervalo de releitura o leitor ainda usa a geração lida antes
+    assert reader.get(_key(reader, "acme")) == [("chunk-do-doc-removido", {})]
+    now[0] += 2
+    assert reader.get(_key(reader, "acme")) is None
+
+
+def test_shared_generation_read_failure_keeps_the_last_value(monkeypatch):
+    store = _SharedStore()
+    cache = _WorkerCache(store, sync_seconds=0)
+    cache.put(_key(cache, "acme"), [("a", {})])
+
+    def unavailable(tenant):
+        raise OSError("banco indisponível")
+
+    monkeypatch.setattr(cache, "_db_generation", unavailable)
+    assert cache.get(_key(cache, "acme")) == [("a", {})]
+    assert cache.stats()["db_errors"] == 1
@@ -0,0 +1,92 @@
+"""Chave de tenant da Knowledge: nomes de tabela e isolamento na tabela compartilhada."""
+import re
+
+import pytest
+from sqlalchemy import Column, MetaData, String, Table
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.dialects.postgresql import JSONB
+
+from config.organization_config import AzureOpenAIConfig, AzureSearchConfig, OrganizationSettings
+from config.organization_context import clear_current_organization, set_current_organization
+from knowledge import tenancy
+from knowledge import vector_db as vector_db_module
+from knowledge.tenancy import _MAX_KEY_LENGTH, current_table_tenant, current_tenant_key, tenant_key, tenant_table_name
+from knowledge.vector_db import KnowledgePgVector
+
+
+def test_safe_names_are_kept():
+    assert tenant_key("acme") == "acme"
+    assert tenant_key("acme_01") == "acme_01"
+
+
+def test_changed_names_get_a_hash_and_do_not_collide():
+    keys = {tenant_key(name) for name in ("Acme", "acme-", "ACME", "acme.")}
+    assert len(keys) == 4
+    assert all(re.fullmatch(r"acme_[0-9a-f]{8}", key) for key in keys)
+
+
+def test_key_is_bounded_and_sql_safe():
+    for name in ("x" * 200, "Organização São Paulo", "'; drop table x; --", "###"):
+        key = tenant_key(name)
+        assert len(key) <= _MAX_KEY_LENGTH
+        assert re.fullmatch(r"[a-z0-9_]+", key)
+    assert tenant_key("x" * 200) != tenant_key("x" * 201)
+
+
+def test_tenant_table_name():
+    assert tenant_table_name("knowledge_vectors", None) == "knowledge_vectors"
+    assert tenant_table_name("knowledge_vectors", "acme") == "knowledge_vectors__acme"
+
+
+@pytest.fixture
+def acme():
+    org = OrganizationSettings(
+        name="acme",
+        azure_openai=AzureOpenAIConfig(api_key="-", endpoint="https://acme.invalid"),
+        azure_search=AzureSearchConfig(api_key="-", endpoint="https://acme.invalid", index_name="-"),
+    )
+    set_current_organization(org)
+    yield org
+    clear_current_organization()
+
+
+def test_tenant_key_does_not_depend_on_tenant_tables(monkeypatch, acme):
+    monkeypatch.setattr(tenancy, "KNOWLEDGE_TENANT_TABLES", False)
+    assert current_tenant_key() == "acme"
+    assert current_table_tenant() is None
+
+    monkeypatch.setattr(tenancy, "KNOWLEDGE_TENANT_TABLES", True)
+    assert current_table_tenant() == "acme"
+
+
+def _vector_db() -> KnowledgePgVector:
+    # Sem banco: tabela base registrada direto no cache de tabelas
+    vector_db = object.__new__(KnowledgePgVector)
+    vector_db.schema = "ai"
+    vector_db.base_table_name = "knowledge_vectors"
+    table = Table("knowledge_vectors", MetaData(schema="ai"), Column("id", String), Column("meta_data", JSONB))
+    vector_db_module._tables[("ai", "knowledge_vectors")] = table
+    return vector_db
+
+
+def test_shared_table_filters_searches_by_tenant(monkeypatch, acme):
+    monkeypatch.setattr(tenancy, "KNOWLEDGE_TENANT_TABLES", False)
+    monkeypatch.setattr(vector_db_module, "KNOWLEDGE_TENANT_TABLES", False)
+    vector_db = _vector_db()
+    assert vector_db.table_name == "knowledge_vectors"
+
+    conditions = vector_db._filter_conditions({"tipo": "dor"})
+    params = [c.compile(dialect=postgresql.dialect()).params for c in conditions]
+    assert [list(p.values()) for p in params] == [[{"tenant": "acme"}], [{"tipo": "dor"}]]
+
+    clear_current_organization()
+    assert vector_db._filter_conditions(None) == []
+
+
+def test_tenant_tables_do_not_add_a_tenant_filter(monkeypatch, acme):
+    monkeypatch.setattr(tenancy, "KNOWLEDGE_TENANT_TABLES", True)
+    monkeypatch.setattr(vector_db_module, "KNOWLEDGE_TENANT_TABLES", True)
+    vector_db = object.__new__(KnowledgePgVector)
+    vector_db.base_table_name = "knowledge_vectors"
+    assert vector_db.table_name == "knowledge_vectors__acme"
+    assert vector_db._tenant_conditions() == []
@@ -0,0 +1,61 @@
+"""Upsert incremental: diferença entre os chunks recebidos e os já gravados do documento."""
+from agno.knowledge.document import Document
+
+from knowledge.vector_db import KnowledgePgVector, chunk_hash
+
+CONTENT_HASH = "hash-do-documento"
+
+
+def _vector_db(existing_contents: list[str], meta_data: dict | None = None, filters=None) -> KnowledgePgVector:
+    # Sem banco: só o plano do upsert, com os registros existentes simulados
+    vector_db = object.__new__(KnowledgePgVector)
+    existing = {
+        vector_db._record_id(chunk_hash(c), CONTENT_HASH): (dict(meta_data or {}), filters) for c in existing_contents
+    }
+    vector_db._existing_records = lambda content_hash: dict(existing) if content_hash == CONTENT_HASH else {}
+    return vector_db
+
+
+def test_only_new_chunks_are_embedded_and_removed_chunks_are_stale():
+    vector_db = _vector_db(["inalterado", "removido"])
+    documents = [Document(content="inalterado"), Document(content="novo")]
+
+    new_docs, stale_ids, updates = vector_db._plan_upsert(CONTENT_HASH, documents)
+
+    assert [doc.content for doc in new_docs] == ["novo"]
+    assert new_docs[0].id == chunk_hash("novo")
+    assert stale_ids == [vector_db._record_id(chunk_hash("removido"), CONTENT_HASH)]
+    assert updates == {}
+
+
+def test_unchanged_document_plans_nothing():
+    vector_db = _vector_db(["a", "b"])
+    assert vector_db._plan_upsert(CONTENT_HASH, [Document(content="b"), Document(content="a")]) == ([], [], {})
+
+
+def test_repeated_chunks_are_embedded_once():
+    vector_db = _vector_db([])
+    new_docs, stale_ids, _ = vector_db._plan_upsert(CONTENT_HASH, [Document(content="x"), Document(content="x")])
+    assert len(new_docs) == 1
+    assert stale_ids == []
+
+
+def test_retained_chunks_with_changed_metadata_are_updated_without_embedding():
+    old_filters = {"file_sha256": "v1"}
+    vector_db = _vector_db(["mantido"], meta_data={"chunk": 3, **old_filters}, filters=old_filters)
+    new_filters = {"file_sha256": "v2"}
+
+    documents = [Document(content="novo", meta_data={"chunk": 1}), Document(content="mantido", meta_data={"chunk": 2})]
+    new_docs, stale_ids, updates = vector_db._plan_upsert(CONTENT_HASH, documents, new_filters)
+
+    assert [doc.content for doc in new_docs] == ["novo"]
+    assert stale_ids == []
+    record_id = vector_db._record_id(chunk_hash("mantido"), CONTENT_HASH)
+    assert updates == {record_id: ({"chunk": 2, "file_sha256": "v2"}, new_filters)}
+
+
+def test_retained_chunks_with_same_metadata_are_not_updated():
+    filters = {"file_sha256": "v1"}
+    vector_db = _vector_db(["a"], meta_data={"chunk": 1, **filters}, filters=filters)
+    documents = [Document(content="a", meta_data={"chunk": 1})]
+    assert vector_db._plan_upsert(CONTENT_HASH, documents, filters) == ([], [], {})